@@ -0,0 +1,56 @@
+"""Per-call latency of nb, launched fresh each time versus served by the persistent coprocess.
+
+    python benchmarks/nb_coprocess.py [-n CALLS] [nb arguments...]
+
+The nb arguments default to `ls home: --no-color`. Any nb on PATH works, including the stub from the benchmark suite.
+"""
+
+import argparse
+import statistics
+import time
+
+from mole.nb import NbClient, subprocess_runner
+from mole.nb_coprocess import CoprocessRunner
+
+
+def time_calls(client: NbClient, args: list[str], calls: int) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        client.clear()  # We want the cost of nb, not of the memo
+        start = time.perf_counter()
+        client.returncode(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    assert __doc__ is not None
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--calls", type=int, default=20)
+    parser.add_argument("args", nargs="*", default=["ls", "home:", "--no-color"])
+    options = parser.parse_args()
+
+    coprocess = CoprocessRunner()
+    coprocess_client = NbClient(runner=coprocess)
+    coprocess_client.returncode(
+        "--version"
+    )  # Don't count the worker's startup against every call
+
+    results = {
+        "subprocess": time_calls(
+            NbClient(runner=subprocess_runner), options.args, options.calls
+        ),
+        "coprocess": time_calls(coprocess_client, options.args, options.calls),
+    }
+    coprocess.close()
+
+    print(f"nb {' '.join(options.args)} x{options.calls}")
+    for name, timings in results.items():
+        print(
+            f"  {name:<10} median {statistics.median(timings) * 1000:7.1f}ms"
+            f"  min {min(timings) * 1000:7.1f}ms  max {max(timings) * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
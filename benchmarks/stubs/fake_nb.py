@@ -0,0 +1,259 @@
+"""fake_nb.py - Just enough of nb-cli, working on a real notebook tree under $NB_DIR, for the benchmark suite.
+
+Only the subcommands and output formats mole relies on are implemented. Notebooks are directories under $NB_DIR, each
+with nb's `.index` file (line N names the file with id N), and selectors are `notebook:id`, `notebook:path` or a bare
+path in the home notebook. Called by the ./nb wrapper, which has already paid the simulated startup cost.
+"""
+
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from stub import latency, record
+
+VALUE_OPTIONS = {"--content", "--title", "--type", "--filename", "--excerpt"}
+
+
+def nb_dir() -> Path:
+    return Path(os.environ["NB_DIR"])
+
+
+def parse(args: list[str]) -> tuple[list[str], dict[str, str], set[str]]:
+    """Split args into positionals, options with values, and boolean flags."""
+    positionals: list[str] = []
+    options: dict[str, str] = {}
+    flags: set[str] = set()
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.startswith("--") and "=" in arg:
+            key, value = arg.split("=", 1)
+            options[key] = value
+        elif arg in VALUE_OPTIONS:
+            options[arg] = args[i + 1]
+            i += 1
+        elif arg.startswith("-") and len(arg) > 1:
+            flags.add(arg)
+        else:
+            positionals.append(arg)
+        i += 1
+    return positionals, options, flags
+
+
+def split_selector(selector: str) -> tuple[Path, str]:
+    """Return the notebook directory and the item part (id, path, or empty) of a selector."""
+    if ":" in selector:
+        notebook, item = selector.split(":", 1)
+        if (nb_dir() / notebook).is_dir():
+            return nb_dir() / notebook, item
+    return nb_dir() / "home", selector
+
+
+def read_index(notebook: Path) -> list[str]:
+    try:
+        return (notebook / ".index").read_text().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def find(notebook: Path, item: str) -> Optional[tuple[int, Path]]:
+    index = read_index(notebook)
+    if item.isdigit():
+        nb_id = int(item)
+        if 0 < nb_id <= len(index) and index[nb_id - 1]:
+            return nb_id, notebook / index[nb_id - 1]
+        return None
+    target = Path(item)
+    if target.is_absolute():
+        target = (
+            target.relative_to(notebook) if target.is_relative_to(notebook) else target
+        )
+    for nb_id, line in enumerate(index, start=1):
+        if line and (
+            Path(line) == target
+            or (target.parent == Path(".") and Path(line).name == target.name)
+        ):
+            return nb_id, notebook / line
+    return None
+
+
+def items(notebook: Path, filetype: Optional[str] = None) -> list[tuple[int, Path]]:
+    index = read_index(notebook)
+    # nb looks at every file in the notebook, whatever the --type, so big notebooks list slowly
+    time.sleep(latency("nb-item") * sum(1 for line in index if line))
+    return [
+        (nb_id, notebook / line)
+        for nb_id, line in enumerate(index, start=1)
+        if line
+        and (filetype is None or line.endswith(f".{filetype}"))
+        and (notebook / line).exists()
+    ]
+
+
+def title_of(path: Path) -> str:
+    with path.open() as f:
+        first = f.readline().rstrip("\n")
+    return first[2:] if first.startswith("# ") else path.name
+
+
+def cmd_ls(args: list[str]) -> int:
+    positionals, options, flags = parse(args)
+    notebook, item = split_selector(positionals[0] if positionals else "home:")
+    if "--filenames" in flags and len(positionals) > 1:
+        found = find(notebook, positionals[1])
+        if found is None:
+            return 1
+        print(f"[{found[0]}] {found[1].name}")
+        return 0
+    if item:
+        found = find(notebook, item)
+        if found is None:
+            return 1
+        selected = [found]
+    else:
+        selected = items(notebook, options.get("--type"))
+        if not selected:
+            print(f"0 {options.get('--type', '')} items.")
+            return 0
+    for nb_id, path in selected:
+        shown = str(path) if "--paths" in flags else title_of(path)
+        print(shown if "--no-id" in flags else f"[{nb_id}] {shown}")
+    return 0
+
+
+def cmd_search(args: list[str]) -> int:
+    positionals, options, _ = parse(args)
+    notebook, _ = split_selector(positionals[0])
+    pattern = re.compile(positionals[-1], re.MULTILINE)
+    matches = [
+        (nb_id, path)
+        for nb_id, path in items(notebook, options.get("--type"))
+        if pattern.search(path.read_text())
+    ]
+    for nb_id, path in matches:
+        print(f"[{nb_id}] {path.name}")
+    return 0 if matches else 1
+
+
+def cmd_show(args: list[str]) -> int:
+    positionals, _, _ = parse(args)
+    found = find(*split_selector(positionals[0]))
+    if found is None:
+        return 1
+    sys.stdout.write(found[1].read_text())
+    return 0
+
+
+def cmd_list(args: list[str]) -> int:
+    positionals, _, _ = parse(args)
+    notebook, item = split_selector(positionals[0] if positionals else "home:")
+    if item:
+        return 0 if find(notebook, item) is not None else 1
+    for nb_id, path in items(notebook):
+        print(f"[{nb_id}] {title_of(path)}")
+    return 0
+
+
+def cmd_add(args: list[str]) -> int:
+    positionals, options, _ = parse(args)
+    notebook, item = split_selector(positionals[0] if positionals else "home:")
+    title = options.get("--title")
+    if not item:
+        filetype = options.get("--type", "md")
+        item = f"{(title or 'untitled').lower().replace(' ', '_')}.{filetype}"
+    path = notebook / item
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = options.get("--content", "")
+    path.write_text((f"# {title}\n\n" if title else "") + content + "\n")
+    with open(notebook / ".index", "a") as f:
+        f.write(f"{item}\n")
+    nb_id = len(read_index(notebook))
+    print(f"Added: [{nb_id}] {item}" + (f' "{title}"' if title else ""))
+    return 0
+
+
+def cmd_edit(args: list[str]) -> int:
+    positionals, options, flags = parse(args)
+    found = find(*split_selector(positionals[0]))
+    if found is None:
+        return 1
+    if "--content" not in options:
+        return 0  # Would have opened $EDITOR
+    path = found[1]
+    if "--overwrite" in flags:
+        path.write_text(options["--content"] + "\n")
+    else:
+        with path.open("a") as f:
+            f.write("\n" + options["--content"] + "\n")
+    print(f"Updated: [{found[0]}] {path.name}")
+    return 0
+
+
+def cmd_todos(args: list[str]) -> int:
+    positionals, _, _ = parse(args)
+    notebook, _ = split_selector(positionals[0] if positionals else "home:")
+    name = notebook.name
+    found = False
+    for nb_id, path in items(notebook, "todo.md"):
+        title = title_of(path)
+        if title.startswith("[ ] "):
+            print(f"[{name}:{nb_id}] ✔️ {title}")
+            found = True
+    return 0 if found else 1
+
+
+def cmd_notebooks(args: list[str]) -> int:
+    positionals, _, flags = parse(args)
+    if "--local" in flags:
+        return 1
+    if positionals[:1] == ["add"]:
+        notebook = nb_dir() / positionals[1]
+        notebook.mkdir()
+        (notebook / ".index").touch()
+        print(f"Added: {positionals[1]}")
+        return 0
+    if positionals[:1] == ["show"]:
+        print(nb_dir() / positionals[1])
+        return 0
+    for notebook in sorted(nb_dir().iterdir()):
+        if notebook.is_dir() and not notebook.name.startswith("."):
+            print(notebook.name)
+    return 0
+
+
+def cmd_noop(args: list[str]) -> int:
+    return 0
+
+
+COMMANDS = {
+    "ls": cmd_ls,
+    "search": cmd_search,
+    "show": cmd_show,
+    "list": cmd_list,
+    "add": cmd_add,
+    "edit": cmd_edit,
+    "todos": cmd_todos,
+    "notebooks": cmd_notebooks,
+    "sync": cmd_noop,
+    "open": cmd_noop,
+    "--version": cmd_noop,
+}
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    record("nb", args)
+    if not args:
+        return cmd_ls([])
+    command = COMMANDS.get(args[0])
+    if command is None:
+        print(f"fake nb: unsupported command: {args[0]}", file=sys.stderr)
+        return 2
+    return command(args[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
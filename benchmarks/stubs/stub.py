@@ -0,0 +1,96 @@
+"""stub.py - Stand-ins for the external tools mole shells out to, for the benchmark suite.
+
+Invoked as `stub.py TOOL [args...]` by the wrapper scripts next to it. Every invocation is appended to
+$MOLE_BENCH_RECORD as a line of JSON, then sleeps for $MOLE_BENCH_LATENCY_<TOOL> seconds (see LATENCY for the defaults)
+to stand in for the cost of the real thing, and finally answers just well enough for mole to carry on.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Rough wall time of the real tools on a laptop, in seconds
+LATENCY = {
+    "nb": 0.1,  # Slept by the nb wrapper itself, see ./nb
+    "nb-item": 0.002,  # For every item in a notebook nb lists or searches, see fake_nb.items
+    "zellij": 0.05,
+    "op": 0.4,
+    "ffmpeg": 0.3,
+    "whisper-cli": 1.0,
+    "bat": 0.02,
+}
+
+
+def latency(tool: str) -> float:
+    variable = f"MOLE_BENCH_LATENCY_{tool.upper().replace('-', '_')}"
+    return float(os.environ.get(variable, LATENCY[tool]))
+
+
+def record(tool: str, args: list[str]) -> None:
+    path = os.environ.get("MOLE_BENCH_RECORD")
+    if not path:
+        return
+    line = json.dumps({"tool": tool, "args": args, "time": time.time()}) + "\n"
+    # One write to an O_APPEND file, so concurrent stubs can't interleave their lines
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode())
+    finally:
+        os.close(fd)
+
+
+def zellij(args: list[str]) -> int:
+    if args[:1] == ["list-sessions"]:
+        sessions = os.environ.get("MOLE_BENCH_ZELLIJ_SESSIONS", "")
+        print("\n".join(session for session in sessions.split(",") if session))
+    # Anything else creates or attaches to a session: the handoff, which is where the benchmark stops caring
+    return 0
+
+
+def op(args: list[str]) -> int:
+    if args[:2] == ["user", "get"]:
+        print(
+            json.dumps(
+                {"id": "BENCH", "name": "Bench Mark", "email": "bench@example.com"}
+            )
+        )
+    elif args[:1] == ["item"]:
+        print("stub-credential")
+    return 0
+
+
+def ffmpeg(args: list[str]) -> int:
+    Path(args[-1]).write_bytes(b"")
+    return 0
+
+
+def whisper_cli(args: list[str]) -> int:
+    print("Buy more coffee filters.\nCall the plumber about the kitchen sink.")
+    return 0
+
+
+def bat(args: list[str]) -> int:
+    sys.stdout.write(Path(args[-1]).read_text())
+    return 0
+
+
+TOOLS = {
+    "zellij": zellij,
+    "op": op,
+    "ffmpeg": ffmpeg,
+    "whisper-cli": whisper_cli,
+    "bat": bat,
+}
+
+
+def main() -> int:
+    tool, args = sys.argv[1], sys.argv[2:]
+    record(tool, args)
+    time.sleep(latency(tool))
+    return TOOLS[tool](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
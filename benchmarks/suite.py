@@ -0,0 +1,472 @@
+"""Wall time and subprocess fan-out of mole's common commands, against stub nb, zellij, op, ffmpeg and whisper-cli.
+
+    python benchmarks/suite.py [-n RUNS] [--latency-scale X] [--coprocess] [--backend nb|fs]
+                               [--logs DAYS] [--archive] [-o REPORT] [--baseline REPORT] [scenario ...]
+
+Everything runs against a scratch tree: a generated NB_DIR (see make_tree), a fresh MOLE_CACHE_DIR and HOME, and the
+stubs in benchmarks/stubs first on PATH. The stubs record every invocation and sleep to simulate the real tool (see
+stubs/stub.py for the default latencies, which --latency-scale multiplies; 0 measures mole's own overhead).
+
+CLI scenarios run `python -m mole ...` as a user would. The rest run in this process: `Project.load`, and whack's
+voice memo handling (with the Todoist call replaced by the 1Password lookup it starts with, so no network is involved).
+Syncs are flushed in the foreground, so that their cost is counted against the command that caused them.
+
+The JSON report has, for each scenario, the wall time over the timed runs and the most calls made to each tool by any
+one run. With --baseline, exits with status 1 if any scenario now calls any tool more often than in the baseline
+report, so that fan-out regressions get caught even when wall time is noisy.
+
+nb's listings get slower with every file in a notebook. To see what archiving old logs buys, compare a few years of
+logs with and without it: `--logs 1500 "projects list (cold index)"` against the same with `--archive`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+STUBS = Path(__file__).resolve().parent / "stubs"
+TOOLS = ["nb", "zellij", "op", "ffmpeg", "whisper-cli", "bat"]
+
+PROJECTS = 25  # in the generated home notebook
+LOGS = 30  # days of existing logs in home, by default
+BACKLOG = 4  # voice memos arriving at once, for "whack backlog"
+
+
+@dataclass
+class Result:
+    wall: list[float] = field(default_factory=list)
+    calls: list[Counter] = field(default_factory=list)
+    handoff: list[float] = field(
+        default_factory=list
+    )  # zonein only: seconds until zellij was asked for the session
+
+    def report(self) -> dict:
+        def summary(values: list[float]) -> dict:
+            return {
+                "median": round(statistics.median(values), 4),
+                "min": round(min(values), 4),
+                "max": round(max(values), 4),
+            }
+
+        calls = {tool: max(run[tool] for run in self.calls) for tool in TOOLS}
+        report = {
+            "runs": len(self.wall),
+            "wall_s": summary(self.wall),
+            "calls": {tool: count for tool, count in calls.items() if count},
+        }
+        if self.handoff:
+            report["handoff_s"] = summary(self.handoff)
+        return report
+
+
+class Bench:
+    """The scratch environment, plus helpers for running one scenario iteration in it."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.records = root / "records"
+        self.records.mkdir()
+        self._run = 0
+
+    def record_file(self) -> Path:
+        """Point the stubs at a fresh record file for the next run."""
+        self._run += 1
+        path = self.records / f"{self._run}.jsonl"
+        os.environ["MOLE_BENCH_RECORD"] = str(path)
+        return path
+
+    @staticmethod
+    def read_records(path: Path) -> list[dict]:
+        if not path.exists():
+            return []
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    def mole(
+        self, *args: str, stdin: Optional[str] = None, env: Optional[dict] = None
+    ) -> None:
+        result = subprocess.run(
+            [sys.executable, "-m", "mole", *args],
+            input=(stdin or "").encode(),
+            capture_output=True,
+            cwd=self.root,
+            env={**os.environ, **(env or {})},
+        )
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"mole {' '.join(args)} failed:\n{result.stdout.decode()}{result.stderr.decode()}"
+            )
+
+    def time(
+        self,
+        result: Result,
+        body: Callable[[], object],
+        setup: Optional[Callable[[], object]] = None,
+    ) -> list[dict]:
+        if setup is not None:
+            setup()
+        path = self.record_file()
+        start = time.time()
+        body()
+        result.wall.append(time.time() - start)
+        records = self.read_records(path)
+        result.calls.append(Counter(record["tool"] for record in records))
+        return [{**record, "elapsed": record["time"] - start} for record in records]
+
+
+## The scratch tree
+
+
+def project_name(i: int) -> str:
+    return f"Project {i:02d}"
+
+
+def session_name(i: int) -> str:
+    return f"project-{i:02d}"  # as Project.session_name would have it
+
+
+def make_tree(root: Path, logs: int = LOGS) -> None:
+    """Generate an nb home notebook of projects and logs (one for each of the last `logs` days), a notebook with todos
+    for a few projects, and project dirs."""
+    home = root / "nb" / "home"
+    (home / ".git" / "refs" / "heads").mkdir(parents=True)
+    (home / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (home / ".git" / "refs" / "heads" / "main").write_text("0" * 40 + "\n")
+
+    index = []
+    for i in range(1, PROJECTS + 1):
+        cwd = root / "code" / session_name(i)
+        cwd.mkdir(parents=True)
+        filename = f"{session_name(i)}.project.yaml"
+        body = f"created: 2025-01-{i % 28 + 1:02d} 09:00:00\ncwd: {cwd}\n"
+        if i % 3 == 0:
+            body += "log_dir: logs\n"
+        (home / filename).write_text(f"# {project_name(i)}\n---\n{body}...\n")
+        index.append(filename)
+        if i % 4 == 0:
+            index.append("")  # A deleted item, as nb leaves them
+    today = dt.date.today()
+    for day in range(logs, 0, -1):
+        title = (today - dt.timedelta(days=day)).strftime("%A, %B %d, %Y")
+        (home / f"{title}.log.md").write_text(
+            f"# {title}\n\n## 09:00\n\nEntry for day {day}.\n"
+        )
+        index.append(f"{title}.log.md")
+    (home / ".index").write_text("\n".join(index) + "\n")
+
+    for i in range(1, 5):
+        notebook = root / "nb" / session_name(i)
+        notebook.mkdir()
+        todos = []
+        for t in range(1, 6):
+            state = "x" if t % 2 == 0 else " "
+            filename = f"{t}.todo.md"
+            (notebook / filename).write_text(
+                f"# [{state}] Task {t} of {project_name(i)}\n"
+            )
+            todos.append(filename)
+        (notebook / ".index").write_text("\n".join(todos) + "\n")
+
+    # Whisper.cpp's layout, as far as voicememo.handle_vm cares
+    whisper = root / "whisper.cpp" / "build" / "bin"
+    whisper.mkdir(parents=True)
+    shutil.copy(STUBS / "whisper-cli", whisper / "whisper-cli")
+    (root / "memos").mkdir()
+
+
+## Scenarios
+
+
+def bench_startup(bench: Bench, result: Result) -> None:
+    bench.time(result, lambda: bench.mole("version"))
+
+
+def bench_log(bench: Bench, result: Result) -> None:
+    bench.time(result, lambda: bench.mole("log", stdin="A benchmark entry.\n"))
+
+
+def bench_log_project(bench: Bench, result: Result) -> None:
+    env = {"MOLE_PROJECT": project_name(3)}
+    bench.time(result, lambda: bench.mole("log", stdin="A project entry.\n", env=env))
+
+
+def bench_log_session(bench: Bench, result: Result) -> None:
+    """log --project, from inside a session zonein started (so with its project snapshot)."""
+    from mole.projects import SNAPSHOT_VARIABLE, Project
+
+    env = {
+        "MOLE_PROJECT": project_name(3),
+        SNAPSHOT_VARIABLE: Project.load(project_name(3)).snapshot(),
+    }
+    bench.time(result, lambda: bench.mole("log", stdin="A session entry.\n", env=env))
+
+
+def bench_projects_list(bench: Bench, result: Result) -> None:
+    bench.time(result, lambda: bench.mole("projects", "list"))
+
+
+def bench_projects_list_cold(bench: Bench, result: Result) -> None:
+    def forget_index():
+        (Path(os.environ["MOLE_CACHE_DIR"]) / "projects.json").unlink(missing_ok=True)
+
+    bench.time(result, lambda: bench.mole("projects", "list"), setup=forget_index)
+
+
+def bench_projects_show(bench: Bench, result: Result) -> None:
+    bench.time(
+        result,
+        lambda: bench.mole("projects", "show", project_name(7), "--color", "never"),
+    )
+
+
+def bench_project_load(bench: Bench, result: Result) -> None:
+    from mole import nb
+    from mole.projects import Project
+
+    bench.time(result, lambda: Project.load(project_name(11)), setup=nb.client.clear)
+
+
+def bench_project_load_cold(bench: Bench, result: Result) -> None:
+    from mole import nb, project_index
+    from mole.projects import Project
+
+    def forget():
+        nb.client.clear()
+        project_index.invalidate()
+
+    bench.time(result, lambda: Project.load(project_name(11)), setup=forget)
+
+
+def bench_zonein(bench: Bench, result: Result) -> None:
+    records = bench.time(
+        result, lambda: bench.mole("zonein", project_name(2), "--skip-todo")
+    )
+    handoffs = [
+        r["elapsed"]
+        for r in records
+        if r["tool"] == "zellij" and "--session" in r["args"]
+    ]
+    if handoffs:
+        result.handoff.append(handoffs[0])
+
+
+def stub_voicememo(bench: Bench) -> None:
+    """Point voice memo handling at the whisper.cpp stub, and have it create tasks without Todoist."""
+    from mole import voicememo
+    from mole.secrets import get_secret
+
+    def create_task(title: str, *args, **kwargs) -> int:
+        get_secret("Todoist", "credential", vault="blumeops")
+        return 1
+
+    voicememo.WHISPER_CPP = bench.root / "whisper.cpp"
+    voicememo.create_task = create_task
+
+
+def bench_whack(bench: Bench, result: Result) -> None:
+    from watchdog.events import FileCreatedEvent
+
+    from mole import voicememo
+
+    stub_voicememo(bench)
+    memo = bench.root / "memos" / f"memo-{bench._run}.m4a"
+
+    def handle():
+        with contextlib.redirect_stdout(io.StringIO()):
+            voicememo.VoiceMemoHandler().on_created(FileCreatedEvent(str(memo)))
+
+    bench.time(result, handle, setup=lambda: memo.write_bytes(b"\0" * 1024))
+
+
+def bench_whack_backlog(bench: Bench, result: Result) -> None:
+    """A backlog of memos synced all at once, through whack's queue (with MOLE_WHACK_WORKERS workers, as whack)."""
+    from watchdog.events import FileCreatedEvent
+
+    from mole import voicememo
+
+    stub_voicememo(bench)
+    memos = [bench.root / "memos" / f"backlog-{i}.m4a" for i in range(BACKLOG)]
+
+    def handle():
+        workers = os.environ.get("MOLE_WHACK_WORKERS")
+        queue = voicememo.MemoQueue(int(workers or voicememo.default_workers()))
+        handler = voicememo.VoiceMemoHandler(memos=queue)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for memo in memos:
+                handler.on_created(FileCreatedEvent(str(memo)))
+            queue.join()
+        queue.close()
+
+    def setup():
+        for memo in memos:
+            memo.write_bytes(b"\0" * 1024)
+
+    bench.time(result, handle, setup=setup)
+
+
+SCENARIOS: dict[str, Callable[[Bench, Result], None]] = {
+    "startup": bench_startup,
+    "log": bench_log,
+    "log --project": bench_log_project,
+    "log in session": bench_log_session,
+    "projects list": bench_projects_list,
+    "projects list (cold index)": bench_projects_list_cold,
+    "projects show": bench_projects_show,
+    "Project.load": bench_project_load,
+    "Project.load (cold index)": bench_project_load_cold,
+    "zonein": bench_zonein,
+    "whack voice memo": bench_whack,
+    "whack backlog": bench_whack_backlog,
+}
+
+
+## Driver
+
+
+def configure(root: Path, options: argparse.Namespace) -> None:
+    """Point mole (in this process and in every child) at the scratch tree and the stubs."""
+    os.environ.update(
+        {
+            "HOME": str(root / "home"),
+            "NB_DIR": str(root / "nb"),
+            "MOLE_CACHE_DIR": str(root / "cache"),
+            "MOLE_PROJECT_BACKEND": options.backend,
+            "MOLE_SYNC": "foreground",
+            "MOLE_BENCH_STUBS": str(STUBS),
+            "MOLE_BENCH_PYTHON": sys.executable,
+            "PATH": f"{STUBS}{os.pathsep}{os.environ['PATH']}",
+        }
+    )
+    (root / "home").mkdir()
+    for variable in [
+        "MOLE_PROJECT",
+        "MOLE_PROJECT_SNAPSHOT",
+        "MOLE_TODO",
+        "ZELLIJ_SESSION_NAME",
+        "MOLE_NB_COPROCESS",
+    ]:
+        os.environ.pop(variable, None)
+    if options.coprocess:
+        os.environ["MOLE_NB_COPROCESS"] = "1"
+
+    from stubs.stub import LATENCY
+
+    for tool, seconds in LATENCY.items():
+        os.environ[f"MOLE_BENCH_LATENCY_{tool.upper().replace('-', '_')}"] = str(
+            seconds * options.latency_scale
+        )
+
+
+def regressions(report: dict, baseline: dict) -> list[str]:
+    found = []
+    for name, scenario in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for tool, count in scenario["calls"].items():
+            if count > before["calls"].get(tool, 0):
+                found.append(
+                    f"{name}: {tool} called {count} times, baseline {before['calls'].get(tool, 0)}"
+                )
+    return found
+
+
+def main() -> int:
+    assert __doc__ is not None
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-n", "--runs", type=int, default=5, help="timed runs per scenario"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=1, help="untimed runs per scenario first"
+    )
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument(
+        "--coprocess", action="store_true", help="set MOLE_NB_COPROCESS"
+    )
+    parser.add_argument(
+        "--backend", choices=["nb", "fs"], default="nb", help="MOLE_PROJECT_BACKEND"
+    )
+    parser.add_argument(
+        "--logs",
+        type=int,
+        default=LOGS,
+        help="days of logs in the home notebook (nb lists get slower with every file)",
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="run `mole log archive` on the tree before the scenarios",
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, help="write the report here as well as to stdout"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="fail if any scenario makes more calls than in this report",
+    )
+    parser.add_argument(
+        "scenarios", nargs="*", metavar="scenario", help="default: all of them"
+    )
+    options = parser.parse_args()
+    unknown = set(options.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios {sorted(unknown)}, choose from {[*SCENARIOS]}")
+
+    with tempfile.TemporaryDirectory(prefix="mole-bench-") as tmp:
+        root = Path(tmp)
+        make_tree(root, options.logs)
+        configure(root, options)
+        bench = Bench(root)
+        if options.archive:
+            bench.mole("log", "archive")
+
+        scenarios = {}
+        for name in options.scenarios or SCENARIOS:
+            for _ in range(options.warmup):
+                SCENARIOS[name](bench, Result())
+            result = Result()
+            for _ in range(options.runs):
+                SCENARIOS[name](bench, result)
+            scenarios[name] = result.report()
+
+    report = {
+        "python": platform.python_version(),
+        "runs": options.runs,
+        "latency_scale": options.latency_scale,
+        "coprocess": options.coprocess,
+        "backend": options.backend,
+        "logs": options.logs,
+        "archive": options.archive,
+        "scenarios": scenarios,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if options.output:
+        options.output.write_text(text + "\n")
+
+    if options.baseline:
+        found = regressions(report, json.loads(options.baseline.read_text()))
+        for line in found:
+            print(f"regression: {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""cache.py - Location of mole's on-disk caches."""
+
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+import appdirs
+
+
+def cache_dir() -> Path:
+    """Return mole's cache directory, creating it if necessary.
+
+    Defaults to the platform's user cache dir, but MOLE_CACHE_DIR can be set to point mole somewhere else (handy for tests
+    and benchmarks, which should never touch the real cache).
+    """
+    path = Path(os.environ.get("MOLE_CACHE_DIR") or appdirs.user_cache_dir("mole", ""))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """Hold an exclusive advisory lock on path (created if missing) for the duration of the block.
+
+    Yields whether the lock was acquired, which is always True when blocking.
+    """
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def atomic_write(path: Path, data: Union[str, bytes]) -> None:
+    """Write path by way of a temporary file next to it, so that readers only ever see the old or the new contents."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if isinstance(data, bytes):
+            tmp.write_bytes(data)
+        else:
+            tmp.write_text(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
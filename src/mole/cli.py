@@ -1,24 +1,27 @@
 # -*- coding: utf-8 -*-
 import os
 import subprocess
-import sys
 from typing import Optional
 
 import typer
-from rich.console import Console
-from rich.table import Table
 
-from .notebook import Logbook
-from .projects import Project, ToDo
-from .projects import app as project_app
-from .secrets import get_secret
-from .whack import whack
-from .zonein import zonein
+from .lazy_group import lazy_group
 
+# Commands that live in their own (heavy) modules are imported only when dispatched, see lazy_group.py. Everything
+# defined in this file should likewise import what it needs inside the command body.
 app = typer.Typer(
     name="mole",
     help="Mole is a tool for automating my life.",
     no_args_is_help=True,
+    cls=lazy_group(
+        {
+            "projects": "mole.projects:app",
+            "log": "mole.notebook:app",
+            "zonein": "mole.zonein:zonein",
+            "whack": "mole.whack:whack",
+            "trace": "mole.tracing:app",
+        }
+    ),
 )
 
 
@@ -33,6 +36,9 @@ def version():
 @app.command()
 def health():
     """Run health checks for this mole instance"""
+    from rich.console import Console
+    from rich.table import Table
+
     from .health import health_checks
 
     def _make_table():
@@ -65,47 +71,27 @@ def health():
 
 
 @app.command()
-def log(
-    entry_text: Optional[str] = typer.Argument(None),
-    subtitle: Optional[str] = typer.Option(None, "--subtitle", "-s"),
-    project: Optional[str] = typer.Argument(None, envvar="MOLE_PROJECT"),
-    todo: Optional[str] = typer.Argument(None, envvar="MOLE_TODO"),
+def todos(
+    project: Optional[str] = typer.Option(
+        None, "--project", "-p", help="Only list this project's todos"
+    ),
+    include_done: bool = typer.Option(
+        False, "--all", "-a", help="Include todos that are done"
+    ),
 ):
-    """Add an entry to the daily log.
-
-    If project is specified, the log will be created in that projects' notebook. (A notebook will be created if one did not exist.)
+    """List the open todos across every project.
 
-    If todo is further specified beyond project, then the log will instead be created as a subheading (h2) of that todo in the corresponding project. This overrides the project log destination.
+    Todos are read from the todo index (see todo_index.py), which only looks at notebooks and files that changed since
+    the last time it was used, so this doesn't run nb at all.
     """
-    if project is None:
-        logbook = Logbook(project=None)
-    elif todo is None:
-        logbook = Logbook(project=Project.load(project))
-    else:
-        logbook = Logbook(project=Project.load(project), todo=ToDo.from_label(todo))
-
-    # Check if stdin has data
-    if not sys.stdin.isatty():
-        if entry_text:
-            typer.echo("🐭 Error: stdin and entry_text are mutually exclusive")
-            raise typer.Exit(1)
-        entry_text = "".join(sys.stdin.readlines())
-        logbook.append_log(entry_text, preamble=subtitle)
-    else:
-        if entry_text:
-            logbook.append_log(
-                entry_text, preamble=subtitle or ""
-            )  # None signals to print no header
-        else:
-            if todo is not None and subtitle is None:
-                # Special case for todos, where we always want to print a header as they are subheadings
-                subtitle = ""
-            logbook.edit_log(preamble=subtitle)
-
-
-app.add_typer(project_app, name="projects")
-app.command()(zonein)
-app.command()(whack)
+    from .projects import Project
+    from .todo_index import TodoIndex
+
+    notebook = Project.load(project).session_name if project else None
+    for entry in TodoIndex.load().entries(notebook):
+        if entry.done and not include_done:
+            continue
+        typer.echo(f"{entry.line}  ({entry.project})" if entry.project else entry.line)
 
 
 @app.command(
@@ -113,6 +99,8 @@ app.command()(whack)
 )
 def svcrun(ctx: typer.Context):
     """Execute a command by wrapping it with a service account token. Any arguments are processed as a command."""
+    from .secrets import get_secret
+
     # TODO figure out how to get the --help to show COMMAND... instead of just [OPTIONS]
     command = ctx.args
     if not command:
@@ -140,6 +128,32 @@ def svcrun(ctx: typer.Context):
         raise typer.Exit(1)
 
 
+@app.command()
+def sync(
+    flush: bool = typer.Option(
+        False, "--flush", help="Sync now, waiting for any background sync to finish"
+    ),
+    delay: float = typer.Option(0.0, "--delay", hidden=True),
+):
+    """Show the notebooks waiting on `nb sync`, or sync them now with --flush.
+
+    Writes only mark notebooks dirty, and a background `mole sync --flush` syncs them shortly after the writing command
+    exits. See sync.py for details.
+    """
+    from .sync import flush as flush_pending
+    from .sync import pending
+
+    if not flush:
+        notebooks = pending()
+        typer.echo(", ".join(sorted(notebooks)) if notebooks else "Nothing to sync")
+        return
+    try:
+        flush_pending(delay=delay, wait=delay == 0)
+    except RuntimeError as e:
+        typer.echo(f"🐭 Error: {e}")
+        raise typer.Exit(1)
+
+
 @app.command()
 def todoist(task: str):
     """Add a task to the todo list in todoist. Has no relation to 'tasks' command."""
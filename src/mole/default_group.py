@@ -0,0 +1,27 @@
+"""default_group.py - A Typer group that runs a default subcommand when it isn't given one.
+
+This lets a command grow subcommands without breaking how it was used before: `mole log "some text"` still adds an
+entry, because "some text" isn't the name of a subcommand, while `mole log search ...` searches. (To log the word
+"search" itself, name the default command explicitly: `mole log add search`.)
+"""
+
+import click
+from typer.core import TyperGroup
+
+
+class DefaultTyperGroup(TyperGroup):
+    """Set `default_command` on a subclass, see `default_group`."""
+
+    default_command: str = ""
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if not args or (
+            args[0] not in self.commands and args[0] not in ctx.help_option_names
+        ):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+def default_group(command: str) -> type[DefaultTyperGroup]:
+    """Return a group class to pass as `typer.Typer(cls=...)`."""
+    return type("DefaultTyperGroup", (DefaultTyperGroup,), {"default_command": command})
@@ -0,0 +1,203 @@
+"""journal.py - Serialized, timestamp-ordered writes to the markdown logs, safe with any number of concurrent writers.
+
+The log pane in every zellij session, zonein's headers and footers and scripted `mole log` calls all write to the same
+daily logs. Rather than each of them editing the markdown, writers store a record (what to write, where, and when it
+happened) in the log store (see log_store.py), tagged with the journal of the log's notebook. Then they try to become
+the notebook's merger, which renders the journal's unrendered records into the markdown in timestamp order, a file at a
+time. Only one merger per notebook runs at once, and it keeps going until there's nothing left to render, so a writer
+that finds a merger already running just leaves its record to it and returns. The same pattern as the sync flusher, see
+sync.py.
+
+The store and the mergers' locks live in the mole cache dir, not in the notebooks, so nb never sees (or syncs) them. If
+a merger dies part way through, the records it was rendering are rendered again by the next one: an entry may be
+written twice, but never lost.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import os
+from collections import defaultdict
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from pydantic import BaseModel
+
+from . import log_store, nb, tracing
+from .cache import cache_dir, file_lock
+
+
+class JournalRecord(BaseModel):
+    timestamp: float  # When the entry happened, in seconds since the epoch
+    content: str  # The markdown to write
+    # What the entry is, for querying the store (see log_store.py)
+    project: Optional[str] = None
+    todo: Optional[str] = None
+    subtitle: Optional[str] = None
+    body: Optional[str] = None
+    # Either the log file to append to, with the title to give it should it need creating...
+    path: Optional[str] = None
+    title: Optional[str] = None
+    # ... or, when the file couldn't be resolved, the nb selector to `nb edit` instead
+    selector: Optional[str] = None
+
+    @property
+    def target(self) -> str:
+        return self.path or self.selector or ""
+
+
+def journal_dir() -> Path:
+    path = cache_dir() / "journal"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def journal_name(record: JournalRecord) -> str:
+    """Name the journal a record belongs in, which is one per notebook."""
+    if record.path is not None:
+        return notebook_journal(notebook_root(Path(record.path)))
+    notebook, colon, _ = (record.selector or "").partition(":")
+    return f"nb-{notebook if colon else 'current'}"
+
+
+def notebook_journal(root: Path) -> str:
+    """Name the journal of the notebook at root."""
+    digest = hashlib.sha1(str(root).encode()).hexdigest()[:10]
+    return f"{root.name}-{digest}"
+
+
+def notebook_root(path: Path) -> Path:
+    """The notebook a file is in: the topmost of the directories above it that nb indexes."""
+    directory = path.parent
+    while not (directory / ".index").is_file() and directory != directory.parent:
+        directory = directory.parent
+    while (directory.parent / ".index").is_file():
+        directory = directory.parent
+    return directory
+
+
+def submit(records: Iterable[JournalRecord]) -> set[str]:
+    """Store records without merging them, returning the names of the journals written to."""
+    rows = [
+        {**record.model_dump(), "notebook": journal_name(record)} for record in records
+    ]
+    log_store.insert(rows)
+    return {row["notebook"] for row in rows}
+
+
+def write(record: JournalRecord) -> None:
+    """Store a record and merge its notebook's journal, unless another process is already doing that."""
+    for name in submit([record]):
+        merge(name)
+
+
+@contextmanager
+def merging_held(name: str) -> Iterator[None]:
+    """Act as the named journal's merger for the duration of the block, so nothing else writes the notebook's logs.
+
+    Whatever gets journaled in the meantime is merged once the block is done.
+    """
+    with file_lock(journal_dir() / f"{name}.merger"):
+        yield
+    merge(name)
+
+
+def merge(name: str, wait: bool = False) -> bool:
+    """Render everything unrendered in the named journal into the markdown, until there's nothing left.
+
+    If another merger is already running, either wait for it to finish first (wait=True) or return False without doing
+    anything: it will pick up whatever is in the journal before it stops.
+    """
+    with open(journal_dir() / f"{name}.merger", "a") as merger:
+        try:
+            fcntl.flock(merger, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+
+        with closing(log_store.connect()) as conn:
+            while True:
+                conn.execute("begin immediate")
+                rows = log_store.pending(conn, name)
+                if not rows:
+                    # Let go of the merger lock while still holding the store's write lock: any writer that stores a
+                    # record after this point will find no merger running and become one.
+                    fcntl.flock(merger, fcntl.LOCK_UN)
+                    conn.execute("commit")
+                    return True
+                conn.execute("commit")
+                with tracing.span("journal merge", notebook=name, records=len(rows)):
+                    fold([JournalRecord.model_validate(dict(row)) for row in rows])
+                log_store.mark_rendered(conn, name, rows[-1]["id"])
+
+
+def fold(records: list[JournalRecord]) -> None:
+    """Write records out, each target once, with its entries in timestamp order (and journal order for ties)."""
+    by_target: dict[str, list[JournalRecord]] = defaultdict(list)
+    for record in records:
+        by_target[record.target].append(record)
+    for target, group in by_target.items():
+        group.sort(key=lambda record: record.timestamp)
+        content = "\n\n".join(record.content for record in group)
+        first = group[0]
+        if first.path is not None:
+            append_to_log(
+                Path(first.path), first.title or Path(first.path).name, content
+            )
+        else:
+            nb.run("edit", target, "--content", content)
+
+
+def append_to_log(path: Path, title: str, content: str) -> None:
+    """Append content to the log at path the way `nb edit --content` would, creating the log first if it's missing.
+
+    The content goes out in a single O_APPEND write followed by an fsync, so a concurrent writer can't interleave with
+    it and it has hit the disk by the time the sync that commits it runs.
+    """
+    if not path.exists():
+        create_log(path, title)
+    fd = os.open(path, os.O_RDWR | os.O_APPEND)
+    try:
+        size = os.fstat(fd).st_size
+        separator = "\n" if size and os.pread(fd, 1, size - 1) != b"\n" else ""
+        os.write(fd, f"{separator}\n{content}\n".encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def create_log(path: Path, title: str) -> None:
+    """Create a titled log file and list it in nb's index, unless someone else beat us to it."""
+    ensure_folder(path.parent)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return
+    try:
+        os.write(fd, f"# {title}\n".encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    add_to_index(path.parent, path.name)
+
+
+def ensure_folder(folder: Path) -> None:
+    """Make sure folder exists as an nb folder, with its own `.index` and listed in its parent's."""
+    if (folder / ".index").is_file():
+        return
+    ensure_folder(folder.parent)
+    folder.mkdir(exist_ok=True)
+    (folder / ".index").touch()
+    add_to_index(folder.parent, folder.name)
+
+
+def add_to_index(folder: Path, name: str) -> None:
+    """Give name the next id in folder's `.index`, the way nb does when it adds an item."""
+    fd = os.open(folder / ".index", os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        size = os.fstat(fd).st_size
+        separator = "\n" if size and os.pread(fd, 1, size - 1) != b"\n" else ""
+        os.write(fd, f"{separator}{name}\n".encode())
+    finally:
+        os.close(fd)
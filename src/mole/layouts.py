@@ -0,0 +1,186 @@
+"""layouts.py - zellij layouts for projects, generated once and kept on disk.
+
+A project's layout is rendered from a base template (mole's own, or the user's `layouts/default.kdl` in the mole config
+dir) and written to the layouts folder of the cache dir, under a name that includes a hash of everything that went into
+it: the template, the project's name and its `zellij_layout` and `poetry` settings. So zonein hands zellij the same path
+for as long as none of those change, and the layout is only rendered (and its template checked) when one does.
+
+Templates are KDL with `$name`-style placeholders (see string.Template), since KDL's braces rule out str.format. The
+placeholders are:
+
+- `$name`: the project's name
+- `$main_pane`: the pane the project's shell runs in (`poetry shell` for poetry projects)
+- `$shell`: the user's $SHELL, which the tasks pane runs
+
+Any other `$` has to be doubled, as in `$$SHELL`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import textwrap
+from pathlib import Path
+from string import Template
+from typing import TYPE_CHECKING
+
+import appdirs
+
+from .cache import atomic_write, cache_dir
+
+if TYPE_CHECKING:
+    from .projects import Project
+
+# Bump whenever DEFAULT_TEMPLATE or the placeholders change, to orphan every cached layout
+TEMPLATE_VERSION = 1
+PLACEHOLDERS = {"name", "main_pane", "shell"}
+
+DEFAULT_TEMPLATE = textwrap.dedent(
+    """\
+    layout {
+            tab_template name="molebar" {
+                    pane size=1 borderless=true {
+                            plugin location="zellij:tab-bar"
+                    }
+                    pane split_direction="vertical" {
+                            pane size="60%" name="main" {
+                                    children
+                            }
+
+                            pane stacked=true name="molestack" {
+                                    pane name="log" focus=true {
+                                            command "mole"
+                                            args "log"
+                                    }
+                                    pane name="tasks" {
+                                            command "$shell"
+                                            args "-c" "exec $$SHELL -i"
+                                    }
+                            }
+                    }
+
+                    pane size=2 borderless=true {
+                            plugin location="zellij:status-bar"
+                    }
+            }
+
+            default_tab_template {
+                    pane size=1 borderless=true {
+                            plugin location="zellij:tab-bar"
+                    }
+
+                    children
+
+                    pane size=2 borderless=true {
+                            plugin location="zellij:status-bar"
+                    }
+            }
+
+            molebar name="Project: $name" {
+                $main_pane
+            }
+    }
+    session_serialization false
+    """
+)
+
+POETRY_PANE = textwrap.dedent(
+    """\
+    pane {
+        command "poetry"
+        args "shell"
+    }"""
+)
+
+
+class TemplateError(ValueError):
+    """A layout template that can't be rendered."""
+
+
+def config_dir() -> Path:
+    """Return mole's config directory, which MOLE_CONFIG_DIR overrides (as MOLE_CACHE_DIR does the cache's)."""
+    return Path(
+        os.environ.get("MOLE_CONFIG_DIR") or appdirs.user_config_dir("mole", "")
+    )
+
+
+def user_template_path() -> Path:
+    return config_dir() / "layouts" / "default.kdl"
+
+
+def layouts_dir() -> Path:
+    path = cache_dir() / "layouts"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def template_source() -> str:
+    """The base template: the user's, if they have one, otherwise mole's."""
+    try:
+        return user_template_path().read_text()
+    except FileNotFoundError:
+        return DEFAULT_TEMPLATE
+
+
+def substitutions(project: Project) -> dict[str, str]:
+    return {
+        "name": project.name,
+        "main_pane": POETRY_PANE if project.data.poetry else "pane",
+        "shell": os.environ.get("SHELL", "bash"),
+    }
+
+
+def render(project: Project, source: str) -> str:
+    """Fill in the template for the project, checking it first. Raises TemplateError if it's unusable."""
+    if project.data.zellij_layout is not None:
+        return project.data.zellij_layout
+
+    template = Template(source)
+    if not template.is_valid():
+        raise TemplateError("the layout template has a malformed placeholder")
+    unknown = set(template.get_identifiers()) - PLACEHOLDERS
+    if unknown:
+        raise TemplateError(
+            f"unknown placeholders in the layout template: {sorted(unknown)}"
+        )
+    layout = template.substitute(substitutions(project))
+    check_braces(layout)
+    return layout
+
+
+def check_braces(layout: str) -> None:
+    """A light sanity check of the KDL, enough to catch a mangled template before zellij does."""
+    depth = 0
+    for line_number, line in enumerate(layout.splitlines(), start=1):
+        line = re.sub(r'"(\\.|[^"\\])*"', '""', line).split("//")[0]
+        depth += line.count("{") - line.count("}")
+        if depth < 0:
+            raise TemplateError(f"unbalanced '}}' on line {line_number} of the layout")
+    if depth != 0:
+        raise TemplateError("unclosed '{' in the layout")
+
+
+def layout_key(project: Project, source: str) -> str:
+    """Hash everything the project's layout is rendered from."""
+    digest = hashlib.sha256(f"{TEMPLATE_VERSION}\0{source}".encode())
+    digest.update(repr(sorted(substitutions(project).items())).encode())
+    digest.update(repr(project.data.zellij_layout).encode())
+    return digest.hexdigest()[:16]
+
+
+def layout_file(project: Project) -> Path:
+    """Return the path of the project's layout, rendering it first if it isn't cached yet.
+
+    Layouts rendered for the project from older inputs are removed, so there's one file per project.
+    """
+    source = template_source()
+    path = layouts_dir() / f"{project.session_name}.{layout_key(project, source)}.kdl"
+    if path.exists():
+        return path
+
+    atomic_write(path, render(project, source))
+    for stale in path.parent.glob(f"{project.session_name}.*.kdl"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
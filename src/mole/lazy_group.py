@@ -0,0 +1,52 @@
+"""lazy_group.py - A Typer group whose subcommands are only imported when they are dispatched.
+
+Importing every subcommand up front drags in pydantic, pendulum, yaml, watchdog, requests and friends, which costs far
+more than most commands spend actually running. A lazy group instead registers subcommands by import path, e.g.
+"mole.zonein:zonein", and imports them the first time click asks for them. `--help` still lists every command, it
+just pays for the imports.
+"""
+
+import importlib
+from typing import Optional
+
+import click
+import typer
+from typer.core import DEFAULT_MARKUP_MODE, TyperGroup
+
+
+class LazyTyperGroup(TyperGroup):
+    """Set `lazy_subcommands` (name -> "module:attribute") on a subclass, see `lazy_group`.
+
+    The attribute can be a typer.Typer app (becoming a command group) or a plain function (becoming a single command).
+    """
+
+    lazy_subcommands: dict[str, str] = {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return [*super().list_commands(ctx), *self.lazy_subcommands]
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name in self.lazy_subcommands and cmd_name not in self.commands:
+            self.add_command(load_command(cmd_name, self.lazy_subcommands[cmd_name]))
+        return super().get_command(ctx, cmd_name)
+
+
+def lazy_group(subcommands: dict[str, str]) -> type[LazyTyperGroup]:
+    """Return a group class to pass as `typer.Typer(cls=...)`."""
+    return type("LazyTyperGroup", (LazyTyperGroup,), {"lazy_subcommands": subcommands})
+
+
+def load_command(name: str, import_path: str) -> click.Command:
+    module_name, attribute = import_path.split(":")
+    module = importlib.import_module(module_name)
+    target = getattr(module, attribute)
+    if isinstance(target, typer.Typer):
+        command = typer.main.get_group(target)
+    else:
+        command = typer.main.get_command_from_info(
+            typer.models.CommandInfo(name=name, callback=target),
+            pretty_exceptions_short=True,
+            rich_markup_mode=DEFAULT_MARKUP_MODE,
+        )
+    command.name = name
+    return command
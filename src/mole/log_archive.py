@@ -0,0 +1,120 @@
+"""log_archive.py - Roll old daily logs up into monthly or yearly bundles, to keep the notebooks small.
+
+Every day with an entry leaves a `<Weekday, Month DD, YYYY>.log.md` behind, and nb's listings (which the projects and
+todos lean on when run through nb) slow down with every file in a notebook. Archiving concatenates the logs older than a
+cutoff into one `<YYYY-MM>.archive.log.md` (or `<YYYY>.archive.log.md`) per period, in date order and otherwise as
+they were, so each day's `# Weekday, Month DD, YYYY` title and its `##` entries stay intact. log_search.py indexes the
+bundles by those titles, so archived entries remain searchable under their own dates.
+
+The archived days are removed, leaving blank lines in nb's `.index` the way deleting them through nb would (ids are
+never reused), and the bundle is indexed in their place. All of it happens while holding the notebook's journal merger
+(see journal.py), so no log write can land in a day while it's being archived.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from . import journal, sync
+from .log_reader import log_date
+
+SUFFIX = ".archive.log.md"
+
+
+class Period(str, Enum):
+    month = "month"
+    year = "year"
+
+
+PERIODS = {Period.month.value: "%Y-%m", Period.year.value: "%Y"}
+
+
+@dataclass
+class Bundle:
+    path: Path
+    days: list[Path] = field(default_factory=list)  # In date order
+
+
+def bundle_path(folder: Path, day: dt.date, period: str) -> Path:
+    return folder / f"{day.strftime(PERIODS[period])}{SUFFIX}"
+
+
+def nb_folders(notebook: Path) -> Iterator[Path]:
+    """The notebook and every folder in it that nb knows about (those with their own `.index`), except hidden ones."""
+    yield notebook
+    for index in sorted(notebook.rglob(".index")):
+        folder = index.parent
+        if folder != notebook and not any(
+            part.startswith(".") for part in folder.relative_to(notebook).parts
+        ):
+            yield folder
+
+
+def plan(folder: Path, before: dt.date, period: str = "month") -> list[Bundle]:
+    """Work out which of a folder's daily logs (those dated before `before`) go into which bundle."""
+    bundles: dict[Path, Bundle] = {}
+    days = []
+    for path in folder.glob("*.log.md"):
+        day = log_date(path)
+        if day is not None and day < before:
+            days.append((day, path))
+    for day, path in sorted(days):
+        target = bundle_path(folder, day, period)
+        bundles.setdefault(target, Bundle(path=target)).days.append(path)
+    return [*bundles.values()]
+
+
+def write_bundle(bundle: Bundle) -> None:
+    """Add the bundle's days to the end of it (creating it if need be), then remove them."""
+    parts = [bundle.path.read_text().rstrip()] if bundle.path.exists() else []
+    parts.extend(day.read_text().rstrip() for day in bundle.days)
+    temporary = bundle.path.with_name(f".{bundle.path.name}.tmp")
+    with open(temporary, "w") as f:
+        f.write("\n\n".join(parts) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, bundle.path)
+    for day in bundle.days:
+        day.unlink()
+
+
+def reindex(folder: Path, bundles: list[Bundle]) -> None:
+    """Blank out the archived days' lines in the folder's `.index`, and list any new bundles."""
+    index = folder / ".index"
+    archived = {day.name for bundle in bundles for day in bundle.days}
+    lines = index.read_text().splitlines()
+    listed = set(lines)
+    lines = ["" if line in archived else line for line in lines]
+    lines.extend(
+        bundle.path.name for bundle in bundles if bundle.path.name not in listed
+    )
+    temporary = folder / ".index.tmp"
+    temporary.write_text("".join(f"{line}\n" for line in lines))
+    os.replace(temporary, index)
+
+
+def archive(
+    notebooks: Iterable[Path], before: dt.date, period: str = "month"
+) -> dict[Path, list[Bundle]]:
+    """Archive the daily logs dated before `before` in every folder of the given notebooks.
+
+    Returns the bundles written to, by folder. Notebooks that had anything archived are marked for syncing.
+    """
+    done: dict[Path, list[Bundle]] = {}
+    for notebook in notebooks:
+        with journal.merging_held(journal.notebook_journal(notebook)):
+            for folder in nb_folders(notebook):
+                bundles = plan(folder, before, period)
+                if not bundles:
+                    continue
+                for bundle in bundles:
+                    write_bundle(bundle)
+                reindex(folder, bundles)
+                done[folder] = bundles
+                sync.mark_dirty(notebook.name)
+    return done
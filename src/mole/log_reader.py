@@ -0,0 +1,186 @@
+"""log_reader.py - Read logs back from the end, a chunk at a time, and follow them as they grow.
+
+Logs only ever grow at the end and the interesting part is almost always the most recent, so the reader seeks to the end
+of a log and walks backwards through it in fixed-size chunks, splitting it into the `##` entries that
+Logbook.make_header writes. Older days are found next to the day's log by their `<Weekday, Month DD, YYYY>.log.md`
+names, so reading the last few entries never means reading (or listing through nb) more than it needs to.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+import pendulum
+from pendulum import DateTime
+
+CHUNK_SIZE = 64 * 1024
+# seconds between checks for a new day's log, even without file events
+FOLLOW_INTERVAL = 30.0
+
+TITLE_FORMAT = "%A, %B %d, %Y"
+TIME = re.compile(r"\b(\d{2}):(\d{2})\b")
+
+
+@dataclass(frozen=True)
+class Entry:
+    when: Optional[DateTime]  # None for logs (like todos) that aren't dated
+    text: str  # The entry as written, header included
+
+
+def reverse_lines(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yield the lines of a file last to first, without their newlines, reading chunk_size bytes at a time."""
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        partial = b""
+        first = True
+        while position > 0:
+            size = min(chunk_size, position)
+            position -= size
+            f.seek(position)
+            chunk = f.read(size) + partial
+            lines = chunk.split(b"\n")
+            partial = lines.pop(0)  # May continue in the previous chunk
+            if first and lines and lines[-1] == b"":
+                lines.pop()  # The file's final newline doesn't start another line
+            first = False
+            for line in reversed(lines):
+                yield line.decode(errors="replace")
+        if partial or not first:
+            yield partial.decode(errors="replace")
+
+
+def log_date(path: Path) -> Optional[dt.date]:
+    """The day a log is for, going by its name."""
+    try:
+        return dt.datetime.strptime(
+            path.name.removesuffix(".log.md"), TITLE_FORMAT
+        ).date()
+    except ValueError:
+        return None
+
+
+def entry_time(day: Optional[dt.date], header: str) -> Optional[DateTime]:
+    if day is None:
+        return None
+    match = TIME.search(header)
+    hour, minute = (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+    return pendulum.datetime(day.year, day.month, day.day, hour, minute, tz="local")
+
+
+def entries_reversed(path: Path) -> Iterator[Entry]:
+    """Yield a log's `##` entries, last to first. Anything above the first entry (such as the title) is skipped."""
+    day = log_date(path)
+    lines: list[str] = []
+    for line in reverse_lines(path):
+        lines.append(line)
+        if line.startswith("## "):
+            text = "\n".join(reversed(lines)).rstrip()
+            yield Entry(when=entry_time(day, line), text=text)
+            lines = []
+
+
+def history(path: Path) -> list[Path]:
+    """The log at path and the logs of every earlier day kept next to it, newest first.
+
+    Logs that aren't named for a day (like todos) have no history beyond themselves.
+    """
+    day = log_date(path)
+    if day is None:
+        return [path] if path.exists() else []
+    dated = []
+    for candidate in path.parent.glob("*.log.md"):
+        candidate_day = log_date(candidate)
+        if candidate_day is not None and candidate_day <= day:
+            dated.append((candidate_day, candidate))
+    return [candidate for _, candidate in sorted(dated, reverse=True)]
+
+
+def tail(
+    paths: Iterable[Path], count: Optional[int] = None, since: Optional[DateTime] = None
+) -> list[tuple[Path, Entry]]:
+    """The last count entries, or every entry since a moment, across logs given newest first. Returned oldest first."""
+    found: list[tuple[Path, Entry]] = []
+    for path in paths:
+        for entry in entries_reversed(path):
+            if since is not None and entry.when is not None and entry.when < since:
+                return found[::-1]
+            found.append((path, entry))
+            if count is not None and len(found) >= count:
+                return found[::-1]
+    return found[::-1]
+
+
+def copy_from(path: Path, offset: int, write: Callable[[str], object]) -> int:
+    """Write out whatever path holds past offset, returning the new offset. Starts over if the file shrank."""
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return 0
+    if size < offset:
+        offset = 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while chunk := f.read(CHUNK_SIZE):
+            offset += len(chunk)
+            write(chunk.decode(errors="replace"))
+    return offset
+
+
+def follow(
+    current: Callable[[], Path],
+    write: Callable[[str], object],
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """Write out everything appended to the log from now on, until stop is set (or forever).
+
+    current is asked for the log to follow whenever something changes (and every FOLLOW_INTERVAL seconds regardless),
+    so that following today's log carries on into tomorrow's. Until the log's folder exists (e.g. a project's log_dir
+    before its first entry), the nearest folder above it that does is watched instead.
+    """
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    stop = stop or threading.Event()
+    changed = threading.Event()
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event: FileSystemEvent) -> None:
+            changed.set()
+
+    path = current()
+    offset = path.stat().st_size if path.exists() else 0
+    observer = Observer()
+    watched = watched_folder(path)
+    observer.schedule(Handler(), str(watched), recursive=watched != path.parent)
+    observer.start()
+    try:
+        while not stop.is_set():
+            changed.wait(timeout=FOLLOW_INTERVAL)
+            changed.clear()
+            latest = current()
+            if latest != path:
+                path, offset = latest, 0
+            if watched_folder(path) != watched:
+                watched = watched_folder(path)
+                observer.unschedule_all()
+                observer.schedule(
+                    Handler(), str(watched), recursive=watched != path.parent
+                )
+            offset = copy_from(path, offset, write)
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def watched_folder(path: Path) -> Path:
+    """The folder to watch for changes to path: its own, or the nearest one above it that exists."""
+    folder = path.parent
+    while not folder.is_dir() and folder != folder.parent:
+        folder = folder.parent
+    return folder
@@ -0,0 +1,253 @@
+"""log_search.py - Full-text search over every `*.log.md` in the nb notebooks, backed by SQLite FTS5.
+
+That's every global notebook, plus every local notebook mole has come across (those in the notebook registry, see
+notebook_registry.py), which are named by their path.
+
+Each log is split into entries at the `##` headers that Logbook.make_header writes, and each entry is indexed with its
+heading, its body, and the date from the `# Weekday, Month DD, YYYY` title of its day. The index lives in the mole cache
+dir and is refreshed before every search, re-reading only the files whose mtime or size changed since the last one.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Collection, Iterable, Iterator, Optional
+
+from sqlite_utils.db import Database
+
+from .cache import cache_dir
+from .chores import get_table
+from .notebook_registry import NotebookRegistry
+from .project_backends import notebook_dir
+
+FILES_TABLE = "log_files"
+ENTRIES_TABLE = "log_entries"
+
+HEADER = re.compile(r"^## (.*)$", re.MULTILINE)
+TITLE = re.compile(r"^# (.*)$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class LogEntry:
+    heading: str
+    body: str
+    position: int  # Index of the entry in its log
+    # ISO format, from the title of the day the entry is under
+    date: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    path: str
+    notebook: str
+    date: Optional[str]
+    heading: str
+    snippet: str
+
+
+def title_date(title: str) -> Optional[dt.date]:
+    """The date in a `# Weekday, Month DD, YYYY` title, if that's what it is."""
+    try:
+        return dt.datetime.strptime(title.strip(), "%A, %B %d, %Y").date()
+    except ValueError:
+        return None
+
+
+def parse_log(text: str) -> tuple[Optional[str], list[LogEntry]]:
+    """Split a log into its date (ISO format, if the title is a date) and its `##` entries.
+
+    Anything before the first `##` header other than the title is kept as an entry with an empty heading. Archive
+    bundles (see log_archive.py) hold many days, each under its own title, and their entries get the date of their day.
+    """
+    title, _, rest = text.partition("\n")
+    if not title.startswith("# ") or title_date(title[2:]) is not None:
+        rest = text  # No title to drop, or the first of the day titles handled below
+
+    # Each day title starts a new section
+    sections = []
+    start, date = 0, None
+    for match in TITLE.finditer(rest):
+        day = title_date(match.group(1))
+        if day is None:
+            continue
+        sections.append((date, rest[start : match.start()]))
+        start, date = match.end(), day.isoformat()
+    sections.append((date, rest[start:]))
+
+    entries: list[LogEntry] = []
+    for date, section in sections:
+        headers = [*HEADER.finditer(section)]
+        preamble = section[: headers[0].start() if headers else len(section)].strip()
+        if preamble:
+            entries.append(
+                LogEntry(heading="", body=preamble, position=len(entries), date=date)
+            )
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(section)
+            entries.append(
+                LogEntry(
+                    heading=header.group(1).strip(),
+                    body=section[header.end() : end].strip(),
+                    position=len(entries),
+                    date=date,
+                )
+            )
+    dates = [date for date, _ in sections if date is not None]
+    return (dates[0] if dates else None), entries
+
+
+def log_files(
+    root: Path, local_notebooks: Iterable[Path] = ()
+) -> Iterator[tuple[str, Path]]:
+    """Every log under the nb root and in the given local notebooks, with the notebook it belongs to.
+
+    Global notebooks are named as nb names them, local ones by their path. Hidden directories (like .git) are skipped.
+    """
+    for notebook in sorted(root.iterdir()):
+        if not notebook.name.startswith(".") and notebook.is_dir():
+            yield from ((notebook.name, path) for path in notebook_logs(notebook))
+    for notebook in sorted(set(local_notebooks)):
+        if (notebook / ".index").is_file():
+            yield from ((str(notebook), path) for path in notebook_logs(notebook))
+
+
+def notebook_logs(notebook: Path) -> Iterator[Path]:
+    for path in notebook.rglob("*.log.md"):
+        if not any(part.startswith(".") for part in path.relative_to(notebook).parts):
+            yield path
+
+
+def known_local_notebooks() -> list[Path]:
+    """The local notebooks in the notebook registry, i.e. those found in a directory mole was run from."""
+    entries = NotebookRegistry.load().local_notebooks.values()
+    return [Path(entry.notebook) for entry in entries if entry.notebook is not None]
+
+
+@dataclass
+class LogSearch:
+    db: Database
+
+    @classmethod
+    def from_sqlite_file(cls, path: Optional[Path] = None) -> LogSearch:
+        return cls(db=Database(path or cache_dir() / "logs.db"))
+
+    @classmethod
+    def from_volatile_memory(cls) -> LogSearch:
+        return cls(db=Database(memory=True))
+
+    def __post_init__(self) -> None:
+        files = get_table(self.db, FILES_TABLE)
+        if not files.exists():
+            files.create(
+                {"path": str, "notebook": str, "mtime_ns": int, "size": int},
+                pk="path",
+            )
+        entries = get_table(self.db, ENTRIES_TABLE)
+        if not entries.exists():
+            entries.create(
+                {
+                    "id": int,
+                    "path": str,
+                    "notebook": str,
+                    "date": str,
+                    "position": int,
+                    "heading": str,
+                    "body": str,
+                },
+                pk="id",
+            )
+            entries.create_index(["path"])
+            entries.enable_fts(["heading", "body"], create_triggers=True)
+
+    def refresh(
+        self,
+        root: Optional[Path] = None,
+        local_notebooks: Optional[Iterable[Path]] = None,
+    ) -> int:
+        """Bring the index up to date with the logs under root (the nb root by default) and in the local notebooks
+        (those in the notebook registry by default). Returns the number of files re-read."""
+        root = root or notebook_dir("home").parent
+        if local_notebooks is None:
+            local_notebooks = known_local_notebooks()
+        files = get_table(self.db, FILES_TABLE)
+        entries = get_table(self.db, ENTRIES_TABLE)
+        known = {row["path"]: (row["mtime_ns"], row["size"]) for row in files.rows}
+
+        seen = set()
+        changed_files = []
+        changed_entries = []
+        for notebook, path in log_files(root, local_notebooks):
+            stat = path.stat()
+            key = str(path)
+            seen.add(key)
+            if known.get(key) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            _, parsed = parse_log(path.read_text(errors="replace"))
+            changed_files.append(
+                {
+                    "path": key,
+                    "notebook": notebook,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                }
+            )
+            changed_entries.extend(
+                {
+                    "path": key,
+                    "notebook": notebook,
+                    "date": entry.date,
+                    "position": entry.position,
+                    "heading": entry.heading,
+                    "body": entry.body,
+                }
+                for entry in parsed
+            )
+
+        stale = [
+            *(known.keys() - seen),
+            *(f["path"] for f in changed_files if f["path"] in known),
+        ]
+        conn = self.db.conn
+        assert conn is not None
+        with conn:
+            for key in stale:
+                entries.delete_where("path = ?", [key])
+                files.delete_where("path = ?", [key])
+            entries.insert_all(changed_entries)
+            files.insert_all(changed_files)
+        return len(changed_files)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        notebooks: Optional[Collection[str]] = None,
+    ) -> list[SearchHit]:
+        """Return the best matches for query, best first, from the given notebooks (all by default). Each word of query
+        is matched literally, as a prefix."""
+        terms = [f'"{word.replace(chr(34), chr(34) * 2)}"*' for word in query.split()]
+        if not terms:
+            return []
+        sql = f"""
+            select e.path, e.notebook, e.date, e.heading,
+                snippet({ENTRIES_TABLE}_fts, 1, '[', ']', '…', 16) as snippet
+            from {ENTRIES_TABLE}_fts
+            join {ENTRIES_TABLE} e on e.rowid = {ENTRIES_TABLE}_fts.rowid
+            where {ENTRIES_TABLE}_fts match :query
+                and (
+                    :notebooks is null
+                    or e.notebook in (select value from json_each(:notebooks))
+                )
+            order by {ENTRIES_TABLE}_fts.rank
+            limit :limit
+        """
+        params = {
+            "query": " ".join(terms),
+            "notebooks": None if notebooks is None else json.dumps([*notebooks]),
+            "limit": limit,
+        }
+        return [SearchHit(*row) for row in self.db.execute(sql, params).fetchall()]
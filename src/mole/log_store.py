@@ -0,0 +1,131 @@
+"""log_store.py - Every log entry as a row in SQLite, with the markdown logs rendered from it.
+
+Each entry mole writes is stored with its timestamp, project, todo, subtitle and body, along with the markdown it renders
+to and where that goes. Appending is a single insert. The markdown logs are brought up to date afterwards by the
+journal's merger (see journal.py), which picks up the entries not yet rendered through a partial index and appends them
+to just the days they belong to. Whatever else is in the markdown (entries written before the store existed, edits made
+in $EDITOR) is left alone, so the logs stay the copy that nb syncs, and the store is what mole queries: by project, todo
+or date range, each an index lookup.
+
+The store is plain sqlite3 rather than sqlite-utils (as log_search.py and chores.py use) because it's on the path of
+every `mole log`, and importing sqlite-utils alone takes longer than the rest of that command's startup.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .cache import cache_dir
+
+TABLE = "log_entries"
+COLUMNS = [
+    "timestamp",
+    "notebook",
+    "project",
+    "todo",
+    "subtitle",
+    "body",
+    "content",
+    "path",
+    "title",
+    "selector",
+]
+
+SCHEMA = f"""
+create table if not exists {TABLE} (
+    id integer primary key,
+    timestamp real not null,  -- seconds since the epoch
+    notebook text not null,   -- the journal (one per notebook) whose merger renders the entry, see journal.journal_name
+    project text,
+    todo text,                -- label, e.g. beta-project:3
+    subtitle text,
+    body text,
+    content text not null,    -- the markdown rendered into the log, header included
+    path text,                -- the log file, with the title to give it should it need creating...
+    title text,
+    selector text,            -- ... or the nb selector to `nb edit` instead
+    rendered integer not null default 0
+);
+create index if not exists {TABLE}_pending on {TABLE} (notebook, id) where not rendered;
+create index if not exists {TABLE}_timestamp on {TABLE} (timestamp);
+create index if not exists {TABLE}_project on {TABLE} (project, timestamp);
+create index if not exists {TABLE}_todo on {TABLE} (todo, timestamp);
+"""
+
+
+def store_path() -> Path:
+    return cache_dir() / "entries.db"
+
+
+def connect(path: Optional[Path] = None) -> sqlite3.Connection:
+    """Open the store, creating it if need be. Transactions are left to the caller (the connection autocommits)."""
+    conn = sqlite3.connect(path or store_path(), timeout=60, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("pragma journal_mode = wal")  # Readers don't wait on writers
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def insert(rows: Iterable[dict]) -> None:
+    """Store entries (dicts with some or all of COLUMNS) in one transaction, unrendered."""
+    columns = ", ".join(COLUMNS)
+    placeholders = ", ".join(f":{column}" for column in COLUMNS)
+    with closing(connect()) as conn:
+        conn.execute("begin immediate")
+        conn.executemany(
+            f"insert into {TABLE} ({columns}) values ({placeholders})",
+            [{column: row.get(column) for column in COLUMNS} for row in rows],
+        )
+        conn.execute("commit")
+
+
+def pending(conn: sqlite3.Connection, notebook: str) -> list[sqlite3.Row]:
+    """A notebook's entries that aren't in its markdown yet, in the order they were stored."""
+    return conn.execute(
+        f"select * from {TABLE} where notebook = ? and not rendered order by id",
+        [notebook],
+    ).fetchall()
+
+
+def mark_rendered(conn: sqlite3.Connection, notebook: str, last_id: int) -> None:
+    """Mark a notebook's entries rendered, up to and including last_id. Ids only ever grow, so anything stored since
+    the pending entries were read is left for the next round."""
+    conn.execute(
+        f"update {TABLE} set rendered = 1 where notebook = ? and not rendered and id <= ?",
+        [notebook, last_id],
+    )
+
+
+def query(
+    project: Optional[str] = None,
+    todo: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> list[sqlite3.Row]:
+    """Stored entries matching every filter given, oldest first. since and until are timestamps, until exclusive.
+
+    With a limit, it's the latest entries that are returned (still oldest first).
+    """
+    where, params = [], []
+    for clause, value in [
+        ("project = ?", project),
+        ("todo = ?", todo),
+        ("timestamp >= ?", since),
+        ("timestamp < ?", until),
+    ]:
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    sql = f"select * from {TABLE}"
+    if where:
+        sql += " where " + " and ".join(where)
+    sql += " order by timestamp desc, id desc"
+    if limit is not None:
+        sql += " limit ?"
+        params.append(limit)
+    with closing(connect()) as conn:
+        return conn.execute(sql, params).fetchall()[::-1]
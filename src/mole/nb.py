@@ -0,0 +1,267 @@
+"""nb.py - The one place mole runs nb-cli.
+
+Every nb invocation is a launch of a multi-thousand-line bash script, and the same read-only questions ("which notebooks
+exist?", "where is home:12?") tend to get asked several times over the course of one mole command. NbClient remembers
+the answers to read commands for the life of the process, and forgets the relevant ones as soon as a write command
+touches the same notebook. The `_async` variants ask nb from asyncio, so that independent questions can be in flight at
+the same time (see the `_async` methods of Logbook).
+
+Set MOLE_NB_STATS=1 to print how many nb processes a mole invocation spawned when it exits, and MOLE_NB_COPROCESS=1 to
+serve nb calls from one persistent bash process (see nb_coprocess.py). With MOLE_TRACE set, every call is traced (see
+tracing.py).
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import re
+import subprocess
+import sys
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, Callable
+
+from . import tracing
+
+if TYPE_CHECKING:
+    import asyncio
+
+# Subcommands which never change a notebook. Anything else is treated as a write.
+READ_COMMANDS = {"list", "ls", "search", "show", "todos", "tasks", "status", "env"}
+# `nb notebooks` is a read, except for these actions
+NOTEBOOK_WRITE_ACTIONS = {
+    "add",
+    "archive",
+    "delete",
+    "init",
+    "rename",
+    "unarchive",
+    "use",
+}
+
+# Pseudo-notebooks used to track what a cached answer depends on
+CURRENT = ""  # The current notebook, i.e. no `notebook:` selector was given
+NOTEBOOKS = "notebooks"  # The list of notebooks itself
+ALL = "*"
+
+Runner = Callable[[list[str], bool], subprocess.CompletedProcess]
+
+
+def subprocess_runner(args: list[str], capture: bool) -> subprocess.CompletedProcess:
+    """Run nb as a plain child process."""
+    return subprocess.run(["nb", *args], capture_output=capture)
+
+
+class NbClient:
+    def __init__(self, runner: Runner = subprocess_runner):
+        self.runner = runner
+        self.spawned: Counter[str] = Counter()
+        self._memo: dict[tuple[str, ...], subprocess.CompletedProcess] = {}
+        self._pending: dict[tuple[str, ...], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def output(self, *args: str) -> str:
+        """Run an nb command and return its decoded stdout, raising CalledProcessError if it fails."""
+        result = self._call(args)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(
+                result.returncode, ["nb", *args], result.stdout, result.stderr
+            )
+        return result.stdout.decode()
+
+    def returncode(self, *args: str) -> int:
+        """Run an nb command for its exit status alone, e.g. `nb list <path>` as an existence check."""
+        return self._call(args).returncode
+
+    def run(self, *args: str, check: bool = True) -> subprocess.CompletedProcess:
+        """Run an nb command attached to the terminal, e.g. `nb open` or `nb edit` without --content.
+
+        Output isn't captured and nothing is memoized, but cached reads are still invalidated as for any other write.
+        """
+        self._invalidate(args)
+        result = self._spawn(args, capture=False)
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, ["nb", *args])
+        return result
+
+    async def output_async(self, *args: str) -> str:
+        """Like output, but without blocking the event loop, so independent nb calls can run side by side."""
+        result = await self._call_async(args)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(
+                result.returncode, ["nb", *args], result.stdout, result.stderr
+            )
+        return result.stdout.decode()
+
+    async def returncode_async(self, *args: str) -> int:
+        """Like returncode, but without blocking the event loop."""
+        return (await self._call_async(args)).returncode
+
+    def _call(self, args: tuple[str, ...]) -> subprocess.CompletedProcess:
+        if not is_read(args):
+            self._invalidate(args)
+            return self._spawn(args, capture=True)
+
+        with self._lock:
+            cached = self._memo.get(args)
+        if cached is not None:
+            return cached
+        result = self._spawn(args, capture=True)
+        with self._lock:
+            self._memo[args] = result
+        return result
+
+    def _spawn(
+        self, args: tuple[str, ...], capture: bool
+    ) -> subprocess.CompletedProcess:
+        with self._lock:
+            self.spawned[subcommand(args)] += 1
+        with tracing.subprocess_span(["nb", *args], f"nb {subcommand(args)}") as span:
+            result = self.runner([*args], capture)
+            span["returncode"] = result.returncode
+        return result
+
+    async def _call_async(self, args: tuple[str, ...]) -> subprocess.CompletedProcess:
+        import asyncio
+
+        if not is_read(args):
+            self._invalidate(args)
+            return await self._spawn_async(args)
+
+        with self._lock:
+            cached = self._memo.get(args)
+            pending = self._pending.get(args)
+            if cached is None and pending is None:
+                # The same read asked for twice at once only runs once
+                pending = self._pending[args] = asyncio.ensure_future(
+                    self._spawn_async(args)
+                )
+                owner = True
+            else:
+                owner = False
+        if cached is not None:
+            return cached
+        assert pending is not None
+        try:
+            result = await asyncio.shield(pending)
+        finally:
+            if owner:
+                with self._lock:
+                    self._pending.pop(args, None)
+        if owner:
+            with self._lock:
+                self._memo[args] = result
+        return result
+
+    async def _spawn_async(self, args: tuple[str, ...]) -> subprocess.CompletedProcess:
+        import asyncio
+
+        if self.runner is not subprocess_runner:
+            # Other runners (like the coprocess) block, so give them a thread of their own
+            return await asyncio.to_thread(self._spawn, args, True)
+        with self._lock:
+            self.spawned[subcommand(args)] += 1
+        with tracing.subprocess_span(["nb", *args], f"nb {subcommand(args)}") as span:
+            process = await asyncio.create_subprocess_exec(
+                "nb",
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await process.communicate()
+            returncode = span["returncode"] = await process.wait()
+        return subprocess.CompletedProcess(["nb", *args], returncode, stdout, stderr)
+
+    def _invalidate(self, args: tuple[str, ...]) -> None:
+        touched = notebooks_of(args)
+        with self._lock:
+            if ALL in touched or CURRENT in touched:
+                # We don't know which notebook is current, so anything could be stale
+                self._memo.clear()
+                return
+            for key in [*self._memo]:
+                depends_on = notebooks_of(key)
+                if CURRENT in depends_on or touched & depends_on:
+                    del self._memo[key]
+
+    def clear(self) -> None:
+        """Forget every cached answer."""
+        with self._lock:
+            self._memo.clear()
+
+    def report(self) -> str:
+        total = sum(self.spawned.values())
+        detail = ", ".join(f"{cmd}: {n}" for cmd, n in self.spawned.most_common())
+        return f"🐭 nb: {total} processes" + (f" ({detail})" if detail else "")
+
+
+def subcommand(args: tuple[str, ...] | list[str]) -> str:
+    """The nb subcommand, e.g. 'ls' for ('ls', 'home:'), 'notebooks add' for ('notebooks', 'add', 'x')."""
+    positional = [arg for arg in args if not arg.startswith("-")]
+    if not positional:
+        return ""
+    if positional[0] == "notebooks" and len(positional) > 1:
+        return f"notebooks {positional[1]}"
+    return positional[0]
+
+
+def is_read(args: tuple[str, ...]) -> bool:
+    command = subcommand(args)
+    if command.startswith("notebooks"):
+        return command.removeprefix("notebooks ") not in NOTEBOOK_WRITE_ACTIONS
+    return command in READ_COMMANDS
+
+
+def notebooks_of(args: tuple[str, ...]) -> set[str]:
+    """Which notebooks an nb command reads or writes, as far as can be told from its arguments."""
+    command = subcommand(args)
+    if command == "sync":
+        return {ALL}  # A sync can pull anything
+    if command.startswith("notebooks"):
+        return {NOTEBOOKS}
+    found = set()
+    for arg in args[1:]:
+        match = re.match(r"^([\w.-]+):", arg)
+        if match and not arg.startswith("-"):
+            found.add(match.group(1))
+    return found or {CURRENT}
+
+
+def default_runner() -> Runner:
+    if os.environ.get("MOLE_NB_COPROCESS"):
+        from .nb_coprocess import CoprocessRunner
+
+        return CoprocessRunner()
+    return subprocess_runner
+
+
+client = NbClient(runner=default_runner())
+
+
+def output(*args: str) -> str:
+    return client.output(*args)
+
+
+def returncode(*args: str) -> int:
+    return client.returncode(*args)
+
+
+def run(*args: str, check: bool = True) -> subprocess.CompletedProcess:
+    return client.run(*args, check=check)
+
+
+async def output_async(*args: str) -> str:
+    return await client.output_async(*args)
+
+
+async def returncode_async(*args: str) -> int:
+    return await client.returncode_async(*args)
+
+
+def _report_at_exit() -> None:
+    print(client.report(), file=sys.stderr)
+
+
+if os.environ.get("MOLE_NB_STATS"):
+    atexit.register(_report_at_exit)
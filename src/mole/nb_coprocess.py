@@ -0,0 +1,170 @@
+"""nb_coprocess.py - Run nb inside one long-lived bash process instead of launching it over and over.
+
+Most of the cost of an nb call is bash reading, parsing and evaluating nb itself, which is one very large script that
+defines hundreds of functions before finally calling `_main "$@"`. The coprocess sources nb once with that last line
+removed, then serves requests over a pipe: each request forks a subshell that calls `_main` (so no state leaks from one
+call to the next), with stdout and stderr sent to files that we read back. If the script doesn't end the way we expect,
+the worker falls back to wrapping the whole of nb in a function, which still saves the exec and the parse.
+
+nb works out things like the current notebook from the working directory when it starts, so the worker is restarted
+whenever mole's working directory changes. Interactive commands (anything that isn't capturing output) can't run
+without a terminal, so those still get their own nb process. Enable with MOLE_NB_COPROCESS=1.
+
+Protocol, all fields NUL-terminated: stdout path, stderr path, argc, then each argument. The worker answers each request
+with the exit status and a newline.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+# Source nb without running it, remembering its shell options for the calls but not applying them to the loop itself.
+SOURCED_PRELUDE = r"""
+__mole_script="$1"
+set --
+source "$__mole_script" || exit 70
+__mole_opts="$(set +o)"
+set +o errexit +o nounset +o pipefail
+__mole_call() { eval "$__mole_opts"; _main "$@"; }
+"""
+
+WRAPPED_PRELUDE = r"""
+__mole_nb_source="$(<"$1")" || exit 70
+eval "__mole_call() {
+${__mole_nb_source}
+}" || exit 71
+unset __mole_nb_source
+"""
+
+WORKER_LOOP = r"""
+exec 3>&1 1>&2
+while IFS= read -r -d '' __mole_out \
+    && IFS= read -r -d '' __mole_err \
+    && IFS= read -r -d '' __mole_argc; do
+    __mole_args=()
+    for ((__mole_i = 0; __mole_i < __mole_argc; __mole_i++)); do
+        IFS= read -r -d '' __mole_arg
+        __mole_args+=("$__mole_arg")
+    done
+    ( __mole_call "${__mole_args[@]}" ) </dev/null >"$__mole_out" 2>"$__mole_err"
+    printf '%d\n' "$?" >&3
+done
+"""
+
+
+def strip_main(source: str) -> Optional[str]:
+    """Return nb's source without its final `_main` invocation, or None if it doesn't end with one."""
+    lines = source.rstrip().splitlines()
+    while lines and (not lines[-1].strip() or lines[-1].lstrip().startswith("#")):
+        lines.pop()
+    if not lines or not re.match(r"^\s*_main(\s|$)", lines[-1]):
+        return None
+    return "\n".join(lines[:-1]) + "\n"
+
+
+class CoprocessRunner:
+    """An NbClient runner backed by a single persistent bash worker."""
+
+    def __init__(self, nb_path: Optional[str] = None):
+        self.nb_path = nb_path
+        self._proc: Optional[subprocess.Popen] = None
+        self._cwd: Optional[str] = None
+        self._tmp: Optional[Path] = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def __call__(self, args: list[str], capture: bool) -> subprocess.CompletedProcess:
+        if not capture:
+            return self._one_off(args, capture)
+        with self._lock:
+            return self._request(args)
+
+    def _request(
+        self, args: list[str], retry: bool = True
+    ) -> subprocess.CompletedProcess:
+        proc = self._ensure_worker()
+        assert proc.stdin is not None and proc.stdout is not None and self._tmp
+        out, err = self._tmp / "stdout", self._tmp / "stderr"
+        fields = [str(out), str(err), str(len(args)), *args]
+        out.unlink(missing_ok=True)  # The worker creates it as it runs the request
+        try:
+            proc.stdin.write(b"".join(field.encode() + b"\0" for field in fields))
+            proc.stdin.flush()
+            status = proc.stdout.readline()
+        except BrokenPipeError:
+            status = b""
+
+        if not status:
+            started = out.exists()
+            self.close()
+            if started:
+                raise RuntimeError(
+                    f"nb coprocess exited while running: nb {' '.join(args)}"
+                )
+            # The worker died before this request reached nb, so it's safe to start over, once. If a fresh worker dies
+            # too (e.g. nb fails on startup), nb gets to run on its own and report why.
+            if retry:
+                return self._request(args, retry=False)
+            return self._one_off(args, capture=True)
+        return subprocess.CompletedProcess(
+            ["nb", *args], int(status), out.read_bytes(), err.read_bytes()
+        )
+
+    def _one_off(self, args: list[str], capture: bool) -> subprocess.CompletedProcess:
+        """Run nb as a plain child process, as the default runner does."""
+        return subprocess.run([self.nb_path or "nb", *args], capture_output=capture)
+
+    def _ensure_worker(self) -> subprocess.Popen:
+        cwd = os.getcwd()
+        if self._proc is not None:
+            if self._proc.poll() is None and self._cwd == cwd:
+                return self._proc
+            self.close()
+        nb_path = self.nb_path or shutil.which("nb")
+        if nb_path is None:
+            raise FileNotFoundError("nb is not on PATH")
+
+        self._tmp = Path(tempfile.mkdtemp(prefix="mole-nb-"))
+        stripped = strip_main(Path(nb_path).read_text())
+        if stripped is not None:
+            script = self._tmp / "nb.sh"
+            script.write_text(stripped)
+            worker = SOURCED_PRELUDE + WORKER_LOOP
+        else:
+            script = Path(nb_path)
+            worker = WRAPPED_PRELUDE + WORKER_LOOP
+        # $0 is "nb" so that nb's messages still name itself correctly
+        self._proc = subprocess.Popen(
+            ["bash", "-c", worker, "nb", str(script)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=cwd,
+        )
+        self._cwd = cwd
+        return self._proc
+
+    def close(self) -> None:
+        """Stop the worker, if there is one. The next request will start a new one."""
+        if self._proc is not None:
+            if self._proc.stdin is not None:
+                try:
+                    self._proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+            self._proc = None
+        if self._tmp is not None:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+            self._tmp = None
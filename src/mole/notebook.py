@@ -1,12 +1,26 @@
 # notebook.py - API for nb-cli
-import subprocess
+import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Union
+from typing import Iterable, Optional, Union
 
+import pendulum
+import typer
 from pendulum import Date, DateTime
+from pydantic import BaseModel, ValidationError
 
-from .projects import Project, ToDo
+from . import journal, nb, sync, tracing
+from .default_group import default_group
+from .journal import JournalRecord
+from .log_archive import Period
+from .notebook_registry import NotebookRegistry
+from .project_backends import (
+    current_notebook,
+    local_notebook,
+    notebook_dir,
+    read_nb_index,
+)
+from .projects import Project, ToDo, session_projects
 
 When = Union[Date, DateTime]
 
@@ -15,24 +29,52 @@ When = Union[Date, DateTime]
 class Logbook:
     """A Logbook is a collection of log entries stored in nb-cli markdown.
 
-    Entries are typically written by a human in prose but can be generated by other programs, meaning that "log" here typically means more like "Captain's Log" but can be more like "system log". The underlying nb-cli repository is not designed for high throughput and the commands assume all entries will be directly and sequentially driven by a human, so race conditions absolutely do exist and can mangle text.
+    Entries are typically written by a human in prose but can be generated by other programs, meaning that "log" here typically means more like "Captain's Log" but can be more like "system log". The underlying nb-cli repository is not designed for high throughput and the commands assume all entries will be directly and sequentially driven by a human, so race conditions absolutely do exist and can mangle text. Appends are therefore stored as rows (see log_store.py) and rendered into the markdown by a per-notebook journal merger (see journal.py), which serializes them.
 
     Entries are always associated with a point in time. Sometimes that time is a DateTime, sometimes it's just a Date. Sometimes entries have subtitles. Some entries are intended for a freeform global diary, some entries are specific to certain projects' global notebooks, some entries go directly to a project's local notebook. Some entries are tied directly to nb-cli ToDos.
 
-    Entries can be added directly, or opened in an interactive editor, or both. Entries can have headings and subheadings. An editing session can be wrapped with a closing header. Entries can also be read (although at time of writing no API exists for it, you'll need to just run `nb open <...>`). In general, a good idea is to learn nb-cli first and then learn this class.
+    Entries can be added directly, or opened in an interactive editor, or both. Entries can have headings and subheadings. An editing session can be wrapped with a closing header. Entries can also be read back, latest first, without opening an editor (see log_reader.py and `mole log tail`). In general, a good idea is to learn nb-cli first and then learn this class.
 
     Given the flexbility, the interface is quite complex. Wherever possible, using the types to guide you: the names of functions might not fully reflect the capabilities to express what they do given certain types, but typically the types themselves complete the story.
 
-    This all needs a major refactor as part of moving to a more structured data model, someday.
+    Everything appended through a Logbook is also kept as a structured row (see log_store.py), which `mole log entries` queries.
     """
 
     project: Optional[Project]
     todo: Optional[ToDo] = None
 
+    @classmethod
+    def for_names(
+        cls, project_name: Optional[str], todo_label: Optional[str] = None
+    ) -> "Logbook":
+        """The logbook for a project name and todo label, as given on the command line. The todo needs a project."""
+        if project_name is None:
+            return cls(project=None)
+        project = Project.load(project_name)
+        todo = ToDo.from_label(todo_label) if todo_label is not None else None
+        return cls(project=project, todo=todo)
+
+    @classmethod
+    async def for_names_async(
+        cls, project_name: Optional[str], todo_label: Optional[str] = None
+    ) -> "Logbook":
+        """for_names, loading the project and resolving the todo at the same time."""
+        import asyncio
+
+        if project_name is None:
+            return cls(project=None)
+        if todo_label is None:
+            return cls(project=await Project.load_async(project_name))
+        project, todo = await asyncio.gather(
+            Project.load_async(project_name),
+            asyncio.to_thread(ToDo.from_label, todo_label),
+        )
+        return cls(project=project, todo=todo)
+
     def edit_log(self, when: Optional[When] = None, preamble: Optional[str] = None):
         """Open the given day's log in $EDITOR.
 
-        In order to avoid locking the notebook, this works 'around' nb by opening the file directly, manually syncing when the editor exits. That means that this call blocks while the editor is still running. Nothing is done to avoid race conditions with other writing or syncing processes.
+        In order to avoid locking the notebook, this works 'around' nb by opening the file directly, scheduling a sync when the editor exits. That means that this call blocks while the editor is still running. Nothing is done to avoid race conditions with other writing or syncing processes.
 
         If the log for the given date or datetime does not exist, it is created. If no date or datetime is given, the current datetime is used.
 
@@ -46,40 +88,120 @@ class Logbook:
             # Technically this could have been done in the same call made by get_or_create_log when it creates the file,
             # but then you need to handle the case where the file already exists, and it's just easier to do it here.
             # Compared to normal file I/O this is extremely expensive, but it's not like we're doing this in a loop.
-            subprocess.run(["nb", "edit", log_path, "--content", header], check=True)
-        subprocess.run(["nb", "open", log_path], check=True)
-        subprocess.run(["nb", "sync", "--all"])
+            nb.run("edit", log_path, "--content", header)
+        nb.run("open", log_path)
+        sync.mark_dirty()
 
     def append_log(
         self, entry: str, when: Optional[When] = None, preamble: Optional[str] = None
     ):
-        """Like edit_log, but instead of opening in $EDITOR, just append a new entry and sync. A header is always printed."""
+        """Like edit_log, but instead of opening in $EDITOR, just append a new entry and schedule a sync. A header is always printed."""
         if when is None:
             when = DateTime.now()
-        log_path = self.get_or_create_log(when)
         header = self.make_header(when, preamble)
-        content = f"{header}\n\n{entry}"
-        subprocess.run(["nb", "edit", log_path, "--content", content], check=True)
-        subprocess.run(["nb", "sync", "--all"])
+        self.append(when, f"{header}\n\n{entry}", subtitle=preamble, body=entry)
+        sync.mark_dirty()
 
     def append_log_header(
-        self, when: Optional[DateTime] = None, preamble: Optional[str] = None
+        self,
+        when: Optional[DateTime] = None,
+        preamble: Optional[str] = None,
+        destination: Optional[dict[str, str]] = None,
     ):
         """Like append_log, but just the header, and no sync"""
         if when is None:
             when = DateTime.now()
-        log_path = self.get_or_create_log(when)
         header = self.make_header(when, preamble, time_only=True)
-        subprocess.run(["nb", "edit", log_path, "--content", header], check=True)
+        self.append(when, header, subtitle=preamble, destination=destination)
 
     def append_log_footer(self, when: Optional[DateTime] = None):
-        """Print an h3 closing header to the day's log and sync."""
+        """Print an h3 closing header to the day's log and schedule a sync."""
         if when is None:
             when = DateTime.now()
-        log_path = self.get_or_create_log(when)
-        footer = f"### {when.format('HH:mm')} Session closed"
-        subprocess.run(["nb", "edit", log_path, "--content", footer], check=True)
-        subprocess.run(["nb", "sync", "--all"])
+        self.append(when, f"### {when.format('HH:mm')} Session closed")
+        sync.mark_dirty()
+
+    def append(
+        self,
+        when: When,
+        content: str,
+        subtitle: Optional[str] = None,
+        body: Optional[str] = None,
+        destination: Optional[dict[str, str]] = None,
+    ):
+        """Append content to the log for the given date or datetime, creating the log if necessary.
+
+        The entry is stored (see log_store.py), along with its subtitle and body when it has them, and rendered into the
+        markdown by the notebook's journal merger (see journal.py), so concurrent writers can't mangle each other's
+        entries. When the log's file can be worked out from the notebook directories (see log_file), the content is
+        appended to it directly and nb only finds out when the next sync commits it. Otherwise it goes in with `nb edit`.
+
+        A destination already worked out for the same day (see destination) saves looking it up again.
+        """
+        record = self.entry_record(when, content, subtitle, body)
+        journal.write(record.model_copy(update=destination or self.destination(when)))
+
+    async def append_async(
+        self,
+        when: When,
+        content: str,
+        subtitle: Optional[str] = None,
+        body: Optional[str] = None,
+    ):
+        """append, for use from asyncio. Only the nb calls of the fallback run on the event loop, see
+        get_or_create_log_async. The journal write itself blocks on locks, so it gets a thread."""
+        import asyncio
+
+        record = self.entry_record(when, content, subtitle, body)
+        record = record.model_copy(update=await self.destination_async(when))
+        await asyncio.to_thread(journal.write, record)
+
+    async def append_log_header_async(
+        self, when: Optional[DateTime] = None, preamble: Optional[str] = None
+    ):
+        """append_log_header, for use from asyncio."""
+        if when is None:
+            when = DateTime.now()
+        header = self.make_header(when, preamble, time_only=True)
+        await self.append_async(when, header, subtitle=preamble)
+
+    def entry_record(
+        self,
+        when: When,
+        content: str,
+        subtitle: Optional[str] = None,
+        body: Optional[str] = None,
+    ) -> JournalRecord:
+        """A record of the entry itself, without its destination."""
+        return JournalRecord(
+            timestamp=self.timestamp(when),
+            content=content,
+            project=self.project.name if self.project is not None else None,
+            todo=self.todo.label if self.todo is not None else None,
+            subtitle=subtitle,
+            body=body,
+        )
+
+    def destination(self, when: When) -> dict[str, str]:
+        """Where the entries for the given date or datetime go, as the JournalRecord fields that say so."""
+        path = self.log_file(when)
+        if path is not None:
+            return {"path": str(path), "title": self.log_title(when)}
+        return {"selector": self.get_or_create_log(when)}
+
+    async def destination_async(self, when: When) -> dict[str, str]:
+        path = self.log_file(when)
+        if path is not None:
+            return {"path": str(path), "title": self.log_title(when)}
+        return {"selector": await self.get_or_create_log_async(when)}
+
+    @staticmethod
+    def timestamp(when: When) -> float:
+        if isinstance(when, DateTime):
+            return when.timestamp()
+        return pendulum.datetime(
+            when.year, when.month, when.day, tz="local"
+        ).timestamp()
 
     def make_header(
         self, when: When, preamble: Optional[str], time_only: bool = False
@@ -105,84 +227,472 @@ class Logbook:
 
         return header
 
-    def get_or_create_log(self, when: When) -> str:
+    @staticmethod
+    def log_title(when: When) -> str:
         day = when.date() if isinstance(when, DateTime) else when
-        title = day.strftime("%A, %B %d, %Y")
-
-        # Find the proper log_path
-        if self.project is not None:
-            in_right_dir = False
-            if self.project.data.cwd is not None:
-                proj_dir = Path(self.project.data.cwd).expanduser()
-                cwd = Path.cwd()
-                in_right_dir = proj_dir == cwd or proj_dir in cwd.parents
-
-            has_local_logbook = False
-            if (
-                in_right_dir
-            ):  # Avoid unnecessary subprocess calls with this one weird if
-                has_local_logbook = (
-                    subprocess.run(
-                        ["nb", "notebooks", "--local"], capture_output=True
-                    ).returncode
-                    == 0
-                    if in_right_dir
-                    else False
-                )
+        return day.strftime("%A, %B %d, %Y")
 
-            if has_local_logbook:
-                notebook = "local"
-            else:
-                notebook = self.get_or_create_global_notebook()
+    def log_file(self, when: When) -> Optional[Path]:
+        """Return the file that get_or_create_log would pick for the given date or datetime, without running nb.
 
-            log_dir = self.project.data.log_dir
-            if self.todo is not None:
-                log_path = self.todo.label
-            elif log_dir is None:
-                log_path = f"{notebook}:{title}.log.md"
-            else:
-                log_path = f"{notebook}:{log_dir}/{title}.log.md"
-        else:
-            log_path = f"{title}.log.md"
+        The file itself may not exist yet. Returns None whenever nb is needed to answer, e.g. because the project's
+        global notebook doesn't exist yet or the todo isn't in nb's index.
+        """
+        filename = f"{self.log_title(when)}.log.md"
+        if self.project is None:
+            notebook = current_notebook()
+            return notebook / filename if (notebook / ".index").is_file() else None
 
-        # If the log doesn't exist, create it
-        is_new_entry = (
-            subprocess.run(["nb", "list", log_path], capture_output=True).returncode
-            == 1
-        )
-        if is_new_entry:
-            # TODO figure out a better way to handle this content 'hack'
-            subprocess.run(
-                [
-                    "nb",
-                    "add",
-                    log_path,
-                    "--title",
-                    title,
-                    "--type=log.md",
-                    "--content",
-                    " ",
-                ],
-                check=True,
-            )
+        if self.todo is not None:
+            notebook = notebook_dir("home").parent / self.todo.project.session_name
+            try:
+                path = read_nb_index(notebook).get(self.todo.todo)
+            except FileNotFoundError:
+                return None
+            return path if path is not None and path.is_file() else None
 
-        return log_path
+        notebook = None
+        if self.in_project_dir():
+            notebook = local_notebook(Path.cwd())
+        if notebook is None:
+            notebook = notebook_dir("home").parent / self.project.session_name
+            if not (notebook / ".index").is_file():
+                return None
+        if self.project.data.log_dir is not None:
+            return notebook / self.project.data.log_dir / filename
+        return notebook / filename
 
-    def get_or_create_global_notebook(self) -> str:
-        """Return the global notebook for the given project, creating it if necessary.
+    def in_project_dir(self) -> bool:
+        """Whether we're running from within the project's directory (where a local notebook takes precedence)."""
+        if self.project is None or self.project.data.cwd is None:
+            return False
+        proj_dir = Path(self.project.data.cwd).expanduser()
+        cwd = Path.cwd()
+        return proj_dir == cwd or proj_dir in cwd.parents
 
-        Does not check for a local logbook, which may mask the global notebook if it exists and is configured.
+    def get_or_create_log(self, when: When) -> str:
+        """Return the nb selector of the log for the given date or datetime, creating the log (and the project's global
+        notebook) in nb if they don't exist yet.
+
+        Whether the project's notebooks exist comes from the notebook registry (see notebook_registry.py), without
+        running nb, so the only nb call left before writing is the check for the log itself.
         """
+        title = self.log_title(when)
+        log_path, registry = self.log_location(title)
+        if registry is not None:
+            self.add_notebook(registry)
+        if nb.returncode("list", log_path) == 1:
+            self.create_log(log_path, title)
+        return log_path
+
+    async def get_or_create_log_async(self, when: When) -> str:
+        """get_or_create_log, for use from asyncio. nb.run is attached to the terminal and blocks, so the writes get a
+        thread each."""
+        import asyncio
+
+        title = self.log_title(when)
+        log_path, registry = self.log_location(title)
+        if registry is not None:
+            await asyncio.to_thread(self.add_notebook, registry)
+        if await nb.returncode_async("list", log_path) == 1:
+            await asyncio.to_thread(self.create_log, log_path, title)
+        return log_path
+
+    def log_location(self, title: str) -> tuple[str, Optional[NotebookRegistry]]:
+        """The selector of the log with the given title, along with the notebook registry if the project's global
+        notebook has to be added to nb first."""
         if self.project is None:
-            raise ValueError("Cannot get global notebook without a project")
-        notebooks = [
-            line.strip()
-            for line in subprocess.check_output(
-                ["nb", "notebooks", "--names", "--no-color"], text=True
-            ).splitlines()
-        ]
-        if self.project.session_name not in notebooks:
-            subprocess.run(
-                ["nb", "notebooks", "add", self.project.session_name], check=True
+            return f"{title}.log.md", None
+        registry = NotebookRegistry.load()
+        if self.in_project_dir() and registry.local(Path.cwd()) is not None:
+            return self.log_selector("local", title), None
+        notebook = self.project.session_name
+        return self.log_selector(notebook, title), (
+            None if registry.has(notebook) else registry
+        )
+
+    def add_notebook(self, registry: NotebookRegistry) -> None:
+        assert self.project is not None
+        nb.run("notebooks", "add", self.project.session_name)
+        registry.added(self.project.session_name)
+
+    @staticmethod
+    def create_log(log_path: str, title: str) -> None:
+        # TODO figure out a better way to handle this content 'hack'
+        nb.run("add", log_path, "--title", title, "--type=log.md", "--content", " ")
+
+    def log_selector(self, notebook: str, title: str) -> str:
+        """The selector of a project's log in the given notebook (unless there's a todo, which is its own log)."""
+        assert self.project is not None
+        if self.todo is not None:
+            return self.todo.label
+        if self.project.data.log_dir is None:
+            return f"{notebook}:{title}.log.md"
+        return f"{notebook}:{self.project.data.log_dir}/{title}.log.md"
+
+
+class BatchEntry(BaseModel):
+    """One line of `mole log --batch` input."""
+
+    text: str
+    subtitle: Optional[str] = None
+    project: Optional[str] = None
+    todo: Optional[str] = None
+    # ISO 8601, in local time unless it says otherwise. Defaults to now.
+    timestamp: Optional[str] = None
+
+    def when(self) -> DateTime:
+        if self.timestamp is None:
+            return DateTime.now()
+        when = pendulum.parse(self.timestamp, tz=pendulum.local_timezone())
+        if not isinstance(when, DateTime):
+            raise ValueError(f"timestamp {self.timestamp} is not a date and time")
+        return when
+
+
+def append_batch(
+    lines: Iterable[str], project: Optional[str] = None, todo: Optional[str] = None
+) -> tuple[int, int]:
+    """Append a stream of log entries, given as JSON lines (see BatchEntry), returning the number of entries and logs.
+
+    Entries go to the same log that Logbook.append_log would pick for them, with project and todo as the defaults for
+    entries that don't name their own. The default todo belongs to the default project, so an entry naming another
+    project only gets its own todo, if any. Every line is validated before anything is written. Each log is then written
+    once, with its entries in timestamp order, and a single sync is scheduled for the lot.
+    """
+    entries = []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            entry = BatchEntry.model_validate_json(line)
+            entries.append((entry.when(), entry))
+        except (ValidationError, ValueError) as e:
+            raise ValueError(f"line {number}: {e}") from e
+
+    logbooks: dict[tuple[Optional[str], Optional[str]], Logbook] = {}
+    destinations: dict[tuple, dict[str, str]] = {}
+    records = []
+    for when, entry in entries:
+        entry_project = entry.project or project
+        if entry.todo is None and entry_project == project:
+            key = (entry_project, todo)
+        else:
+            key = (entry_project, entry.todo)
+        if key not in logbooks:
+            logbooks[key] = Logbook.for_names(*key)
+        logbook = logbooks[key]
+
+        day = (key, when.date())
+        if day not in destinations:
+            destinations[day] = logbook.destination(when)
+        header = logbook.make_header(when, entry.subtitle)
+        body = entry.text.rstrip()
+        record = logbook.entry_record(
+            when, f"{header}\n\n{body}", subtitle=entry.subtitle, body=body
+        )
+        records.append(record.model_copy(update=destinations[day]))
+
+    for name in journal.submit(records):
+        journal.merge(name, wait=True)
+    if entries:
+        sync.mark_dirty()
+    return len(entries), len({record.target for record in records})
+
+
+## Typer app
+
+
+app = typer.Typer(
+    help="Write to and search the daily logs. Without a subcommand, adds an entry (see `add`).",
+    cls=default_group("add"),
+)
+
+
+@app.command()
+def add(
+    entry_text: Optional[str] = typer.Argument(None),
+    subtitle: Optional[str] = typer.Option(None, "--subtitle", "-s"),
+    project: Optional[str] = typer.Argument(None, envvar="MOLE_PROJECT"),
+    todo: Optional[str] = typer.Argument(None, envvar="MOLE_TODO"),
+    batch: bool = typer.Option(
+        False, "--batch", help="Read many entries from stdin as JSON lines"
+    ),
+):
+    """Add an entry to the daily log.
+
+    If project is specified, the log will be created in that projects' notebook. (A notebook will be created if one did not exist.)
+
+    If todo is further specified beyond project, then the log will instead be created as a subheading (h2) of that todo in the corresponding project. This overrides the project log destination.
+
+    With --batch, each line of stdin is a JSON object with "text" and optionally "subtitle", "project", "todo" (which default to the project and todo given here) and an ISO 8601 "timestamp" (which defaults to now). Each log is written once with its entries in timestamp order, and synced once at the end.
+    """
+    if batch:
+        if entry_text:
+            typer.echo("🐭 Error: --batch reads entries from stdin, not entry_text")
+            raise typer.Exit(1)
+        try:
+            entries, logs = append_batch(sys.stdin, project=project, todo=todo)
+        except ValueError as e:
+            typer.echo(f"🐭 Error: {e}")
+            raise typer.Exit(1)
+        typer.echo(f"🐭 Logged {entries} entries to {logs} logs")
+        return
+
+    with tracing.span("load project"):
+        logbook = Logbook.for_names(project, todo)
+
+    # Check if stdin has data
+    if not sys.stdin.isatty():
+        if entry_text:
+            typer.echo("🐭 Error: stdin and entry_text are mutually exclusive")
+            raise typer.Exit(1)
+        entry_text = "".join(sys.stdin.readlines())
+        with tracing.span("append"):
+            logbook.append_log(entry_text, preamble=subtitle)
+    else:
+        if entry_text:
+            with tracing.span("append"):
+                logbook.append_log(
+                    entry_text, preamble=subtitle or ""
+                )  # None signals to print no header
+        else:
+            if todo is not None and subtitle is None:
+                # Special case for todos, where we always want to print a header as they are subheadings
+                subtitle = ""
+            with tracing.span("edit"):
+                logbook.edit_log(preamble=subtitle)
+
+
+@app.command()
+def search(
+    query: str,
+    project: Optional[str] = typer.Option(
+        None,
+        "--project",
+        "-p",
+        help="Only search this project's notebooks (global and local)",
+    ),
+    limit: int = typer.Option(20, "--limit", "-n"),
+):
+    """Search every log, best matches first.
+
+    That's the logs in every global notebook, and in every local notebook mole has been run from. Each word of the
+    query matches any word starting with it. The search index (see log_search.py) is brought up to date first, which
+    only re-reads the logs that changed since the last search.
+    """
+    from .log_search import LogSearch
+
+    notebooks = Project.load(project).notebook_names() if project else None
+    index = LogSearch.from_sqlite_file()
+    index.refresh()
+    projects = session_projects()
+    for hit in index.search(query, limit=limit, notebooks=notebooks):
+        where = projects.get(hit.notebook, hit.notebook)
+        heading = hit.heading or Path(hit.path).name
+        typer.echo(f"{hit.date or '????-??-??'}  {where}  ## {heading}")
+        typer.echo(f"    {' '.join(hit.snippet.split())}")
+
+
+def _reading_logbook(project: Optional[str], todo: Optional[str]) -> Logbook:
+    if todo is not None and project is None:
+        typer.echo("🐭 Error: a todo needs its project")
+        raise typer.Exit(1)
+    return Logbook.for_names(project, todo)
+
+
+def _resolved_log(logbook: Logbook, when: When) -> Path:
+    path = logbook.log_file(when)
+    if path is None:
+        typer.echo(
+            "🐭 Error: couldn't find that log's notebook (has anything been logged to it yet?)"
+        )
+        raise typer.Exit(1)
+    return path
+
+
+def _parse_moment(text: str) -> DateTime:
+    try:
+        when = pendulum.parse(text, tz=pendulum.local_timezone())
+    except ValueError:
+        when = None
+    if not isinstance(when, DateTime):
+        typer.echo(f"🐭 Error: not an ISO 8601 date or time: {text}")
+        raise typer.Exit(1)
+    return when
+
+
+@app.command()
+def tail(
+    count: Optional[int] = typer.Option(
+        None,
+        "--lines",
+        "-n",
+        help="How many entries to show [default: 10, or all with --since]",
+    ),
+    since: Optional[str] = typer.Option(
+        None, "--since", help="Show the entries from this ISO 8601 date or time on"
+    ),
+    follow: bool = typer.Option(
+        False, "--follow", "-f", help="Keep printing entries as they're added"
+    ),
+    project: Optional[str] = typer.Option(
+        None, "--project", "-p", envvar="MOLE_PROJECT"
+    ),
+    todo: Optional[str] = typer.Option(None, "--todo", "-t", envvar="MOLE_TODO"),
+):
+    """Print the latest entries of the daily log, reaching back into earlier days' logs as needed.
+
+    Logs are read backwards from the end (see log_reader.py), so this stays quick however large they grow. With
+    --follow, keeps watching the log and printing what's appended to it, carrying on into the next day's log at
+    midnight: made for a zellij pane showing a live log.
+    """
+    from . import log_reader
+
+    logbook = _reading_logbook(project, todo)
+    start = _parse_moment(since) if since is not None else None
+    if start is None and count is None:
+        count = 10
+
+    path = _resolved_log(logbook, pendulum.now())
+    shown = None
+    for log, entry in log_reader.tail(
+        log_reader.history(path), count=count, since=start
+    ):
+        if log != shown:
+            if shown is not None:
+                typer.echo()
+            typer.echo(f"# {log.name.removesuffix('.log.md')}\n")
+            shown = log
+        typer.echo(f"{entry.text}\n")
+
+    if follow:
+        try:
+            log_reader.follow(
+                lambda: _resolved_log(logbook, pendulum.now()),
+                lambda text: (sys.stdout.write(text), sys.stdout.flush()),
             )
-        return self.project.session_name
+        except KeyboardInterrupt:
+            pass
+
+
+@app.command()
+def show(
+    day: Optional[str] = typer.Argument(None, help="ISO 8601 date [default: today]"),
+    project: Optional[str] = typer.Option(
+        None, "--project", "-p", envvar="MOLE_PROJECT"
+    ),
+    todo: Optional[str] = typer.Option(None, "--todo", "-t", envvar="MOLE_TODO"),
+):
+    """Print a day's log (or a todo's) as it is, without opening an editor."""
+    import shutil
+
+    logbook = _reading_logbook(project, todo)
+    when = _parse_moment(day) if day else pendulum.now()
+    path = _resolved_log(logbook, when)
+    if not path.is_file():
+        typer.echo(f"🐭 Error: no log for {logbook.log_title(when)}")
+        raise typer.Exit(1)
+    with open(path) as f:
+        shutil.copyfileobj(f, sys.stdout)
+
+
+@app.command()
+def archive(
+    older_than: int = typer.Option(
+        90,
+        "--older-than",
+        envvar="MOLE_LOG_ARCHIVE_DAYS",
+        help="Archive daily logs at least this many days old",
+    ),
+    by: Period = typer.Option(Period.month, "--by", help="Bundle the logs of each"),
+    project: Optional[str] = typer.Option(
+        None,
+        "--project",
+        "-p",
+        help="Only archive this project's notebooks (global and local), instead of every global notebook",
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Only say what would be archived"
+    ),
+):
+    """Roll old daily logs up into one log per month (or year), to keep the notebooks small and nb listing them fast.
+
+    Each day keeps its title and entries in the bundle, so archived logs are still found by `mole log search`. See
+    log_archive.py.
+    """
+    from . import log_archive
+
+    root = notebook_dir("home").parent
+    if project is not None:
+        proj = Project.load(project)
+        notebooks = [root / proj.session_name]
+        if proj.data.cwd is not None:
+            local = local_notebook(Path(proj.data.cwd).expanduser())
+            if local is not None:
+                notebooks.append(local)
+    else:
+        notebooks = sorted(
+            path
+            for path in root.iterdir()
+            if not path.name.startswith(".") and (path / ".index").is_file()
+        )
+    notebooks = [notebook for notebook in notebooks if (notebook / ".index").is_file()]
+    before = pendulum.today().date().subtract(days=older_than)
+
+    if dry_run:
+        found = {
+            folder: bundles
+            for notebook in notebooks
+            for folder in log_archive.nb_folders(notebook)
+            if (bundles := log_archive.plan(folder, before, by.value))
+        }
+    else:
+        found = log_archive.archive(notebooks, before, by.value)
+    for folder, bundles in found.items():
+        for bundle in bundles:
+            typer.echo(f"{bundle.path.relative_to(root)}: {len(bundle.days)} days")
+    days = sum(len(bundle.days) for bundles in found.values() for bundle in bundles)
+    verb = "Would archive" if dry_run else "Archived"
+    typer.echo(f"🐭 {verb} {days} logs from before {before.isoformat()}")
+
+
+@app.command()
+def entries(
+    since: Optional[str] = typer.Option(
+        None, "--since", help="Only entries from this ISO 8601 date or time on"
+    ),
+    until: Optional[str] = typer.Option(
+        None, "--until", help="Only entries before this ISO 8601 date or time"
+    ),
+    limit: Optional[int] = typer.Option(None, "--limit", "-n", help="Only the latest"),
+    as_json: bool = typer.Option(
+        False, "--json", help="Print the stored rows as JSON lines"
+    ),
+    project: Optional[str] = typer.Option(
+        None, "--project", "-p", envvar="MOLE_PROJECT"
+    ),
+    todo: Optional[str] = typer.Option(None, "--todo", "-t", envvar="MOLE_TODO"),
+):
+    """List the entries mole has written, oldest first, from the log store (see log_store.py).
+
+    Unlike `tail`, which reads the markdown, this only knows about entries written through mole, but it can pick out a
+    project's or a todo's entries across every day at once.
+    """
+    import json
+
+    from . import log_store
+
+    logbook = _reading_logbook(project, todo)
+    rows = log_store.query(
+        project=logbook.project.name if logbook.project is not None else None,
+        todo=logbook.todo.label if logbook.todo is not None else None,
+        since=_parse_moment(since).timestamp() if since else None,
+        until=_parse_moment(until).timestamp() if until else None,
+        limit=limit,
+    )
+    for row in rows:
+        if as_json:
+            typer.echo(json.dumps({key: row[key] for key in row.keys()}))
+        else:
+            typer.echo(f"{row['content']}\n")
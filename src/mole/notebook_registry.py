@@ -0,0 +1,104 @@
+"""notebook_registry.py - Which nb notebooks exist, without asking nb.
+
+Writing to a project's log through nb means knowing whether the project's global notebook exists and whether there's a
+local notebook where we're running, which used to cost a `nb notebooks --names` and a `nb notebooks --local` on every
+write even though the set of notebooks changes maybe once a month. nb's global notebooks are the git repositories in the
+nb directory, so the registry lists those once and keeps the answer in the cache dir until the nb directory's mtime
+changes (as it does whenever a notebook is added, renamed or deleted, by nb or anything else).
+
+Local notebooks are remembered per working directory, and looked for again whenever that directory's mtime changes
+(as `nb notebooks init` in it does). A local notebook created in one of its parents goes unnoticed until then.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel, ValidationError
+
+from .cache import atomic_write, cache_dir
+from .project_backends import local_notebook, notebook_dir
+
+REGISTRY_VERSION = 1
+REGISTRY_FILENAME = "notebooks.json"
+
+
+class LocalEntry(BaseModel):
+    mtime_ns: int  # of the working directory, when it was looked up
+    notebook: Optional[str]
+
+
+class NotebookRegistry(BaseModel):
+    version: int = REGISTRY_VERSION
+    root: str = ""
+    mtime_ns: int = -1  # of the nb directory
+    notebooks: list[str] = []
+    local_notebooks: dict[str, LocalEntry] = {}  # by working directory
+
+    @classmethod
+    def load(cls) -> NotebookRegistry:
+        """Return the registry, listing the nb directory again if it changed since the cached copy was made."""
+        root = notebook_dir("home").parent
+        try:
+            registry = cls.model_validate_json(registry_path().read_bytes())
+        except (FileNotFoundError, ValueError, ValidationError):
+            registry = cls()
+
+        mtime_ns = root.stat().st_mtime_ns
+        if (
+            registry.version != REGISTRY_VERSION
+            or registry.root != str(root)
+            or registry.mtime_ns != mtime_ns
+        ):
+            registry = cls(
+                root=str(root),
+                mtime_ns=mtime_ns,
+                notebooks=scan(root),
+                local_notebooks=registry.local_notebooks,
+            )
+            registry.save()
+        return registry
+
+    def save(self) -> None:
+        """Atomically write the registry to the cache dir."""
+        atomic_write(registry_path(), self.model_dump_json())
+
+    def has(self, name: str) -> bool:
+        """Whether there's a global notebook called name."""
+        return name in self.notebooks
+
+    def local(self, cwd: Path) -> Optional[Path]:
+        """The local notebook nb would use when run from cwd, if any."""
+        mtime_ns = cwd.stat().st_mtime_ns
+        entry = self.local_notebooks.get(str(cwd))
+        if entry is None or entry.mtime_ns != mtime_ns:
+            found = local_notebook(cwd)
+            entry = LocalEntry(
+                mtime_ns=mtime_ns, notebook=str(found) if found is not None else None
+            )
+            self.local_notebooks[str(cwd)] = entry
+            self.save()
+        return Path(entry.notebook) if entry.notebook is not None else None
+
+    def added(self, name: str) -> None:
+        """Record that a global notebook was just created, so the change to the nb directory needn't be rescanned."""
+        self.notebooks = sorted({*self.notebooks, name})
+        self.mtime_ns = Path(self.root).stat().st_mtime_ns
+        self.save()
+
+
+def scan(root: Path) -> list[str]:
+    """The global notebooks in the nb directory: its git repositories, other than hidden ones."""
+    return sorted(
+        entry.name
+        for entry in os.scandir(root)
+        if not entry.name.startswith(".")
+        and entry.is_dir()
+        and os.path.exists(os.path.join(entry.path, ".git"))
+    )
+
+
+def registry_path() -> Path:
+    return cache_dir() / REGISTRY_FILENAME
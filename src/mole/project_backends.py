@@ -0,0 +1,286 @@
+"""project_backends.py - Where project records are read from.
+
+Projects live as `*.project.yaml` files in the nb 'home' notebook. The default backend asks the nb CLI for everything,
+which is always correct but pays for a bash launch per question. The filesystem backend locates the notebook directory
+once and then reads the files (and nb's own `.index`, for ids) directly.
+
+Set MOLE_PROJECT_BACKEND=fs to use the filesystem backend. Writes always go through nb regardless of the backend.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from pathlib import Path
+from typing import Any, Optional, Protocol, Union
+
+import yaml
+from pydantic import BaseModel
+
+from . import nb
+from .cache import cache_dir
+
+try:
+    from yaml import CLoader as Loader
+except ImportError:
+    from yaml import Loader
+
+
+READ_WORKERS = 8
+
+
+class ProjectRecord(BaseModel):
+    nb_id: int
+    name: str
+    path: str
+    data: dict[str, Any]  # Raw YAML mapping, validated into ProjectData by the caller
+
+
+class ProjectBackend(Protocol):
+    def scan(self) -> list[ProjectRecord]:
+        """Return a record for every project in the notebook."""
+        ...
+
+    def resolve(self, ref: Union[str, Path]) -> int:
+        """Return the nb id of the project with the given name or path. Raises ValueError if there is none."""
+        ...
+
+    def read(self, nb_id: int) -> ProjectRecord:
+        """Read a single project by id."""
+        ...
+
+    async def resolve_async(self, ref: Union[str, Path]) -> int:
+        """resolve, for use from asyncio."""
+        ...
+
+    async def read_async(self, nb_id: int) -> ProjectRecord:
+        """read, for use from asyncio."""
+        ...
+
+
+class NbCliBackend:
+    """Ask the nb CLI for everything. This is the default."""
+
+    def scan(self) -> list[ProjectRecord]:
+        output = nb.output(
+            "ls", "home:", "--no-color", "--type=project.yaml", "--paths"
+        )
+        if not output:
+            raise RuntimeError(
+                "Could not get projects, check `nb status`, there may be a git index issue."
+            )
+        if "0 project.yaml items" in output:
+            return []
+        paths = {
+            int(match.group(1)): Path(match.group(2).strip())
+            for match in re.finditer(r"^\[(\d+)\] (.+)$", output, re.MULTILINE)
+        }
+        # nb has told us where the files are, there's no need to `nb show` each of them
+        return read_records(paths)
+
+    def resolve(self, ref: Union[str, Path]) -> int:
+        try:
+            output = nb.output(*resolve_args(ref))
+        except subprocess.CalledProcessError as e:
+            raise_if_missing(e, ref)
+            raise
+        return parse_resolved(output, ref)
+
+    def read(self, nb_id: int) -> ProjectRecord:
+        record = nb.output("show", f"home:{nb_id}", "--no-color", "--print")
+        path = nb.output("ls", f"home:{nb_id}", "--no-color", "--paths", "--no-id")
+        return cli_record(nb_id, record, path)
+
+    async def resolve_async(self, ref: Union[str, Path]) -> int:
+        try:
+            output = await nb.output_async(*resolve_args(ref))
+        except subprocess.CalledProcessError as e:
+            raise_if_missing(e, ref)
+            raise
+        return parse_resolved(output, ref)
+
+    async def read_async(self, nb_id: int) -> ProjectRecord:
+        import asyncio
+
+        # The record and its path are independent questions, so ask them both at once
+        record, path = await asyncio.gather(
+            nb.output_async("show", f"home:{nb_id}", "--no-color", "--print"),
+            nb.output_async("ls", f"home:{nb_id}", "--no-color", "--paths", "--no-id"),
+        )
+        return cli_record(nb_id, record, path)
+
+
+def resolve_args(ref: Union[str, Path]) -> tuple[str, ...]:
+    """The nb command that lists the project with the given name or path."""
+    if isinstance(ref, Path):
+        return ("ls", "home:", "--no-color", "--filenames", str(ref))
+    return (
+        "search",
+        "home:",
+        "--no-color",
+        "-l",
+        "--type",
+        "project.yaml",
+        f"^# {ref}$",
+    )
+
+
+def raise_if_missing(error: subprocess.CalledProcessError, ref: Union[str, Path]):
+    """nb exits with 1 when nothing matched."""
+    if error.returncode == 1:
+        raise ValueError(f"Could not find project matching {ref}")
+
+
+def parse_resolved(output: str, ref: Union[str, Path]) -> int:
+    lines = output.strip().splitlines()
+    if len(lines) != 1:
+        raise RuntimeError(f"Found {len(lines)} projects matching {ref}")
+    match = re.match(r"^\[(\d+)\] .+$", lines[0])
+    if not match:
+        raise RuntimeError(f"Could not parse output: {output}")
+    return int(match.group(1))
+
+
+def cli_record(nb_id: int, record: str, path: str) -> ProjectRecord:
+    """A record from the output of `nb show --print` and `nb ls --paths` for the project."""
+    name, data = parse_record(record)
+    return ProjectRecord(
+        nb_id=nb_id, name=name, path=str(Path(path.strip())), data=data
+    )
+
+
+class FilesystemBackend:
+    """Read the home notebook's directory directly, without running nb."""
+
+    def __init__(self, notebook: Optional[Path] = None):
+        self.notebook = notebook or notebook_dir("home")
+
+    def ids(self) -> dict[int, Path]:
+        """Map nb ids to project files, numbered exactly the way nb numbers them."""
+        return {
+            nb_id: path
+            for nb_id, path in read_nb_index(self.notebook).items()
+            if path.name.endswith(".project.yaml") and path.exists()
+        }
+
+    def scan(self) -> list[ProjectRecord]:
+        return read_records(self.ids())
+
+    def resolve(self, ref: Union[str, Path]) -> int:
+        ids = self.ids()
+        if isinstance(ref, Path):
+            target = ref.expanduser()
+            for nb_id, path in ids.items():
+                if target.parent == Path(".") and path.name == target.name:
+                    return nb_id
+                if path == target.absolute():
+                    return nb_id
+        else:
+            title = f"# {ref}"
+            for nb_id, path in ids.items():
+                with path.open() as f:
+                    if f.readline().rstrip("\n") == title:
+                        return nb_id
+        raise ValueError(f"Could not find project matching {ref}")
+
+    async def resolve_async(self, ref: Union[str, Path]) -> int:
+        # Only reads files, which is quick enough not to need a thread
+        return self.resolve(ref)
+
+    async def read_async(self, nb_id: int) -> ProjectRecord:
+        return self.read(nb_id)
+
+    def read(self, nb_id: int) -> ProjectRecord:
+        path = read_nb_index(self.notebook).get(nb_id)
+        if path is None or not path.exists():
+            raise ValueError(f"Could not find project with id {nb_id}")
+        name, data = parse_record(path.read_text())
+        return ProjectRecord(nb_id=nb_id, name=name, path=str(path), data=data)
+
+
+@cache
+def get_backend() -> ProjectBackend:
+    """Return the configured project backend (see MOLE_PROJECT_BACKEND)."""
+    match os.environ.get("MOLE_PROJECT_BACKEND", "nb"):
+        case "nb":
+            return NbCliBackend()
+        case "fs":
+            return FilesystemBackend()
+        case other:
+            raise ValueError(f"Unknown MOLE_PROJECT_BACKEND {other}, use 'nb' or 'fs'")
+
+
+def read_records(paths: dict[int, Path]) -> list[ProjectRecord]:
+    """Read and parse project files in parallel, returning them in id order."""
+
+    def _read(item: tuple[int, Path]) -> ProjectRecord:
+        nb_id, path = item
+        name, data = parse_record(path.read_text())
+        return ProjectRecord(nb_id=nb_id, name=name, path=str(path), data=data)
+
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        return list(pool.map(_read, sorted(paths.items())))
+
+
+def parse_record(record: str) -> tuple[str, dict[str, Any]]:
+    """Split a Markdown+YAML project record into its name (the title) and its raw data."""
+    match = re.match(r"^# ([^\n]+)\n", record)
+    if not match:
+        raise RuntimeError(f"Could not parse output: {record}")
+    data = yaml.load(record, Loader=Loader) or {}
+    return match.group(1), data
+
+
+def read_nb_index(notebook: Path) -> dict[int, Path]:
+    """Parse nb's `.index` file: line N holds the filename with id N, and deleted items leave an empty line."""
+    lines = (notebook / ".index").read_text().splitlines()
+    return {nb_id: notebook / line for nb_id, line in enumerate(lines, start=1) if line}
+
+
+@cache
+def notebook_dir(name: str) -> Path:
+    """Return the directory of a global nb notebook.
+
+    nb keeps notebooks under NB_DIR (default ~/.nb). If NB_DIR isn't set in our environment it may still be set in
+    ~/.nbrc, so in that case nb is asked once and the answer is remembered in the cache dir.
+    """
+    if os.environ.get("NB_DIR"):
+        return Path(os.environ["NB_DIR"]).expanduser() / name
+
+    remembered = cache_dir() / "nb_dir"
+    if remembered.exists():
+        root = Path(remembered.read_text().strip())
+        if (root / name / ".index").exists():
+            return root / name
+
+    path = Path(nb.output("notebooks", "show", name, "--path", "--no-color").strip())
+    remembered.write_text(str(path.parent))
+    return path
+
+
+def local_notebook(start: Path) -> Optional[Path]:
+    """Return the nb local notebook containing start, if any: the nearest directory with both a `.git` and an `.index`."""
+    for directory in [start, *start.parents]:
+        if (directory / ".index").is_file() and (directory / ".git").exists():
+            return directory
+    return None
+
+
+def current_notebook() -> Path:
+    """Return the directory of the notebook nb would use for a selector with no notebook in it.
+
+    That is the local notebook if we're in one, and otherwise whichever global notebook was last chosen with `nb use`
+    (recorded in the `.current` file in the nb directory), defaulting to home.
+    """
+    local = local_notebook(Path.cwd())
+    if local is not None:
+        return local
+    root = notebook_dir("home").parent
+    try:
+        name = (root / ".current").read_text().strip()
+    except FileNotFoundError:
+        name = ""
+    return root / (name or "home")
@@ -0,0 +1,147 @@
+"""project_index.py - A persistent, on-disk index of the projects in the nb 'home' notebook.
+
+Resolving a project through nb costs a `nb search` and a `nb show`, each of which is a launch of a very large bash script.
+The index instead keeps the id, name, path and parsed data of every project in a JSON file under the mole cache dir, so
+that lookups are a file read. It is rebuilt from a single `nb ls` whenever the notebook's git HEAD, the notebook
+directory, or any of the project files change. The records themselves come from the configured project backend.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Union
+
+from pydantic import BaseModel, ValidationError
+
+from .cache import atomic_write, cache_dir
+from .project_backends import ProjectRecord, get_backend
+
+
+INDEX_VERSION = 1
+INDEX_FILENAME = "projects.json"
+
+IndexRef = Union[int, str, Path]
+
+
+class NotebookStamp(BaseModel):
+    """Everything that must stay the same for the index to still be valid."""
+
+    head: Optional[str]
+    dir_mtime_ns: int
+    files: dict[str, int]  # filename -> mtime_ns
+
+    @classmethod
+    def of(cls, notebook: Path, filenames: list[str]) -> NotebookStamp:
+        files = {}
+        for filename in filenames:
+            try:
+                files[filename] = (notebook / filename).stat().st_mtime_ns
+            except FileNotFoundError:
+                files[filename] = -1
+        return cls(
+            head=git_head(notebook),
+            dir_mtime_ns=notebook.stat().st_mtime_ns,
+            files=files,
+        )
+
+
+class ProjectIndex(BaseModel):
+    version: int = INDEX_VERSION
+    notebook: Optional[str] = None
+    stamp: Optional[NotebookStamp] = None
+    entries: list[ProjectRecord] = []
+
+    @classmethod
+    def load(cls) -> ProjectIndex:
+        """Return a fresh index, rebuilding (and persisting) it if the cached copy is missing or stale."""
+        path = index_path()
+        try:
+            index = cls.model_validate_json(path.read_bytes())
+        except (FileNotFoundError, ValueError, ValidationError):
+            index = None
+
+        if index is None or not index.is_fresh():
+            index = cls.build()
+            index.save()
+        return index
+
+    @classmethod
+    def build(cls) -> ProjectIndex:
+        """Build the index from scratch with a single scan of the project backend."""
+        entries = get_backend().scan()
+        if not entries:
+            return cls()
+        notebook = Path(entries[0].path).parent
+        stamp = NotebookStamp.of(notebook, [Path(e.path).name for e in entries])
+        return cls(notebook=str(notebook), stamp=stamp, entries=entries)
+
+    def save(self) -> None:
+        """Atomically write the index to the cache dir."""
+        atomic_write(index_path(), self.model_dump_json())
+
+    def is_fresh(self) -> bool:
+        if self.version != INDEX_VERSION:
+            return False
+        if self.notebook is None or self.stamp is None:
+            # An empty index can't tell when a project gets added, so it is always rebuilt.
+            return False
+        notebook = Path(self.notebook)
+        try:
+            current = NotebookStamp.of(notebook, list(self.stamp.files))
+        except FileNotFoundError:
+            return False
+        return current == self.stamp
+
+    def find(self, ref: IndexRef) -> Optional[ProjectRecord]:
+        """Find the entry for an id, name, or path (relative, absolute or a bare filename)."""
+        for entry in self.entries:
+            if isinstance(ref, int):
+                if entry.nb_id == ref:
+                    return entry
+            elif isinstance(ref, Path):
+                entry_path = Path(entry.path)
+                if ref.parent == Path("."):
+                    if entry_path.name == ref.name:
+                        return entry
+                elif entry_path == ref.expanduser().absolute():
+                    return entry
+            elif entry.name == ref:
+                return entry
+        return None
+
+
+def index_path() -> Path:
+    return cache_dir() / INDEX_FILENAME
+
+
+def lookup(ref: IndexRef) -> Optional[ProjectRecord]:
+    """Return the index entry for ref, or None if the index doesn't know about it."""
+    return ProjectIndex.load().find(ref)
+
+
+def invalidate() -> None:
+    """Throw away the on-disk index, forcing a rebuild on next use."""
+    index_path().unlink(missing_ok=True)
+
+
+def git_head(repo: Path) -> Optional[str]:
+    """Read the commit id of HEAD straight out of .git, without running git."""
+    git_dir = repo / ".git"
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not head.startswith("ref: "):
+        return head  # detached
+    ref = head.removeprefix("ref: ")
+    try:
+        return (git_dir / ref).read_text().strip()
+    except FileNotFoundError:
+        pass
+    try:
+        for line in (git_dir / "packed-refs").read_text().splitlines():
+            if line.endswith(f" {ref}"):
+                return line.split(" ", 1)[0]
+    except FileNotFoundError:
+        pass
+    return None
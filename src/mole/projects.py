@@ -2,14 +2,14 @@ from __future__ import annotations
 
 import os
 import re
+import shlex
 import subprocess
-import sys
-import textwrap
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Union
 
 import pendulum
 import typer
@@ -18,16 +18,25 @@ from pydantic import BaseModel, ConfigDict
 from rich import print
 from typing_extensions import Annotated
 
+from . import nb, project_index, sync, tracing
+from .cache import atomic_write, cache_dir
+from .project_backends import ProjectRecord, get_backend, local_notebook
+
+if TYPE_CHECKING:
+    from .todo_index import TodoIndex
+
 try:
     from yaml import CDumper as Dumper
-    from yaml import CLoader as Loader
 except ImportError:
-    from yaml import Dumper, Loader
+    from yaml import Dumper
 
 
 # Note that these names will be compared against Project.session_name.lower()
 FORBIDDEN_NAMES = ["none", "home"]
 
+# Upper bound on concurrent nb processes when loading projects the index doesn't know about
+LOAD_WORKERS = 4
+
 
 class BatColorChoice(str, Enum):
     always = "always"
@@ -37,6 +46,10 @@ class BatColorChoice(str, Enum):
 
 ProjectRef = Union[int, str, Path]
 
+# Set by zonein for everything in the session it starts, see ProjectSnapshot
+SNAPSHOT_VARIABLE = "MOLE_PROJECT_SNAPSHOT"
+SNAPSHOT_VERSION = 1
+
 
 class AssistantData(BaseModel):
     """Data for the TyperAssistant for this project"""
@@ -58,6 +71,46 @@ class ProjectData(BaseModel):
     zellij_layout: Optional[str] = None
 
 
+class ProjectSnapshot(BaseModel):
+    """A project as zonein loaded it, handed down through the environment to every mole run in its session.
+
+    MOLE_PROJECT names the project for those runs, and without this each of them would resolve that name again. With
+    it, Project.load rebuilds the project straight from the snapshot, as long as the project file hasn't been modified
+    since (otherwise, or for any other project, loading carries on as usual).
+    """
+
+    version: int = SNAPSHOT_VERSION
+    record: ProjectRecord
+    mtime_ns: int  # of the project file, when the snapshot was taken
+
+    def is_for(self, ref: ProjectRef) -> bool:
+        if isinstance(ref, int):
+            return ref == self.record.nb_id
+        if isinstance(ref, str):
+            return ref == self.record.name
+        return False
+
+    def is_fresh(self) -> bool:
+        try:
+            return Path(self.record.path).stat().st_mtime_ns == self.mtime_ns
+        except OSError:
+            return False
+
+
+def snapshot_record(ref: ProjectRef) -> Optional[ProjectRecord]:
+    """The record in MOLE_PROJECT_SNAPSHOT, if there is one for ref and it's still fresh."""
+    raw = os.environ.get(SNAPSHOT_VARIABLE)
+    if not raw:
+        return None
+    try:
+        snapshot = ProjectSnapshot.model_validate_json(raw)
+    except ValueError:
+        return None
+    if snapshot.version != SNAPSHOT_VERSION or not snapshot.is_for(ref):
+        return None
+    return snapshot.record if snapshot.is_fresh() else None
+
+
 @dataclass(frozen=True)
 class Project:
     """A project is a combined Markdown and YAML serialized file.
@@ -78,77 +131,103 @@ class Project:
         It is slightly more efficient to load by id (int), since this avoids a call to nb, but this is not required.
 
         If providing a path, it can be relative, absolute, or a bare filename. See `nb ls` and `nb search` for more details on the search methods used.
+
+        Projects are taken from the snapshot zonein leaves in the environment if it's for ref (see ProjectSnapshot), then
+        resolved from the on-disk project index (see project_index.py), and the project backend (see
+        project_backends.py) is only consulted if the index doesn't know about ref.
         """
-        if isinstance(ref, int):
-            nb_id = ref
-        else:
-            try:
-                if isinstance(ref, Path):
-                    output = (
-                        subprocess.check_output(
-                            ["nb", "ls", "home:", "--no-color", "--filenames", str(ref)]
-                        )
-                        .decode()
-                        .strip()
-                    )
-                else:
-                    output = (
-                        subprocess.check_output(
-                            [
-                                "nb",
-                                "search",
-                                "home:",
-                                "--no-color",
-                                "-l",
-                                "--type",
-                                "project.yaml",
-                                f"^# {ref}$",
-                            ]
-                        )
-                        .decode()
-                        .strip()
-                    )
-            except subprocess.CalledProcessError as e:
-                if e.returncode == 1:
-                    raise ValueError(f"Could not find project matching {ref}")
-                raise
-            lines = output.splitlines()
-            if len(lines) != 1:
-                raise RuntimeError(f"Found {len(lines)} projects matching {ref}")
-            match = re.match(r"^\[(\d+)\] .+$", lines[0])
-            if not match:
-                raise RuntimeError(f"Could not parse output: {output}")
-            nb_id = int(match.group(1))
-
-        record = subprocess.check_output(
-            ["nb", "show", f"home:{nb_id}", "--no-color", "--print"]
-        ).decode()
-        match = re.match(r"^# ([^\n]+)\n", record)
-        if not match:
-            raise RuntimeError(f"Could not parse output: {record}")
-        name = match.group(1)
-        data = yaml.load(record, Loader=Loader)
+        record = snapshot_record(ref) or project_index.lookup(ref)
+        if record is None:
+            backend = get_backend()
+            nb_id = ref if isinstance(ref, int) else backend.resolve(ref)
+            record = backend.read(nb_id)
+        return cls.from_record(record)
+
+    @classmethod
+    async def load_async(cls, ref: ProjectRef) -> Project:
+        """load, for use from asyncio, so that a project missing from the index doesn't hold up anything else."""
+        record = snapshot_record(ref) or project_index.lookup(ref)
+        if record is None:
+            backend = get_backend()
+            nb_id = ref if isinstance(ref, int) else await backend.resolve_async(ref)
+            record = await backend.read_async(nb_id)
+        return cls.from_record(record)
+
+    @classmethod
+    def load_many(cls, refs: Iterable[ProjectRef]) -> List[Project]:
+        """Load several projects at once, in the order given.
 
-        return cls(nb_id, name, data=ProjectData(**data))
+        Everything the project index knows about is answered from a single index load. Any stragglers are loaded
+        through the backend on a bounded thread pool, so they cost a few rounds of nb latency instead of one per ref.
+        """
+        refs = [*refs]  # (the `list` command below shadows the builtin in this module)
+        index = project_index.ProjectIndex.load()
+        projects: List[Optional[Project]] = []
+        for ref in refs:
+            record = index.find(ref)
+            projects.append(cls.from_record(record) if record is not None else None)
+
+        misses = [i for i, project in enumerate(projects) if project is None]
+        if misses:
+            with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+                loaded = pool.map(cls.load, [refs[i] for i in misses])
+                for i, project in zip(misses, loaded):
+                    projects[i] = project
+        return [project for project in projects if project is not None]
+
+    @classmethod
+    def all(cls) -> List[Project]:
+        """Load every project, in id order, from one listing pass."""
+        return [
+            cls.from_record(record)
+            for record in project_index.ProjectIndex.load().entries
+        ]
+
+    @classmethod
+    def from_record(cls, record: ProjectRecord) -> Project:
+        return cls(record.nb_id, record.name, data=ProjectData(**record.data))
 
     @classmethod
     def from_fzf(cls) -> Project:
-        """Prompt the user to choose a project using fzf."""
-        mole_cmd = "mole"
-        if sys.argv[0].endswith("__main__.py"):
-            mole_cmd = f"{sys.executable} -m {mole_cmd}"
+        """Prompt the user to choose a project using fzf.
+
+        fzf is started before anything is loaded, and names are streamed in as soon as they're known. Previews are
+        served by bat from pre-rendered files (see render_previews), rather than by launching a whole mole process every
+        time the highlighted row changes. They're only brought up to date once the names are in, so a preview that's
+        missing on first use fills in when the row is highlighted again.
+        """
+        previews = shlex.quote(str(preview_dir()))
         command = [
             "fzf",
             "--prompt",
             "Choose a project: ",
             "--preview",
-            f"{mole_cmd} projects show --color=always {{}}",
+            # fzf quotes {} itself, and adjacent quoted strings concatenate in sh
+            f"bat --color=always --style=plain --language=yaml {previews}/{{}}.project.yaml",
         ]
-        choices = "\n".join(sorted(project_names(), reverse=True))
-        choice = (
-            subprocess.check_output(command, input=choices.encode()).decode().strip()
-        )
-        return cls.load(choice)
+        with tracing.subprocess_span(command) as span:
+            fzf = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+            )
+            assert fzf.stdin is not None and fzf.stdout is not None
+
+            index = project_index.ProjectIndex.load()
+            entries = sorted(index.entries, key=lambda entry: entry.name, reverse=True)
+            try:
+                fzf.stdin.write("".join(f"{e.name}\n" for e in entries).encode())
+                fzf.stdin.flush()
+                # The list is up, so the previews can follow, in the order fzf shows the names
+                render_previews(entries)
+                fzf.stdin.close()
+            except BrokenPipeError:
+                pass  # The user made a choice (or gave up) before we were done
+            choice = fzf.stdout.read().decode().strip()
+            span["returncode"] = fzf.wait()
+        if fzf.returncode != 0:
+            raise subprocess.CalledProcessError(fzf.returncode, command)
+
+        record = index.find(choice)
+        return cls.from_record(record) if record is not None else cls.load(choice)
 
     @classmethod
     def create(cls, name: str) -> Project:
@@ -180,91 +259,38 @@ class Project:
         no_spaces = self.name.lower().replace(" ", "_")
         return "".join([c if c.isalnum() else "-" for c in no_spaces])
 
+    def notebook_names(self) -> List[str]:
+        """Name the project's notebooks as log search does: its global notebook, and the local notebook its working
+        directory is in, if any."""
+        names = [self.session_name]
+        if self.data.cwd is not None:
+            local = local_notebook(Path(self.data.cwd).expanduser())
+            if local is not None:
+                names.append(str(local))
+        return names
+
     @property
     def file(self) -> Path:
         """Return the full path to the project file."""
         if self.nb_id == -1:
             raise RuntimeError("Cannot get file for dummy project")
-        path = Path(
-            subprocess.check_output(
-                ["nb", "ls", f"home:{self.nb_id}", "--no-color", "--paths", "--no-id"]
-            )
-            .decode()
-            .strip()
-        )
+        record = project_index.lookup(self.nb_id) or get_backend().read(self.nb_id)
+        path = Path(record.path)
         assert path.exists()
         return path
 
+    def snapshot(self) -> str:
+        """Serialize the project for MOLE_PROJECT_SNAPSHOT, see ProjectSnapshot."""
+        record = project_index.lookup(self.nb_id) or get_backend().read(self.nb_id)
+        mtime_ns = Path(record.path).stat().st_mtime_ns
+        return ProjectSnapshot(record=record, mtime_ns=mtime_ns).model_dump_json()
+
     @property
     def zellij_layout(self) -> str:
-        """Return the zellij layout for this project."""
-        if self.data.zellij_layout is not None:
-            return self.data.zellij_layout
-
-        shell = os.environ.get("SHELL", "bash")
-        task_command = [shell, "-c", "exec $SHELL -i"]
-        if self.data.poetry:
-            main_pane = textwrap.dedent(
-                """\
-            pane {
-                command "poetry"
-                args "shell"
-            }
-            """
-            )
-        else:
-            main_pane = "pane"
-
-        layout = textwrap.dedent(
-            f"""\
-        layout {{
-                tab_template name="molebar" {{
-                        pane size=1 borderless=true {{
-                                plugin location="zellij:tab-bar"
-                        }}
-                        pane split_direction="vertical" {{
-                                pane size="60%" name="main" {{
-                                        children
-                                }}
-
-                                pane stacked=true name="molestack" {{
-                                        pane name="log" focus=true {{
-                                                command "mole"
-                                                args "log"
-                                        }}
-                                        pane name="tasks" {{
-                                                command "{task_command[0]}"
-                                                args {" ".join(f'"{arg}"' for arg in task_command[1:])}
-                                        }}
-                                }}
-                        }}
-
-                        pane size=2 borderless=true {{
-                                plugin location="zellij:status-bar"
-                        }}
-                }}
-
-                default_tab_template {{
-                        pane size=1 borderless=true {{
-                                plugin location="zellij:tab-bar"
-                        }}
-
-                        children
-
-                        pane size=2 borderless=true {{
-                                plugin location="zellij:status-bar"
-                        }}
-                }}
-
-                molebar name="Project: {self.name}" {{
-                    {main_pane}
-                }}
-        }}
-        session_serialization false
-        """
-        )
+        """Return the zellij layout for this project, see layouts.py."""
+        from . import layouts
 
-        return layout
+        return layouts.layout_file(self).read_text()
 
     def dump(self, title: bool = True) -> str:
         """Dump the project to a Markdown+YAML string, as expected by load()
@@ -281,29 +307,26 @@ class Project:
     def write(self):
         """Write the project to disk. This is not thread-safe."""
         # Race condition: if the file is modified between the read and the write, the changes will be lost, etc.
-        # nb sync manages collision at the git level, at least, so network effects are usually not a problem.
+        # nb sync manages collision at the git level, at least, so network effects are usually not a problem. The sync
+        # itself happens later, see sync.py.
         if self.nb_id == -1:
             # Sentinel: this is a dummy project, so we need to create it
             self.nb_add_file(self.name, "project.yaml", self.dump(title=False))
         else:
-            subprocess.check_output(
-                [
-                    "nb",
-                    "edit",
-                    f"home:{self.nb_id}",
-                    "--overwrite",
-                    "--content",
-                    self.dump(title=True),
-                ]
+            nb.output(
+                "edit",
+                f"home:{self.nb_id}",
+                "--overwrite",
+                "--content",
+                self.dump(title=True),
             )
-        subprocess.check_output(["nb", "sync"])
+        sync.mark_dirty("home")
 
     def nb_add_file(
         self, name: str, filetype: str, content: Optional[str] = None
     ) -> int:
         """Add a file to the notebook"""
         command = [
-            "nb",
             "add",
             "home:",
             "--no-color",
@@ -313,22 +336,21 @@ class Project:
         ]
         if content:
             command.extend(["--content", content])
-        output = subprocess.check_output(command).decode()
+        output = nb.output(*command)
         match = re.match(r"Added: \[(\d+)\]", output)
         if not match:
             raise RuntimeError(f"Could not parse output: {output}")
         return int(match.group(1))
 
-    def list_todos(self) -> List[str]:
-        """List the labels of all the open todos in this project."""
-        command = ["nb", "todos", "--no-color", f"{self.session_name}:", "open"]
-        try:
-            output = subprocess.check_output(command).decode()
-        except subprocess.CalledProcessError as e:
-            if e.returncode == 1:
-                return []
-            raise
-        return [line.strip() for line in output.splitlines()]
+    def list_todos(self, index: Optional[TodoIndex] = None) -> List[str]:
+        """List the open todos in this project, formatted like `nb todos` does, e.g. `[session:3] [ ] Title`."""
+        if index is None:
+            from .todo_index import TodoIndex  # (which imports this module)
+
+            index = TodoIndex.load()
+        return [
+            entry.line for entry in index.entries(self.session_name) if not entry.done
+        ]
 
 
 @dataclass(frozen=True)
@@ -337,8 +359,14 @@ class ToDo:
     todo: int
 
     @classmethod
-    def from_fzf(cls, project: Project) -> Optional[ToDo]:
-        """Prompt the user to choose a TODO using fzf."""
+    def from_fzf(
+        cls, project: Project, todos: Optional[Callable[[], Iterable[str]]] = None
+    ) -> Optional[ToDo]:
+        """Prompt the user to choose a TODO using fzf.
+
+        As with Project.from_fzf, fzf is up before the todos are listed (by project.list_todos, unless todos is given),
+        and they're streamed in once they are.
+        """
         command = [
             "fzf",
             "--prompt",
@@ -346,11 +374,24 @@ class ToDo:
             "--preview",
             "nb show --color=always {}",
         ]
-        choices = "None\n" + "\n".join(sorted(project.list_todos(), reverse=True))
-        choice = (
-            subprocess.check_output(command, input=choices.encode()).decode().strip()
-        )
-        match = re.match(r"^\[(\w+):(\d+)\] .+$", choice)
+        with tracing.subprocess_span(command) as span:
+            fzf = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+            )
+            assert fzf.stdin is not None and fzf.stdout is not None
+            try:
+                fzf.stdin.write(b"None\n")
+                fzf.stdin.flush()
+                for line in sorted((todos or project.list_todos)(), reverse=True):
+                    fzf.stdin.write(f"{line}\n".encode())
+                fzf.stdin.close()
+            except BrokenPipeError:
+                pass
+            choice = fzf.stdout.read().decode().strip()
+            span["returncode"] = fzf.wait()
+        if fzf.returncode != 0:
+            raise subprocess.CalledProcessError(fzf.returncode, command)
+        match = re.match(r"^\[([\w-]+):(\d+)\] .+$", choice)
         if not match:
             return None
         if match.group(1) != project.session_name:
@@ -359,22 +400,34 @@ class ToDo:
 
     @classmethod
     def from_label(cls, label: str) -> ToDo:
-        """Parse a label into a ToDo"""
-        match = re.match(r"^((\w+):)?(\d+)$", label)
+        """Parse a label into a ToDo.
+
+        The project is found through the todo index (see todo_index.py), so this only falls back to resolving the
+        label's session name as a project name when the todo isn't indexed.
+        """
+        from .todo_index import TodoIndex
+
+        match = re.match(r"^(([\w-]+):)?(\d+)$", label)
         if not match:
             raise ValueError(f"Could not parse label {label}")
-        project_name = match.group(2)
+        session_name = match.group(2)
         todo = int(match.group(3))
-        if project_name:
-            project = Project.load(project_name)
-        elif os.environ.get("MOLE_PROJECT"):
+        project = None
+        if session_name is None:
+            if not os.environ.get("MOLE_PROJECT"):
+                # While although we COULD assume a "home:" notebook in this case, this would mean we need to support
+                # ToDos that do not belong to a project, and at the moment we want to ensure this tight coupling of
+                # ToDos and Projects, so we raise an error instead.
+                raise ValueError(f"Could not parse label {label}: no project specified")
             project = Project.load(os.environ["MOLE_PROJECT"])
-            project_name = project.session_name
-        else:
-            # While although we COULD assume a "home:" notebook in this case, this would mean we need to support ToDos
-            # that do not belong to a project, and at the moment we want to ensure this tight coupling of ToDos and
-            # Projects, so we raise an error instead.
-            raise ValueError(f"Could not parse label {label}: no project specified")
+            session_name = project.session_name
+
+        entry = TodoIndex.load().find(f"{session_name}:{todo}")
+        if entry is not None and entry.project is not None:
+            if project is None or project.name != entry.project:
+                project = Project.load(entry.project)
+        elif project is None:
+            project = Project.load(session_name)
         return cls(project, todo)
 
     @property
@@ -392,46 +445,56 @@ ToDoOption = Annotated[
 ]
 
 
-def project_ids() -> set[int]:
-    """Return a set of project ids by querying nb."""
-    output = subprocess.check_output(
-        ["nb", "ls", "home:", "--no-color", "--type=project.yaml"]
-    ).decode()
-    if not output:
-        raise RuntimeError(
-            "Could not get projects, check `nb status`, there may be a git index issue."
-        )
-    if "0 project.yaml items" in output:
-        return set()
+def preview_dir() -> Path:
+    path = cache_dir() / "previews"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def render_previews(records: Iterable[ProjectRecord]) -> None:
+    """Keep a copy of each project file, named after the project, in the preview dir for the fzf picker to show.
+
+    Only previews that are missing or older than their project file are written.
+    """
+    directory = preview_dir()
+    for record in records:
+        if "/" in record.name:
+            continue
+        source = Path(record.path)
+        preview = directory / f"{record.name}.project.yaml"
+        try:
+            if preview.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        try:
+            atomic_write(preview, source.read_bytes())
+        except FileNotFoundError:
+            continue  # The project went away since the index was built
+
+
+def session_projects() -> dict[str, str]:
+    """Map each project's session name, which is also the name of its global notebook, to the project's name."""
     return {
-        int(match.group(1))
-        for match in re.finditer(r"^\[(\d+)\] .+$", output, re.MULTILINE)
+        Project.from_record(record).session_name: record.name
+        for record in project_index.ProjectIndex.load().entries
     }
 
 
+def project_ids() -> set[int]:
+    """Return a set of project ids from the project index."""
+    return {entry.nb_id for entry in project_index.ProjectIndex.load().entries}
+
+
 def project_names() -> set[str]:
-    """Return a set of project names by querying nb."""
-    output = subprocess.check_output(
-        ["nb", "ls", "home:", "--no-color", "--type=project.yaml", "--excerpt", "1"]
-    ).decode()
-    # The output is a series of 4-line groups, like this:
-    # [1] Project file
-    # ----------------
-    # # Project Name
-    # <empty line>
-    if not output:
-        raise RuntimeError(
-            "Could not get projects, check `nb status`, there may be a git index issue."
-        )
-    if "0 project.yaml items" in output:
-        return set()
+    """Return a set of project names from the project index."""
     found = set()
-    for match in re.finditer(r"^\[(\d+)\] .+\n-+\n# (.+)\n$", output, re.MULTILINE):
-        if match.group(2) in found:
+    for entry in project_index.ProjectIndex.load().entries:
+        if entry.name in found:
             raise RuntimeError(
-                f"Duplicate project name: {match.group(2)} (one has id {match.group(1)})"
+                f"Duplicate project name: {entry.name} (one has id {entry.nb_id})"
             )
-        found.add(match.group(2))
+        found.add(entry.name)
     return found
 
 
@@ -476,12 +539,27 @@ def show(name: str, color: BatColorChoice = BatColorChoice.auto):
 def edit(name: str):
     """Edit a project"""
     project = Project.load(name)
-    subprocess.run(["nb", "edit", f"home:{project.file}"])
-    subprocess.run(["nb", "sync"])
+    nb.run("edit", f"home:{project.file}", check=False)
+    sync.mark_dirty("home")
+
+
+@app.command()
+def reindex():
+    """Rebuild the on-disk project index"""
+    project_index.invalidate()
+    index = project_index.ProjectIndex.load()
+    print(f"Indexed {len(index.entries)} projects")
 
 
 @app.command()
 def layout(name: str):
     """Print the zellij layout for a project"""
+    from .layouts import TemplateError
+
     project = Project.load(name)
-    print(project.zellij_layout)
+    try:
+        layout = project.zellij_layout
+    except TemplateError as e:
+        print(f"🐭 Error: {e}")
+        raise typer.Exit(1)
+    print(layout)
@@ -0,0 +1,132 @@
+"""sync.py - Write-behind scheduling for `nb sync`.
+
+An `nb sync` is a git pull, commit and push, and mole used to run one after every single write. Instead, writers now
+just mark the notebooks they touched as dirty. When the process exits, one detached `mole sync --flush` is started (if
+one isn't already waiting), which waits for writes to go quiet and then runs a single sync for everything that piled up.
+
+Set MOLE_SYNC=foreground to flush in-process at exit instead, e.g. on a machine where nothing should outlive mole.
+"""
+
+from __future__ import annotations
+
+import atexit
+import fcntl
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from . import nb, tracing
+from .cache import cache_dir, file_lock
+
+ALL = "*"  # Sync every notebook
+DEBOUNCE = 5.0  # seconds of quiet before a background flush syncs
+MAX_WAIT = 60.0  # but never wait longer than this in total
+
+_scheduled = False
+
+
+def sync_dir() -> Path:
+    path = cache_dir() / "sync"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def mark_dirty(notebook: str = ALL) -> None:
+    """Record that notebook (or every notebook, by default) needs syncing, and make sure a flush happens at exit."""
+    global _scheduled
+    with file_lock(sync_dir() / "dirty.lock"):
+        with open(sync_dir() / "dirty", "a") as f:
+            f.write(f"{notebook}\n")
+    if not _scheduled:
+        _scheduled = True
+        atexit.register(schedule_flush)
+
+
+def pending() -> set[str]:
+    """The notebooks waiting to be synced."""
+    try:
+        return set((sync_dir() / "dirty").read_text().split())
+    except FileNotFoundError:
+        return set()
+
+
+def flusher_running() -> bool:
+    with file_lock(sync_dir() / "flusher.lock", blocking=False) as acquired:
+        return not acquired
+
+
+def schedule_flush() -> None:
+    """Make sure pending notebooks will get synced, without making the caller wait unless MOLE_SYNC=foreground."""
+    if not pending():
+        return
+    if os.environ.get("MOLE_SYNC") == "foreground":
+        flush()
+        return
+    if flusher_running():
+        return  # It will pick up our notebooks before it exits, see flush()
+    with open(sync_dir() / "flush.log", "a") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "mole", "sync", "--flush", "--delay", str(DEBOUNCE)],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+
+def flush(delay: float = 0.0, wait: bool = False) -> bool:
+    """Sync every pending notebook, after waiting for `delay` seconds without new writes.
+
+    If another flush is already in progress, either wait for it to finish first (wait=True) or return False without
+    doing anything. Otherwise keeps syncing until there's nothing left pending, so that writes which land mid-sync
+    aren't stranded.
+    """
+    with open(sync_dir() / "flusher.lock", "a") as flusher:
+        try:
+            fcntl.flock(flusher, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+
+        start = time.monotonic()
+        while True:
+            wait_for_quiet(delay, deadline=start + MAX_WAIT)
+            with file_lock(sync_dir() / "dirty.lock"):
+                notebooks = pending()
+                if not notebooks:
+                    # Let go of the flusher lock while still holding the dirty lock: any writer that marks a notebook
+                    # after this point will see no flusher running and start a new one.
+                    fcntl.flock(flusher, fcntl.LOCK_UN)
+                    return True
+                (sync_dir() / "dirty").unlink()
+
+            with tracing.span("sync", notebooks=sorted(notebooks)):
+                result = run_sync(notebooks)
+            if result.returncode != 0:
+                with file_lock(sync_dir() / "dirty.lock"):
+                    with open(sync_dir() / "dirty", "a") as f:
+                        f.writelines(f"{notebook}\n" for notebook in notebooks)
+                fcntl.flock(flusher, fcntl.LOCK_UN)
+                raise RuntimeError(
+                    f"nb sync failed with exit code {result.returncode}, will retry on the next write"
+                )
+
+
+def wait_for_quiet(delay: float, deadline: float) -> None:
+    """Sleep until nothing has been marked dirty for `delay` seconds, or until the deadline."""
+    while delay > 0:
+        try:
+            quiet_for = time.time() - (sync_dir() / "dirty").stat().st_mtime
+        except FileNotFoundError:
+            quiet_for = delay
+        remaining = min(delay - quiet_for, deadline - time.monotonic())
+        if remaining <= 0:
+            return
+        time.sleep(remaining)
+
+
+def run_sync(notebooks: set[str]) -> subprocess.CompletedProcess:
+    if notebooks == {"home"}:
+        return nb.run("sync", check=False)
+    return nb.run("sync", "--all", check=False)
@@ -0,0 +1,197 @@
+"""todo_index.py - A persistent, on-disk index of the todos in every project notebook.
+
+nb keeps each todo as a `*.todo.md` file whose title line is `# [ ] Title` (or `# [x] Title` once done), and `nb todos`
+finds them by launching nb and scanning one notebook at a time. The index instead keeps the label, title, state and
+project of every todo in a JSON file under the mole cache dir, and is brought up to date on every load by comparing
+mtimes: a notebook's listing is only re-read when its directory or `.index` changed, and a todo file only when it did.
+`*.todo.md` files that don't start with a todo's title line are remembered with their mtimes too, so that one edited
+into a todo is picked up like any other edit. Only the top level of each notebook is indexed, nb's folders are not
+descended into.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from .cache import atomic_write, cache_dir
+from .project_backends import notebook_dir, read_nb_index
+from .projects import session_projects
+
+INDEX_VERSION = 2
+INDEX_FILENAME = "todos.json"
+
+
+class TodoEntry(BaseModel):
+    notebook: str
+    nb_id: int
+    title: str
+    done: bool
+    path: str
+    mtime_ns: int
+    # The name of the project owning the notebook, if any. Assigned on every load rather than stored, since projects can
+    # be renamed without their todo notebooks changing.
+    project: Optional[str] = Field(default=None, exclude=True)
+
+    @property
+    def label(self) -> str:
+        return f"{self.notebook}:{self.nb_id}"
+
+    @property
+    def line(self) -> str:
+        """The todo as `nb todos` would list it, e.g. `[project:3] [ ] Title`."""
+        return f"[{self.label}] [{'x' if self.done else ' '}] {self.title}"
+
+
+class SkippedFile(BaseModel):
+    """A `*.todo.md` file that didn't look like a todo when it was last read."""
+
+    nb_id: int
+    path: str
+    mtime_ns: int
+
+
+class NotebookTodos(BaseModel):
+    dir_mtime_ns: int
+    index_mtime_ns: int
+    entries: list[TodoEntry] = []
+    skipped: list[SkippedFile] = []
+
+
+class TodoIndex(BaseModel):
+    version: int = INDEX_VERSION
+    root: Optional[str] = None
+    notebooks: dict[str, NotebookTodos] = {}
+
+    @classmethod
+    def load(cls) -> TodoIndex:
+        """Return an up to date index, refreshing (and persisting) whatever changed since it was last saved."""
+        path = index_path()
+        try:
+            index = cls.model_validate_json(path.read_bytes())
+        except (FileNotFoundError, ValueError, ValidationError):
+            index = cls()
+        if index.version != INDEX_VERSION:
+            index = cls()
+
+        if index.refresh():
+            index.save()
+        index.assign_projects()
+        return index
+
+    def refresh(self) -> bool:
+        """Bring every notebook under the nb root up to date, returning whether anything changed."""
+        root = notebook_dir("home").parent
+        if self.root != str(root):
+            self.root = str(root)
+            self.notebooks = {}
+
+        notebooks = {}
+        for notebook in sorted(root.iterdir()):
+            if notebook.name.startswith(".") or notebook.name == "home":
+                continue
+            if not (notebook / ".index").is_file():
+                continue
+            notebooks[notebook.name] = scan_notebook(
+                notebook, self.notebooks.get(notebook.name)
+            )
+
+        changed = notebooks != self.notebooks
+        self.notebooks = notebooks
+        return changed
+
+    def assign_projects(self) -> None:
+        """Point each todo at the project whose session name matches its notebook."""
+        projects = session_projects()
+        for entry in self.entries():
+            entry.project = projects.get(entry.notebook)
+
+    def save(self) -> None:
+        """Atomically write the index to the cache dir."""
+        atomic_write(index_path(), self.model_dump_json())
+
+    def entries(self, notebook: Optional[str] = None) -> Iterator[TodoEntry]:
+        """Every todo, or those of one notebook, in notebook and then id order."""
+        for name, todos in self.notebooks.items():
+            if notebook is None or name == notebook:
+                yield from todos.entries
+
+    def find(self, label: str) -> Optional[TodoEntry]:
+        """Find a todo by its `notebook:id` label."""
+        notebook, _, nb_id = label.partition(":")
+        for entry in self.entries(notebook):
+            if str(entry.nb_id) == nb_id:
+                return entry
+        return None
+
+
+def scan_notebook(notebook: Path, previous: Optional[NotebookTodos]) -> NotebookTodos:
+    """Index the todos in notebook, reusing what previous knew of every file whose mtime is unchanged."""
+    dir_mtime_ns = notebook.stat().st_mtime_ns
+    index_mtime_ns = (notebook / ".index").stat().st_mtime_ns
+    known: dict[str, TodoEntry | SkippedFile] = {}
+    if previous is not None:
+        known = {f.path: f for f in [*previous.entries, *previous.skipped]}
+    if (
+        previous is not None
+        and previous.dir_mtime_ns == dir_mtime_ns
+        and previous.index_mtime_ns == index_mtime_ns
+    ):
+        # No file was added, removed or renumbered: just look for edits
+        candidates = {f.nb_id: Path(f.path) for f in known.values()}
+    else:
+        candidates = {
+            nb_id: path
+            for nb_id, path in read_nb_index(notebook).items()
+            if path.name.endswith(".todo.md")
+        }
+
+    todos = NotebookTodos(dir_mtime_ns=dir_mtime_ns, index_mtime_ns=index_mtime_ns)
+    for nb_id, path in sorted(candidates.items()):
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+            seen = known.get(str(path))
+            if seen is None or seen.mtime_ns != mtime_ns or seen.nb_id != nb_id:
+                seen = read_todo(notebook.name, nb_id, path, mtime_ns)
+        except FileNotFoundError:
+            continue  # Deleted since the listing
+        if seen is None:
+            seen = SkippedFile(nb_id=nb_id, path=str(path), mtime_ns=mtime_ns)
+        if isinstance(seen, TodoEntry):
+            todos.entries.append(seen)
+        else:
+            todos.skipped.append(seen)
+    return todos
+
+
+def read_todo(
+    notebook: str, nb_id: int, path: Path, mtime_ns: int
+) -> Optional[TodoEntry]:
+    """Parse a todo's title line, returning None if the file doesn't look like a todo."""
+    with path.open() as f:
+        first = f.readline().strip()
+    if first.startswith("# [ ] "):
+        done = False
+    elif first[:6] in ("# [x] ", "# [X] "):
+        done = True
+    else:
+        return None
+    return TodoEntry(
+        notebook=notebook,
+        nb_id=nb_id,
+        title=first[6:].strip(),
+        done=done,
+        path=str(path),
+        mtime_ns=mtime_ns,
+    )
+
+
+def index_path() -> Path:
+    return cache_dir() / INDEX_FILENAME
+
+
+def invalidate() -> None:
+    """Throw away the on-disk index, forcing a full rescan on next use."""
+    index_path().unlink(missing_ok=True)
@@ -0,0 +1,189 @@
+"""tracing.py - Opt-in timing of where mole's time goes, in Chrome's trace event format.
+
+Set MOLE_TRACE to a file path and every mole process (children included, since they inherit the variable) appends a
+span to it for each phase of the commands that are instrumented (zonein, log) and for each subprocess they run (nb, fzf,
+zellij), with its argv and exit code. Open the file in chrome://tracing or https://ui.perfetto.dev to see one run, or
+use `mole trace summary` to find the slowest phases across all of them.
+
+Events are appended one per line to a JSON array that is never closed, which the trace event format allows for, so any
+number of processes can write to the same file at once and runs accumulate until the file is deleted. When MOLE_TRACE
+isn't set, spans cost one environment lookup.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar
+
+import typer
+
+TRACE_VARIABLE = "MOLE_TRACE"
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+# The trace file this process has introduced itself to
+_named_process: Optional[str] = None
+
+
+def trace_path() -> Optional[Path]:
+    path = os.environ.get(TRACE_VARIABLE)
+    return Path(path) if path else None
+
+
+@contextmanager
+def span(name: str, category: str = "phase", **args: Any) -> Iterator[dict[str, Any]]:
+    """Record the block as a span, if tracing. Yields the span's args, for adding to as it goes (e.g. a returncode)."""
+    path = trace_path()
+    if path is None:
+        yield args
+        return
+    start = time.time()
+    try:
+        yield args
+    finally:
+        record(
+            path,
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": int(start * 1e6),
+                "dur": int((time.time() - start) * 1e6),
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": args,
+            },
+        )
+
+
+@contextmanager
+def subprocess_span(
+    argv: list[str], name: Optional[str] = None
+) -> Iterator[dict[str, Any]]:
+    """Record a subprocess as a span named for the program (or name), with its argv. Set "returncode" in the args."""
+    with span(name or Path(argv[0]).name, "subprocess", argv=argv) as args:
+        yield args
+
+
+def traced(name: str, function: Callable[..., T]) -> Callable[..., T]:
+    """Wrap function so that every call to it is recorded as a span, e.g. for handing to a thread pool."""
+
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        with span(name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def record(path: Path, event: dict[str, Any]) -> None:
+    """Append an event to the trace, starting the file (and naming this process in it) if need be."""
+    global _named_process
+    with _lock:
+        lines = []
+        if _named_process != str(path):
+            _named_process = str(path)
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                lines.append("[")
+            except FileExistsError:
+                pass
+            command = " ".join(["mole", *sys.argv[1:]])
+            lines.append(
+                json.dumps(
+                    {
+                        "name": "process_name",
+                        "ph": "M",
+                        "pid": os.getpid(),
+                        "args": {"name": command},
+                    }
+                )
+                + ","
+            )
+        lines.append(json.dumps(event, default=str) + ",")
+        with open(path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def read_events(path: Path) -> Iterator[dict[str, Any]]:
+    """The events in a trace, skipping any line that isn't one (such as one being written as we read)."""
+    with open(path) as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if not line.startswith("{"):
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+@dataclass
+class PhaseStats:
+    category: str
+    name: str
+    durations: list[float] = field(default_factory=list)  # seconds
+
+    @property
+    def total(self) -> float:
+        return sum(self.durations)
+
+
+def summarize(events: Iterable[dict[str, Any]]) -> tuple[int, list[PhaseStats]]:
+    """The number of processes traced, and the time spent in each span name, most in total first."""
+    pids = set()
+    phases: dict[tuple[str, str], PhaseStats] = {}
+    for event in events:
+        if event.get("ph") != "X":
+            continue
+        pids.add(event.get("pid"))
+        key = (event.get("cat", ""), event["name"])
+        stats = phases.setdefault(key, PhaseStats(*key))
+        stats.durations.append(event.get("dur", 0) / 1e6)
+    slowest = sorted(phases.values(), key=lambda stats: stats.total, reverse=True)
+    return len(pids), slowest
+
+
+app = typer.Typer(help="Inspect the traces recorded with MOLE_TRACE")
+
+
+@app.command()
+def summary(
+    path: Optional[Path] = typer.Argument(
+        None, envvar=TRACE_VARIABLE, help="The trace file, by default $MOLE_TRACE"
+    ),
+    top: int = typer.Option(20, "--top", "-n", help="How many phases to show"),
+    category: Optional[str] = typer.Option(
+        None, "--category", "-c", help="Only phases or only subprocesses"
+    ),
+):
+    """Summarize the slowest phases and subprocesses across every run in a trace."""
+    if path is None:
+        typer.echo(f"🐭 Error: no trace file given, and {TRACE_VARIABLE} isn't set")
+        raise typer.Exit(1)
+    try:
+        runs, phases = summarize(read_events(path))
+    except FileNotFoundError:
+        typer.echo(f"🐭 Error: {path} does not exist")
+        raise typer.Exit(1)
+    if category is not None:
+        phases = [stats for stats in phases if stats.category == category]
+
+    typer.echo(f"{runs} processes traced")
+    typer.echo(
+        f"{'total':>9} {'count':>6} {'median':>8} {'max':>8}  {'category':<10} name"
+    )
+    for stats in phases[:top]:
+        typer.echo(
+            f"{stats.total:>8.3f}s {len(stats.durations):>6} "
+            f"{statistics.median(stats.durations):>7.3f}s {max(stats.durations):>7.3f}s  "
+            f"{stats.category:<10} {stats.name}"
+        )
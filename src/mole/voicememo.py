@@ -1,16 +1,86 @@
+import itertools
+import os
+import queue
 import subprocess
 import tempfile
+import threading
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 import typer
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
 
 from .todoist import create_task
+from .whisper_server import WhisperServer, WhisperServerBusy, WhisperServerError
 
 WHISPER_CPP = Path.home() / "code" / "3rd" / "whisper.cpp"
 
 
+def default_workers() -> int:
+    """whisper-cli already uses 4 threads per transcription, so allow a transcription per 4 cores."""
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+Job = tuple[float, int, Optional[Path]]
+
+
+class MemoQueue:
+    """Voice memos waiting to be handled, oldest first, and the worker threads that handle them.
+
+    The watchdog observer thread only enqueues, so a slow transcription never holds up the delivery of other events,
+    and a backlog of memos (say, a morning's worth synced from iCloud at once) is worked through several at a time.
+
+    The whisper server transcribes one memo at a time. Whichever worker gets to it first uses it, and the other workers
+    run whisper-cli while it's busy (see transcribe), so each worker still adds a transcription's worth of throughput.
+    A whisper-cli run loads the model itself, which makes it slower than the server but faster than waiting on it.
+    """
+
+    def __init__(self, workers: int, server: Optional[WhisperServer] = None):
+        self.server = server  # Used for transcription when it's up, see transcribe
+        # (timestamp, arrival order to break ties, memo), with None as the memo telling a worker to stop
+        self._queue: queue.PriorityQueue[Job] = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"whack-worker-{i}")
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def put(self, path: Path) -> None:
+        """Queue a memo, behind any others that were recorded before it."""
+        try:
+            timestamp = path.stat().st_mtime
+        except FileNotFoundError:
+            return  # Already handled (and unlinked) by the time we got to it
+        self._queue.put((timestamp, next(self._order), path))
+
+    def join(self) -> None:
+        """Wait until every memo queued so far has been handled."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Stop the workers once they're done with the memos they're on. Memos still queued are left on disk, to be
+        picked up the next time whack starts."""
+        for _ in self._workers:  # (stops go ahead of every memo)
+            self._queue.put((float("-inf"), next(self._order), None))
+        for worker in self._workers:
+            worker.join()
+
+    def _work(self) -> None:
+        while True:
+            _, _, path = self._queue.get()
+            try:
+                if path is None:
+                    return
+                handle_vm(path, self.server)
+            except Exception as e:
+                # One bad memo shouldn't take a worker down with it, and it stays on disk for the next start
+                typer.echo(f"🐭 Error: could not handle {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+
 class VoiceMemoHandler(FileSystemEventHandler):
     """A handler for voice memo files."""
 
@@ -22,9 +92,11 @@ class VoiceMemoHandler(FileSystemEventHandler):
     )
     path = str(_path)
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, memos: Optional[MemoQueue] = None, **kwargs):
+        """Memos are handed to the memos queue if given, and otherwise handled on the thread that delivers the event."""
         super().__init__(*args, **kwargs)
         self._seen = set()
+        self._memos = memos
 
     def dispatch(self, event: FileSystemEvent) -> None:
         """Dispatches events for VoiceMemo files.
@@ -53,16 +125,19 @@ class VoiceMemoHandler(FileSystemEventHandler):
 
         if event.src_path.endswith(".m4a"):
             typer.echo(f"New voice memo: {event.src_path}")
-            handle_vm(Path(event.src_path))
+            if self._memos is not None:
+                self._memos.put(Path(event.src_path))
+            else:
+                handle_vm(Path(event.src_path))
 
 
-def handle_vm(path: Path) -> None:
+def handle_vm(path: Path, server: Optional[WhisperServer] = None) -> None:
     """Handles a voice memo file in m4a format.
 
     This function will:
     - Extract the datetime from the filename and path
     - Re-encode the audio to 16000Hz
-    - Transcribe the audio using whisper.cpp
+    - Transcribe the audio using whisper.cpp (the resident server if given, see transcribe)
     - Extract tasks from the transcription using GPT-4
     - Create tasks in Todoist  # not currently implemented
 
@@ -87,14 +162,7 @@ def handle_vm(path: Path) -> None:
             check=True,
         )
 
-        transcription = (
-            subprocess.check_output(
-                f"cd {WHISPER_CPP} && ./build/bin/whisper-cli -nt -f {wav.name} 2>/dev/null",
-                shell=True,
-            )
-            .decode("utf-8")
-            .strip()
-        )
+        transcription = transcribe(Path(wav.name), server).strip()
     cleaned = "\n".join(
         [line.strip() for line in transcription.split("\n") if line.strip()]
     )
@@ -106,6 +174,22 @@ def handle_vm(path: Path) -> None:
     return
 
 
+def transcribe(wav: Path, server: Optional[WhisperServer] = None) -> str:
+    """Transcribe a 16kHz wav with the resident whisper server, falling back to a whisper-cli run of its own when
+    there's no server, it's busy with another memo, or it can't be used."""
+    if server is not None and server.available:
+        try:
+            return server.transcribe(wav)
+        except WhisperServerBusy:
+            pass
+        except WhisperServerError as e:
+            typer.echo(f"🐭 {e}, using whisper-cli instead")
+    return subprocess.check_output(
+        f"cd {WHISPER_CPP} && ./build/bin/whisper-cli -nt -f {wav} 2>/dev/null",
+        shell=True,
+    ).decode("utf-8")
+
+
 def ensure_voicememo() -> None:
     """Ensures a sane environment for voice memo transcription.
 
@@ -1,16 +1,38 @@
 import json
 import subprocess
+import time
+from typing import Optional
 
 import typer
+from typing_extensions import Annotated
 from watchdog.events import FileCreatedEvent
 from watchdog.observers import Observer
 
-from .voicememo import VoiceMemoHandler, ensure_voicememo
+from .voicememo import (
+    WHISPER_CPP,
+    MemoQueue,
+    VoiceMemoHandler,
+    default_workers,
+    ensure_voicememo,
+)
+from .whisper_server import WhisperServer, WhisperServerError
 
 OBSERVER_JOIN_INTERVAL = 1  # seconds
+SERVER_CHECK_INTERVAL = 30  # seconds
 
 
-def whack() -> None:
+def whack(
+    workers: Annotated[
+        Optional[int],
+        typer.Option(
+            "--workers",
+            "-j",
+            envvar="MOLE_WHACK_WORKERS",
+            min=1,
+            help="Voice memos to transcribe at once (default: one per 4 cores)",
+        ),
+    ] = None,
+) -> None:
     """A long-lived watcher process that will react to certain events."""
 
     user = json.loads(
@@ -20,7 +42,13 @@ def whack() -> None:
 
     # Setup
     ensure_voicememo()  # ensures a sane environment for voice memo transcription
-    observer = WhackObserver()
+    server = WhisperServer(WHISPER_CPP)
+    try:
+        server.start()
+    except WhisperServerError as e:
+        typer.echo(f"🐭 {e}, transcribing with whisper-cli")
+    memos = MemoQueue(workers or default_workers(), server)
+    observer = WhackObserver(memos)
     observer.start()
 
     typer.echo("Whacking moles 🐹")
@@ -30,23 +58,32 @@ def whack() -> None:
         # This is sloppy threading code. I should be able to call this like select(), all in one thread, and get
         # woken up as soon as an event is ready (or timeout). Delegating it to a separate thread is a cop-out. Well,
         # at least we are avoiding the massive FS scan that would happen if we didn't use a library like this.
+        checked = time.monotonic()
         while observer.is_alive():
             observer.join(OBSERVER_JOIN_INTERVAL)  # wait for a bit.
+            if time.monotonic() - checked > SERVER_CHECK_INTERVAL:
+                checked = time.monotonic()
+                try:
+                    server.check()
+                except WhisperServerError as e:
+                    typer.echo(f"🐭 {e}")
 
     finally:
         observer.stop()
         observer.join()
+        memos.close()
+        server.stop()
 
 
 # TODO type correctly when fixed: https://github.com/gorakhargosh/watchdog/issues/982
 class WhackObserver(Observer):  # type: ignore
     """Specialized event observer for whack."""
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, memos: MemoQueue, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         # We'll go ahead and schedule our handlers right here, since we know them.
-        self._vm_handler = VoiceMemoHandler()
+        self._vm_handler = VoiceMemoHandler(memos=memos)
         self.schedule(self._vm_handler, path=VoiceMemoHandler.path, recursive=True)
 
     def start(self):
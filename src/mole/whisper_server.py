@@ -0,0 +1,207 @@
+"""whisper_server.py - A resident whisper.cpp server for whack, so the model is loaded once rather than per memo.
+
+whisper-cli loads the ggml model from disk every time it runs, which for a short memo takes longer than the
+transcription itself. whack instead starts whisper.cpp's whisper-server (built alongside whisper-cli) on a local port
+and POSTs each memo's audio to its /inference endpoint, with the model staying in memory in between.
+
+WhisperServer supervises the process: it waits for /health to answer before taking work, restarts the server if it
+has died by the time a memo comes in, and restarts it if it stops answering /health while idle (see check, which whack
+calls periodically). After MAX_RESTARTS failed starts in a row it gives up, and, as when whisper-server isn't built at
+all, memos go to whisper-cli instead (see voicememo.transcribe).
+
+The server only runs one inference at a time, so it turns away a memo while it's busy with another (see
+WhisperServerBusy), and whack's other workers run whisper-cli instead of waiting in line (see voicememo.MemoQueue).
+"""
+
+from __future__ import annotations
+
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from .cache import cache_dir
+
+HOST = "127.0.0.1"
+# whisper-cli's default, which ensure_voicememo downloads
+MODEL = Path("models") / "ggml-base.en.bin"
+STARTUP_TIMEOUT = 60  # seconds, for loading the model
+HEALTH_TIMEOUT = 2  # seconds
+INFERENCE_TIMEOUT = 300  # seconds
+MAX_RESTARTS = 3
+# Transcriptions at once: whisper-server runs one inference at a time, and would only queue the rest up
+CONCURRENCY = 1
+
+
+class WhisperServerError(RuntimeError):
+    """The server couldn't be started, or couldn't transcribe something."""
+
+
+class WhisperServerBusy(WhisperServerError):
+    """The server already has as many transcriptions as it can run at once."""
+
+
+class WhisperServer:
+    def __init__(self, whisper_cpp: Path):
+        self.root = whisper_cpp
+        self.binary = whisper_cpp / "build" / "bin" / "whisper-server"
+        self.port: Optional[int] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._starting = False
+        self._failed_starts = 0
+        self._in_flight = 0  # Transcriptions; the server may well not answer /health in the middle of one
+
+    @property
+    def url(self) -> str:
+        return f"http://{HOST}:{self.port}"
+
+    @property
+    def available(self) -> bool:
+        """Whether it's worth trying the server at all: it's built, and hasn't failed to start too many times over."""
+        return self.binary.exists() and self._failed_starts < MAX_RESTARTS
+
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def healthy(self) -> bool:
+        return self.running() and answers(self.url)
+
+    def start(self) -> None:
+        """Start the server, unless it's already running. Raises WhisperServerError if it doesn't come up."""
+        self._ensure_running()
+
+    def check(self) -> None:
+        """Restart the server if it has died, or if it isn't answering /health while it has nothing else to do."""
+        with self._lock:
+            if self._starting or not self.available:
+                return
+            busy = self._in_flight > 0
+        if self.running() and (busy or self.healthy()):
+            return
+        self._ensure_running(restart=True)
+
+    def transcribe(self, wav: Path) -> str:
+        """Transcribe a 16kHz wav file, as plain text. Raises WhisperServerBusy rather than waiting for another
+        transcription to finish."""
+        self._ensure_running()
+        with self._lock:
+            if self._in_flight >= CONCURRENCY:
+                raise WhisperServerBusy("whisper-server is busy")
+            self._in_flight += 1
+            url = self.url
+        try:
+            with open(wav, "rb") as audio:
+                response = requests.post(
+                    f"{url}/inference",
+                    files={"file": (wav.name, audio, "audio/wav")},
+                    data={"response_format": "text", "temperature": "0.0"},
+                    timeout=INFERENCE_TIMEOUT,
+                )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise WhisperServerError(f"transcription failed: {e}") from e
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return response.text
+
+    def stop(self) -> None:
+        with self._lock:
+            process, self._process = self._process, None
+        if process is not None:
+            terminate(process)
+
+    def _ensure_running(self, restart: bool = False) -> None:
+        """Start the server (replacing the current one if restart) unless it's running.
+
+        Only one thread starts it at a time, and without holding the lock while the model loads: anyone else who needs
+        the server meanwhile gets a WhisperServerError straight away, and falls back to whisper-cli rather than waiting.
+        """
+        with self._lock:
+            if self.running() and not restart:
+                return
+            if self._starting:
+                raise WhisperServerError("whisper-server is starting")
+            if not self.available:
+                raise WhisperServerError("whisper-server is unavailable")
+            self._starting = True
+            old, self._process = self._process, None
+
+        try:
+            if old is not None:
+                terminate(old)
+            port, process = self._launch()
+        except WhisperServerError:
+            with self._lock:
+                self._failed_starts += 1
+            raise
+        else:
+            with self._lock:
+                self.port, self._process = port, process
+                self._failed_starts = 0
+        finally:
+            with self._lock:
+                self._starting = False
+
+    def _launch(self) -> tuple[int, subprocess.Popen]:
+        """Start a server process and wait for it to answer /health."""
+        port = free_port()
+        with open(cache_dir() / "whisper-server.log", "a") as log:
+            process = subprocess.Popen(
+                [
+                    str(self.binary),
+                    "--model",
+                    str(MODEL),
+                    "--host",
+                    HOST,
+                    "--port",
+                    str(port),
+                ],
+                cwd=self.root,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise WhisperServerError(
+                    f"whisper-server exited with {process.returncode}, see {log.name}"
+                )
+            if answers(f"http://{HOST}:{port}"):
+                return port, process
+            time.sleep(0.1)
+        terminate(process)
+        raise WhisperServerError(
+            f"whisper-server didn't come up within {STARTUP_TIMEOUT}s"
+        )
+
+
+def answers(url: str) -> bool:
+    """Whether the server at url answers /health."""
+    try:
+        response = requests.get(f"{url}/health", timeout=HEALTH_TIMEOUT)
+    except requests.RequestException:
+        return False
+    return response.status_code == 200
+
+
+def terminate(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def free_port() -> int:
+    """A port nothing is listening on right now (which the server should be able to take a moment later)."""
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
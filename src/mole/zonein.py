@@ -1,15 +1,22 @@
 import os
 import re
 import subprocess
-import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
 import typer
+from pendulum import DateTime
 from typing_extensions import Annotated
 
+from . import tracing
+from .layouts import TemplateError, layout_file
 from .notebook import Logbook
-from .projects import Project, ToDo
+from .projects import SNAPSHOT_VARIABLE, Project, ToDo
+from .todo_index import TodoIndex
+
+# zellij, the todo index, the log header's destination, the project snapshot and layout
+PREFETCH_WORKERS = 5
 
 
 def zonein(
@@ -41,79 +48,120 @@ def zonein(
         # This is going to require more work to get right, so for now we just exit.
         return
 
-    if project_name:
-        project = Project.load(project_name)
-    else:
-        project = Project.from_fzf()
-
-    todo = None
-    if not todo_name and not skip_todo:
-        todo = ToDo.from_fzf(project)
-    elif todo_name:
-        match = re.match(
-            r"^((?P<session_name>[^:]+):)?(?P<todo_number>\d+)$", todo_name
-        )
+    # Everything that doesn't need the user runs in the background, started as soon as what it depends on is known,
+    # so that most of it is done by the time the user has chosen in fzf and there's little left but the zellij handoff
+    with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as pool:
+        choose_todo = not todo_name and not skip_todo
+        sessions = pool.submit(zellij_sessions)
+        todo_index: Optional[Future[TodoIndex]] = None
+        if choose_todo:
+            todo_index = pool.submit(tracing.traced("todo index", TodoIndex.load))
+
+        with tracing.span("choose project"):
+            if project_name:
+                project = Project.load(project_name)
+            else:
+                project = Project.from_fzf()
 
-        if not match:
-            print(
-                f"🐭 Error: TODO {todo_name} is not in the form `project.session_name:todo_number`"
-            )
-            raise typer.Exit(1)
-
-        if (
-            match.group("session_name")
-            and match.group("session_name") != project.session_name
-        ):
-            print(
-                f"🐭 Error: TODO {todo_name} is for session {match.group('session_name')}, but project {project.name} is in session {project.session_name}"
+        logbook = Logbook(project)
+        opened = DateTime.now()
+        destination = pool.submit(
+            tracing.traced("log destination", logbook.destination), opened
+        )
+        snapshot = pool.submit(tracing.traced("project snapshot", project.snapshot))
+        layout = pool.submit(tracing.traced("layout", layout_file), project)
+
+        todo = None
+        if todo_index is not None:
+            index = todo_index
+            with tracing.span("choose todo"):
+                todo = ToDo.from_fzf(
+                    project, todos=lambda: project.list_todos(index.result())
+                )
+        elif todo_name:
+            match = re.match(
+                r"^((?P<session_name>[^:]+):)?(?P<todo_number>\d+)$", todo_name
             )
-            raise typer.Exit(1)
-
-        todo = ToDo(project, int(match.group("todo_number")))
-
-    # Print a log message
-    logbook = Logbook(project)
-    if todo is None:
-        preamble = "🐭 zonein"
-    else:
-        preamble = f"🐭 zonein to {todo.label}"
-    logbook.append_log_header(preamble=preamble)
-
-    # If the session exists, attach to it
-    try:
-        zellij_sessions = [
-            line.strip()
-            for line in subprocess.check_output(
-                ["zellij", "list-sessions", "-n", "-s"], text=True
-            ).splitlines()
-        ]
-    except subprocess.CalledProcessError:
-        zellij_sessions = []
-
-    if project.session_name in zellij_sessions:
-        subprocess.call(["zellij", "attach", project.session_name])
-    else:
-        # The session doesn't exist and we aren't attached to anything so go ahead and create it and set the environment
-        os.environ["MOLE_PROJECT"] = project.name
-        if todo and todo != "None":
-            os.environ["MOLE_TODO"] = todo.label
+
+            if not match:
+                print(
+                    f"🐭 Error: TODO {todo_name} is not in the form `project.session_name:todo_number`"
+                )
+                raise typer.Exit(1)
+
+            if (
+                match.group("session_name")
+                and match.group("session_name") != project.session_name
+            ):
+                print(
+                    f"🐭 Error: TODO {todo_name} is for session {match.group('session_name')}, but project {project.name} is in session {project.session_name}"
+                )
+                raise typer.Exit(1)
+
+            todo = ToDo(project, int(match.group("todo_number")))
+
+        # Print a log message
+        if todo is None:
+            preamble = "🐭 zonein"
         else:
-            os.environ.pop("MOLE_TODO", None)
+            preamble = f"🐭 zonein to {todo.label}"
+        now = DateTime.now()
+        if now.date() != opened.date():
+            destination = pool.submit(logbook.destination, now)
+
+        def write_header():
+            logbook.append_log_header(now, preamble, destination=destination.result())
 
-        if project.data.cwd:
-            path = Path(project.data.cwd).expanduser()
-            if path.is_dir():
-                os.chdir(path)
+        header = pool.submit(tracing.traced("log header", write_header))
+
+        if project.session_name in sessions.result():
+            zellij("attach", project.session_name)
+        else:
+            # The session doesn't exist and we aren't attached to anything so go ahead and create it and set the environment
+            os.environ["MOLE_PROJECT"] = project.name
+            os.environ[SNAPSHOT_VARIABLE] = snapshot.result()
+            if todo and todo != "None":
+                os.environ["MOLE_TODO"] = todo.label
             else:
-                print(f"🐭 Error: cwd {path} does not exist")
+                os.environ.pop("MOLE_TODO", None)
+
+            if project.data.cwd:
+                path = Path(project.data.cwd).expanduser()
+                if path.is_dir():
+                    destination.result()  # (which depends on the working directory)
+                    os.chdir(path)
+                else:
+                    print(f"🐭 Error: cwd {path} does not exist")
+                    raise typer.Exit(1)
+
+            try:
+                layout_path = str(layout.result())
+            except TemplateError as e:
+                print(f"🐭 Error: {e}")
                 raise typer.Exit(1)
+            zellij("--session", project.session_name, "--layout", layout_path)
 
-        with tempfile.NamedTemporaryFile("w+", suffix=".kdl") as f:
-            f.write(project.zellij_layout)
-            f.flush()
-            subprocess.call(
-                ["zellij", "--session", project.session_name, "--layout", f.name]
-            )
+        header.result()  # Raising anything that went wrong writing it, before the footer goes in after it
 
     # Print a closing log message
-    logbook.append_log_footer()
+    with tracing.span("log footer"):
+        logbook.append_log_footer()
+
+
+def zellij(*args: str) -> int:
+    """Hand the terminal over to zellij, until it exits or the user detaches."""
+    name = f"zellij {args[0].lstrip('-')}"  # zellij attach, zellij session
+    with tracing.subprocess_span(["zellij", *args], name) as span:
+        span["returncode"] = subprocess.call(["zellij", *args])
+    return span["returncode"]
+
+
+def zellij_sessions() -> list[str]:
+    """The names of the running zellij sessions."""
+    argv = ["zellij", "list-sessions", "-n", "-s"]
+    with tracing.subprocess_span(argv, "zellij list-sessions") as span:
+        result = subprocess.run(argv, stdout=subprocess.PIPE, text=True)
+        span["returncode"] = result.returncode
+    if result.returncode != 0:
+        return []
+    return [line.strip() for line in result.stdout.splitlines()]
@@ -0,0 +1,104 @@
+"""Shared fixtures: a fake nb home notebook on disk, and isolated mole cache and config dirs."""
+
+import subprocess
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from mole import nb, project_backends, sync
+
+PROJECTS = {
+    1: ("Alpha", "created: 2025-01-02 03:04:05\ncwd: ~/code/alpha\n"),
+    3: ("Beta Project", "log_dir: logs\npoetry: true\n"),
+}
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "cache"
+    monkeypatch.setenv("MOLE_CACHE_DIR", str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def config_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "config"
+    monkeypatch.setenv("MOLE_CONFIG_DIR", str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def no_background_sync(monkeypatch: pytest.MonkeyPatch):
+    """Don't let marking notebooks dirty schedule a real flush when the test run exits."""
+    monkeypatch.setattr(sync, "_scheduled", True)
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    """Forget anything mole memoized for the lifetime of the process."""
+    yield
+    project_backends.get_backend.cache_clear()
+    project_backends.notebook_dir.cache_clear()
+
+
+class FakeNb:
+    """Stands in for the nb binary, answering from per-subcommand handlers and recording every invocation."""
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+        self.handlers: dict[str, Callable[[list[str]], tuple[int, str]]] = {}
+
+    def __call__(self, args: list[str], capture: bool) -> subprocess.CompletedProcess:
+        self.calls.append(args)
+        handler = self.handlers.get(nb.subcommand(args))
+        if handler is None:
+            raise AssertionError(f"Unexpected nb call: {args}")
+        returncode, stdout = handler(args)
+        return subprocess.CompletedProcess(["nb", *args], returncode, stdout.encode())
+
+
+@pytest.fixture(autouse=True)
+def fake_nb(monkeypatch: pytest.MonkeyPatch) -> FakeNb:
+    """Every test gets a fresh NbClient, and never the real nb. Register handlers for the commands a test expects."""
+    fake = FakeNb()
+    monkeypatch.setattr(nb, "client", nb.NbClient(runner=fake))
+    return fake
+
+
+@pytest.fixture
+def nb_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """An nb data directory with a 'home' notebook holding a couple of projects.
+
+    Ids follow nb's .index convention: line N of .index is the filename for id N, deleted items leave a blank line.
+    """
+    root = tmp_path / "nb"
+    home = root / "home"
+    (home / ".git" / "refs" / "heads").mkdir(parents=True)
+    (home / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (home / ".git" / "refs" / "heads" / "main").write_text("a" * 40 + "\n")
+
+    index_lines = []
+    for nb_id in range(1, max(PROJECTS) + 1):
+        if nb_id not in PROJECTS:
+            index_lines.append("")
+            continue
+        name, body = PROJECTS[nb_id]
+        filename = f"{name.lower().replace(' ', '_')}.project.yaml"
+        (home / filename).write_text(f"# {name}\n---\n{body}...\n")
+        index_lines.append(filename)
+    (home / ".index").write_text("\n".join(index_lines) + "\n")
+
+    monkeypatch.setenv("NB_DIR", str(root))
+    return root
+
+
+def project_paths(nb_dir: Path) -> dict[int, Path]:
+    """Map of nb id to project file, as `nb ls --paths` would report them."""
+    home = nb_dir / "home"
+    lines = (home / ".index").read_text().splitlines()
+    return {
+        nb_id: home / line
+        for nb_id, line in enumerate(lines, start=1)
+        if line.endswith(".project.yaml")
+    }
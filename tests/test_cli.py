@@ -0,0 +1,28 @@
+"""Tests for the mole CLI entry point."""
+
+import subprocess
+import sys
+
+from typer.testing import CliRunner
+
+from mole.cli import app
+
+
+def test_heavy_modules_are_not_imported_up_front():
+    heavy = ["mole.projects", "mole.notebook", "mole.whack", "mole.zonein", "pydantic"]
+    code = f"import sys, mole.cli; print([m for m in {heavy!r} if m in sys.modules])"
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    assert output.strip() == "[]"
+
+
+def test_help_lists_lazy_commands():
+    result = CliRunner().invoke(app, ["--help"])
+    assert result.exit_code == 0
+    for command in ["projects", "zonein", "whack", "log", "version"]:
+        assert command in result.output
+
+
+def test_lazy_group_dispatch():
+    result = CliRunner().invoke(app, ["projects", "--help"])
+    assert result.exit_code == 0
+    assert "reindex" in result.output
@@ -0,0 +1,91 @@
+"""Tests for the log write journal and its merger."""
+
+import fcntl
+import multiprocessing
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+from pendulum import DateTime
+
+from mole import journal, log_store
+from mole.journal import JournalRecord
+from mole.notebook import Logbook
+
+TITLE = "Tuesday, March 04, 2025"
+
+
+@pytest.fixture
+def log(nb_dir: Path) -> Path:
+    return nb_dir / "home" / f"{TITLE}.log.md"
+
+
+def record(log: Path, minute: int, text: str) -> JournalRecord:
+    when = DateTime(2025, 3, 4, 9, minute)
+    return JournalRecord(
+        timestamp=when.timestamp(), content=text, path=str(log), title=TITLE
+    )
+
+
+def entries(log: Path) -> list[str]:
+    return [line for line in log.read_text().splitlines() if line.startswith("e")]
+
+
+def test_merge_orders_by_timestamp(log: Path):
+    names = journal.submit(
+        [record(log, 30, "e3"), record(log, 10, "e1"), record(log, 20, "e2")]
+    )
+    assert names == {journal.journal_name(record(log, 0, ""))}
+    assert not log.exists()
+
+    assert journal.merge(names.pop())
+    assert log.read_text() == f"# {TITLE}\n\ne1\n\ne2\n\ne3\n"
+    assert (log.parent / ".index").read_text().splitlines()[-1] == log.name
+
+
+def test_writer_leaves_records_to_running_merger(log: Path):
+    name = journal.journal_name(record(log, 0, ""))
+    with open(journal.journal_dir() / f"{name}.merger", "a") as merger:
+        fcntl.flock(merger, fcntl.LOCK_EX)
+        journal.write(record(log, 10, "e1"))
+        assert not log.exists()
+        fcntl.flock(merger, fcntl.LOCK_UN)
+    assert journal.merge(name)
+    assert entries(log) == ["e1"]
+
+
+def test_unrendered_records_are_picked_up(log: Path):
+    # As if a merger had died before getting to these
+    journal.submit([record(log, 20, "e2")])
+    journal.submit([record(log, 10, "e1")])
+    journal.write(record(log, 30, "e3"))
+    assert entries(log) == ["e1", "e2", "e3"]
+    name = journal.journal_name(record(log, 0, ""))
+    with closing(log_store.connect()) as conn:
+        assert log_store.pending(conn, name) == []
+
+
+def append_many(writer: int, count: int) -> None:
+    logbook = Logbook(project=None)
+    for i in range(count):
+        logbook.append_log(f"e{writer}-{i}", when=DateTime(2025, 3, 4, 9, i % 60))
+
+
+def test_concurrent_writers(log: Path):
+    context = multiprocessing.get_context("fork")
+    writers = [
+        context.Process(target=append_many, args=(writer, 50)) for writer in range(4)
+    ]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join()
+        assert process.exitcode == 0
+
+    text = log.read_text()
+    assert sorted(entries(log)) == sorted(
+        f"e{w}-{i}" for w in range(4) for i in range(50)
+    )
+    assert text.startswith(f"# {TITLE}\n\n## ")
+    assert text.count("\n## ") == 200
+    assert (log.parent / ".index").read_text().count(log.name) == 1
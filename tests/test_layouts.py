@@ -0,0 +1,53 @@
+"""Tests for the cache of rendered zellij layouts."""
+
+from pathlib import Path
+
+import pytest
+
+from mole.layouts import TemplateError, layout_file
+from mole.projects import Project, ProjectData
+
+
+def project(**data) -> Project:
+    return Project(3, "Beta Project", ProjectData(**data))
+
+
+def test_layout_is_rendered_once(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("SHELL", "/bin/zsh")
+    path = layout_file(project(poetry=True))
+    layout = path.read_text()
+    assert 'molebar name="Project: Beta Project"' in layout
+    assert 'command "poetry"' in layout
+    assert 'command "/bin/zsh"\n' in layout and '"exec $SHELL -i"' in layout
+
+    path.write_text("left alone while nothing changes")
+    assert layout_file(project(poetry=True)) == path
+    assert path.read_text() == "left alone while nothing changes"
+
+
+def test_changed_project_replaces_layout():
+    before = layout_file(project(poetry=True))
+    after = layout_file(project(poetry=False))
+    assert after != before
+    assert [*after.parent.glob("beta-project.*")] == [after]
+
+    custom = layout_file(project(zellij_layout="layout {\n}\n"))
+    assert custom.read_text() == "layout {\n}\n"
+
+
+def test_user_template(config_dir: Path):
+    template = config_dir / "layouts" / "default.kdl"
+    template.parent.mkdir(parents=True)
+    template.write_text(
+        'layout {\n    tab name="$name" {\n        $main_pane\n    }\n}\n'
+    )
+    assert layout_file(project()).read_text() == (
+        'layout {\n    tab name="Beta Project" {\n        pane\n    }\n}\n'
+    )
+
+    template.write_text('layout {\n    tab name="$title"\n}\n')
+    with pytest.raises(TemplateError, match="title"):
+        layout_file(project())
+    template.write_text("layout {\n    $main_pane\n")
+    with pytest.raises(TemplateError, match="unclosed"):
+        layout_file(project())
@@ -0,0 +1,80 @@
+"""Tests for rolling old daily logs up into bundles."""
+
+import datetime as dt
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from mole import log_archive, sync
+from mole.cli import app
+from mole.journal import append_to_log
+from mole.log_search import LogSearch
+from mole.project_backends import read_nb_index
+
+DAYS = [dt.date(2025, 1, 30), dt.date(2025, 2, 3), dt.date(2025, 2, 4)]
+
+
+def title(day: dt.date) -> str:
+    return day.strftime("%A, %B %d, %Y")
+
+
+@pytest.fixture
+def home(nb_dir: Path) -> Path:
+    home = nb_dir / "home"
+    for day in reversed(DAYS):  # Listed out of date order
+        append_to_log(
+            home / f"{title(day)}.log.md", title(day), f"## 09:00\n\nOn {day}"
+        )
+    return home
+
+
+def test_archive_bundles_by_month(home: Path):
+    before_ids = read_nb_index(home)
+    done = log_archive.archive([home], before=dt.date(2025, 2, 4))
+
+    january, february = home / "2025-01.archive.log.md", home / "2025-02.archive.log.md"
+    assert [bundle.path for bundle in done[home]] == [january, february]
+    assert january.read_text() == f"# {title(DAYS[0])}\n\n## 09:00\n\nOn 2025-01-30\n"
+    assert not (home / f"{title(DAYS[1])}.log.md").exists()
+    assert (home / f"{title(DAYS[2])}.log.md").exists()
+
+    # Archived days leave their ids blank, the way nb deletes do, and the rest keep theirs
+    after_ids = read_nb_index(home)
+    kept = {nb_id: path for nb_id, path in before_ids.items() if path.exists()}
+    assert {nb_id: after_ids[nb_id] for nb_id in kept} == kept
+    bundles = sorted(path for path in after_ids.values() if "archive" in path.name)
+    assert bundles == [january, february]
+    assert sync.pending() == {"home"}
+
+    # Archiving later days appends to the existing bundle
+    log_archive.archive([home], before=dt.date(2025, 3, 1))
+    assert february.read_text().count("\n## 09:00") == 2
+    assert [*read_nb_index(home).values()].count(february) == 1
+
+
+def test_archived_logs_stay_searchable(home: Path):
+    log_archive.archive([home], before=dt.date(2026, 1, 1), period="year")
+    index = LogSearch.from_volatile_memory()
+    index.refresh()
+    assert sorted(hit.date or "" for hit in index.search("On")) == [
+        day.isoformat() for day in DAYS
+    ]
+
+
+def test_archive_command(home: Path):
+    result = CliRunner().invoke(
+        app, ["log", "archive", "--older-than", "0", "--by", "year", "--dry-run"]
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        "home/2025.archive.log.md: 3 days",
+        f"🐭 Would archive 3 logs from before {dt.date.today().isoformat()}",
+    ]
+    assert not (home / "2025.archive.log.md").exists()
+
+    result = CliRunner().invoke(
+        app, ["log", "archive", "--older-than", "0", "--by", "year"]
+    )
+    assert result.exit_code == 0, result.output
+    assert [path.name for path in home.glob("*.log.md")] == ["2025.archive.log.md"]
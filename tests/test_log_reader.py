@@ -0,0 +1,116 @@
+"""Tests for reading logs backwards and following them."""
+
+import threading
+import time
+from pathlib import Path
+
+import pendulum
+import pytest
+from typer.testing import CliRunner
+
+from mole import log_reader
+from mole.cli import app
+from mole.journal import append_to_log
+from mole.notebook import Logbook
+
+MONDAY = "Monday, March 03, 2025"
+TUESDAY = "Tuesday, March 04, 2025"
+
+
+@pytest.fixture
+def home(nb_dir: Path) -> Path:
+    home = nb_dir / "home"
+    for title, times in (
+        (MONDAY, ["08:00", "17:45"]),
+        (TUESDAY, ["09:30", "11:00", "16:15"]),
+    ):
+        for at in times:
+            append_to_log(
+                home / f"{title}.log.md", title, f"## {at}\n\n{title} at {at}"
+            )
+    return home
+
+
+def test_reverse_lines_across_chunks(tmp_path: Path):
+    path = tmp_path / "lines.md"
+    lines = [f"line {i} ✓" * (i % 7) for i in range(200)]
+    path.write_text("\n".join(lines) + "\n")
+    for chunk_size in (1, 3, 64, 100_000):
+        assert [*log_reader.reverse_lines(path, chunk_size)] == lines[::-1]
+
+
+def test_tail_reaches_into_earlier_days(home: Path):
+    paths = log_reader.history(home / f"{TUESDAY}.log.md")
+    assert [path.name for path in paths] == [f"{TUESDAY}.log.md", f"{MONDAY}.log.md"]
+
+    found = log_reader.tail(paths, count=4)
+    assert [entry.text.splitlines()[0] for _, entry in found] == [
+        "## 17:45",
+        "## 09:30",
+        "## 11:00",
+        "## 16:15",
+    ]
+    assert found[0][1].text == f"## 17:45\n\n{MONDAY} at 17:45"
+    assert found[0][1].when == pendulum.datetime(2025, 3, 3, 17, 45, tz="local")
+
+    since = pendulum.datetime(2025, 3, 3, 12, tz="local")
+    assert len(log_reader.tail(paths, since=since)) == 4
+
+
+def test_tail_cli(home: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        pendulum, "now", lambda *_: pendulum.datetime(2025, 3, 4, 18, tz="local")
+    )
+    result = CliRunner().invoke(app, ["log", "tail", "-n", "2"])
+    assert result.exit_code == 0, result.output
+    assert result.output == (
+        f"# {TUESDAY}\n\n## 11:00\n\n{TUESDAY} at 11:00\n\n## 16:15\n\n{TUESDAY} at 16:15\n\n"
+    )
+
+    result = CliRunner().invoke(app, ["log", "show", "2025-03-03"])
+    assert result.output == (home / f"{MONDAY}.log.md").read_text()
+
+
+def test_follow_prints_appended_entries(home: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(log_reader, "FOLLOW_INTERVAL", 0.05)
+    log = home / f"{TUESDAY}.log.md"
+    output: list[str] = []
+    stop = threading.Event()
+    follower = threading.Thread(
+        target=log_reader.follow, args=(lambda: log, output.append, stop)
+    )
+    follower.start()
+    try:
+        time.sleep(0.2)
+        Logbook(project=None).append_log(
+            "Later", when=pendulum.datetime(2025, 3, 4, 20, tz="local")
+        )
+        deadline = time.monotonic() + 5
+        while "Later" not in "".join(output) and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        follower.join()
+    assert "".join(output) == "\n## Tuesday, March 4th, 2025 20:00\n\nLater\n"
+
+
+def test_follow_waits_for_missing_folder(home: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(log_reader, "FOLLOW_INTERVAL", 0.05)
+    log = home / "logs" / "2025" / f"{TUESDAY}.log.md"
+    output: list[str] = []
+    stop = threading.Event()
+    follower = threading.Thread(
+        target=log_reader.follow, args=(lambda: log, output.append, stop)
+    )
+    follower.start()
+    try:
+        time.sleep(0.2)
+        log.parent.mkdir(parents=True)
+        log.write_text("## 20:00\n\nLater\n")
+        deadline = time.monotonic() + 5
+        while "Later" not in "".join(output) and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        follower.join()
+    assert "".join(output) == "## 20:00\n\nLater\n"
@@ -0,0 +1,119 @@
+"""Tests for full-text search over the logs."""
+
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from mole.cli import app
+from mole.log_search import LogSearch, parse_log
+from mole.notebook_registry import NotebookRegistry
+from mole.projects import Project
+
+LOG = """# Tuesday, March 04, 2025
+
+Loose notes before the first entry.
+
+## Tuesday, March 4th, 2025 09:30: standup
+
+Talked about the flaky deploy pipeline.
+
+## 14:00
+
+### 14:30 Session closed
+"""
+
+
+@pytest.fixture
+def logs(nb_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("MOLE_PROJECT_BACKEND", "fs")
+    (nb_dir / "home" / "Tuesday, March 04, 2025.log.md").write_text(LOG)
+    logs = nb_dir / "beta-project" / "logs"
+    logs.mkdir(parents=True)
+    (logs / "Wednesday, March 05, 2025.log.md").write_text(
+        "# Wednesday, March 05, 2025\n\n## 10:00\n\nFixed the deploy script for good.\n"
+    )
+    (nb_dir / "home" / ".git" / "stray.log.md").write_text("## deploy\n")
+    return nb_dir
+
+
+def test_parse_log():
+    date, entries = parse_log(LOG)
+    assert date == "2025-03-04"
+    assert [(e.heading, e.body) for e in entries] == [
+        ("", "Loose notes before the first entry."),
+        (
+            "Tuesday, March 4th, 2025 09:30: standup",
+            "Talked about the flaky deploy pipeline.",
+        ),
+        ("14:00", "### 14:30 Session closed"),
+    ]
+
+
+def test_search_ranks_and_filters(logs: Path):
+    index = LogSearch.from_volatile_memory()
+    assert index.refresh() == 2
+    hits = index.search("deploy")
+    assert {(hit.notebook, hit.date) for hit in hits} == {
+        ("home", "2025-03-04"),
+        ("beta-project", "2025-03-05"),
+    }
+    assert [hit.heading for hit in index.search("flak")] == [
+        "Tuesday, March 4th, 2025 09:30: standup"
+    ]
+    assert [hit.date for hit in index.search("deploy", notebooks=["beta-project"])] == [
+        "2025-03-05"
+    ]
+    assert index.search('"unbalanced') == []
+
+
+def test_refresh_only_rereads_changes(logs: Path):
+    index = LogSearch.from_volatile_memory()
+    index.refresh()
+    assert index.refresh() == 0
+
+    log = logs / "home" / "Tuesday, March 04, 2025.log.md"
+    with open(log, "a") as f:
+        f.write("\n## 16:00\n\nPlanned the migration.\n")
+    assert index.refresh() == 1
+    assert [hit.heading for hit in index.search("migration")] == ["16:00"]
+
+    log.unlink()
+    assert index.refresh() == 0
+    assert index.search("flaky") == []
+
+
+def test_searches_known_local_notebooks(
+    logs: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    local = tmp_path / "code" / "alpha"  # Alpha's working directory
+    (local / ".git").mkdir(parents=True)
+    (local / ".index").touch()
+    (local / "Thursday, March 06, 2025.log.md").write_text(
+        "# Thursday, March 06, 2025\n\n## 11:00\n\nDeployed on a laptop.\n"
+    )
+
+    index = LogSearch.from_volatile_memory()
+    index.refresh()
+    assert index.search("laptop") == []
+
+    # Once mole has been run from there
+    NotebookRegistry.load().local(local)
+    assert index.refresh() == 1
+    [hit] = index.search("laptop")
+    assert (hit.notebook, hit.date) == (str(local), "2025-03-06")
+    notebooks = Project.load("Alpha").notebook_names()
+    assert notebooks == ["alpha", str(local)]
+    assert [hit.date for hit in index.search("deploy", notebooks=notebooks)] == [
+        "2025-03-06"
+    ]
+
+
+def test_log_search_command(logs: Path):
+    result = CliRunner().invoke(app, ["log", "search", "script"])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        "2025-03-05  Beta Project  ## 10:00",
+        "    Fixed the deploy [script] for good.",
+    ]
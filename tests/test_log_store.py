@@ -0,0 +1,39 @@
+"""Tests for the structured log entry store."""
+
+from pathlib import Path
+
+import pytest
+from pendulum import DateTime
+from typer.testing import CliRunner
+
+from mole import log_store
+from mole.cli import app
+from mole.notebook import Logbook
+from mole.projects import Project
+
+
+def test_store_is_queryable(nb_dir: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("MOLE_PROJECT_BACKEND", "fs")
+    (nb_dir / "beta-project").mkdir()
+    (nb_dir / "beta-project" / ".index").touch()
+    home, beta = Logbook(project=None), Logbook(project=Project.load("Beta Project"))
+    home.append_log("Morning", when=DateTime(2025, 3, 4, 9, 0))
+    beta.append_log("Standup", when=DateTime(2025, 3, 4, 9, 30), preamble="team")
+    beta.append_log("Review", when=DateTime(2025, 3, 5, 9, 30))
+
+    rows = log_store.query(project="Beta Project")
+    assert [(row["subtitle"], row["body"]) for row in rows] == [
+        ("team", "Standup"),
+        (None, "Review"),
+    ]
+    day = DateTime(2025, 3, 4)
+    rows = log_store.query(since=day.timestamp(), until=day.add(days=1).timestamp())
+    assert [row["body"] for row in rows] == ["Morning", "Standup"]
+    assert [row["body"] for row in log_store.query(limit=1)] == ["Review"]
+
+
+def test_entries_command(nb_dir: Path):
+    Logbook(project=None).append_log("Hello", when=DateTime(2025, 3, 4, 9, 0))
+    result = CliRunner().invoke(app, ["log", "entries", "--since", "2025-03-04"])
+    assert result.exit_code == 0, result.output
+    assert result.output == "## Tuesday, March 4th, 2025 09:00\n\nHello\n\n"
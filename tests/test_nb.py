@@ -0,0 +1,96 @@
+"""Tests for NbClient's memoization of nb reads."""
+
+import asyncio
+import subprocess
+import time
+
+import pytest
+
+from mole import nb
+from tests.conftest import FakeNb
+
+
+@pytest.fixture
+def answers(fake_nb: FakeNb) -> FakeNb:
+    for command in ["ls", "list", "show", "notebooks", "edit", "add", "sync"]:
+        fake_nb.handlers[command] = lambda args: (0, " ".join(args))
+    fake_nb.handlers["notebooks add"] = lambda args: (0, "")
+    return fake_nb
+
+
+def test_reads_are_memoized(answers: FakeNb):
+    assert nb.output("ls", "home:") == "ls home:"
+    assert nb.output("ls", "home:") == "ls home:"
+    assert nb.output("show", "home:3") == "show home:3"
+    assert len(answers.calls) == 2
+    assert nb.client.spawned == {"ls": 1, "show": 1}
+
+
+def test_write_invalidates_same_notebook(answers: FakeNb):
+    nb.output("ls", "home:")
+    nb.output("ls", "work:")
+    nb.output("notebooks", "--names")
+    nb.output("edit", "home:3", "--content", "hi")
+    nb.output("ls", "home:")
+    nb.output("ls", "work:")
+    nb.output("notebooks", "--names")
+    assert [call[:2] for call in answers.calls] == [
+        ["ls", "home:"],
+        ["ls", "work:"],
+        ["notebooks", "--names"],
+        ["edit", "home:3"],
+        ["ls", "home:"],
+    ]
+
+
+def test_notebook_writes_invalidate_notebook_listing(answers: FakeNb):
+    nb.output("notebooks", "--names")
+    nb.output("ls", "home:")
+    nb.output("notebooks", "add", "new")
+    nb.output("notebooks", "--names")
+    nb.output("ls", "home:")
+    assert nb.client.spawned == {"notebooks": 2, "notebooks add": 1, "ls": 1}
+
+
+@pytest.mark.parametrize("write", [("sync", "--all"), ("add", "foo.md")])
+def test_unscoped_writes_invalidate_everything(answers: FakeNb, write):
+    nb.output("ls", "home:")
+    nb.output("notebooks", "--names")
+    nb.output(*write)
+    nb.output("ls", "home:")
+    nb.output("notebooks", "--names")
+    assert len(answers.calls) == 5
+
+
+def test_failures_raise_and_are_memoized(fake_nb: FakeNb):
+    fake_nb.handlers["list"] = lambda args: (1, "")
+    assert nb.returncode("list", "work:today.log.md") == 1
+    with pytest.raises(subprocess.CalledProcessError):
+        nb.output("list", "work:today.log.md")
+    assert len(fake_nb.calls) == 1
+
+
+def test_async_reads_run_concurrently_and_share(fake_nb: FakeNb):
+    def slow(args: list[str]) -> tuple[int, str]:
+        time.sleep(0.2)
+        return 0, " ".join(args)
+
+    fake_nb.handlers["ls"] = slow
+    fake_nb.handlers["show"] = slow
+
+    async def ask() -> list[str]:
+        return list(
+            await asyncio.gather(
+                nb.output_async("ls", "home:"),
+                nb.output_async("show", "home:3"),
+                nb.output_async("ls", "home:"),
+            )
+        )
+
+    start = time.monotonic()
+    assert asyncio.run(ask()) == ["ls home:", "show home:3", "ls home:"]
+    assert time.monotonic() - start < 0.35
+    assert nb.client.spawned == {"ls": 1, "show": 1}
+    # And the answers are remembered for the synchronous API too
+    assert nb.output("ls", "home:") == "ls home:"
+    assert len(fake_nb.calls) == 2
@@ -0,0 +1,96 @@
+"""Tests for the persistent nb worker, using a small bash script in place of nb."""
+
+from pathlib import Path
+
+import pytest
+
+from mole.nb_coprocess import CoprocessRunner, strip_main
+
+FAKE_NB = r"""#!/usr/bin/env bash
+_count=0
+_main() {
+    _count=$((_count + 1))
+    case "${1:-}" in
+        fail) echo "oops" >&2; exit 3 ;;
+        *) printf '%s|' "$@"; printf '%s|%s\n' "${PWD}" "${_count}" ;;
+    esac
+}
+_main "$@"
+"""
+
+
+@pytest.fixture(params=["sourced", "wrapped"])
+def runner(tmp_path: Path, request: pytest.FixtureRequest):
+    nb = tmp_path / "nb"
+    if request.param == "sourced":
+        nb.write_text(FAKE_NB)
+    else:
+        # Without a recognizable `_main` call at the end, the worker wraps the whole script instead
+        nb.write_text(FAKE_NB + "exit $?\n")
+    nb.chmod(0o755)
+    runner = CoprocessRunner(nb_path=str(nb))
+    yield runner
+    runner.close()
+
+
+def test_arguments_survive_the_pipe(
+    runner: CoprocessRunner, tmp_path: Path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    result = runner(["edit", "home:3", "--content", "## 12:00: a b\nline two"], True)
+    assert result.returncode == 0
+    assert result.stdout.decode() == (
+        f"edit|home:3|--content|## 12:00: a b\nline two|{tmp_path}|1\n"
+    )
+
+
+def test_worker_is_reused_and_calls_are_isolated(runner: CoprocessRunner):
+    first = runner(["ls"], True)
+    assert runner._proc is not None
+    pid = runner._proc.pid
+    second = runner(["ls"], True)
+    assert runner._proc is not None and runner._proc.pid == pid
+    # Each call runs in its own subshell, so state doesn't carry over between calls
+    assert first.stdout.endswith(b"|1\n") and second.stdout.endswith(b"|1\n")
+
+
+def test_failures_and_stderr(runner: CoprocessRunner):
+    result = runner(["fail"], True)
+    assert result.returncode == 3
+    assert result.stderr == b"oops\n"
+    assert runner(["ls"], True).returncode == 0
+
+
+def test_worker_restarts_after_dying(runner: CoprocessRunner):
+    runner(["ls"], True)
+    assert runner._proc is not None
+    runner._proc.kill()
+    runner._proc.wait()
+    assert runner(["ls"], True).returncode == 0
+
+
+def test_worker_that_cannot_start_falls_back_to_nb(tmp_path: Path):
+    nb = tmp_path / "nb"
+    # Like nb with a bad NB_DIR: it gives up before reaching _main, sourced or not
+    nb.write_text(FAKE_NB.replace("_count=0", 'echo "bad NB_DIR" >&2; exit 78', 1))
+    nb.chmod(0o755)
+    runner = CoprocessRunner(nb_path=str(nb))
+    try:
+        result = runner(["ls"], True)
+    finally:
+        runner.close()
+    assert (result.returncode, result.stderr) == (78, b"bad NB_DIR\n")
+
+
+def test_strip_main():
+    stripped = strip_main(FAKE_NB)
+    assert stripped is not None and stripped.rstrip().endswith("}")
+    assert strip_main(FAKE_NB + "\n# the end\n\n") is not None
+    assert strip_main(FAKE_NB + "exit $?\n") is None
+
+
+def test_worker_follows_cwd(runner: CoprocessRunner, tmp_path: Path, monkeypatch):
+    runner(["ls"], True)
+    (tmp_path / "elsewhere").mkdir()
+    monkeypatch.chdir(tmp_path / "elsewhere")
+    assert f"|{tmp_path / 'elsewhere'}|".encode() in runner(["ls"], True).stdout
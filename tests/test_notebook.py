@@ -0,0 +1,177 @@
+"""Tests for writing logs straight into the notebook directories."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from pendulum import DateTime
+from typer.testing import CliRunner
+
+from mole import nb, sync
+from mole.cli import app
+from mole.journal import append_to_log
+from mole.notebook import Logbook, append_batch
+from mole.projects import Project, ToDo
+from tests.conftest import FakeNb
+
+WHEN = DateTime(2025, 3, 4, 9, 30)
+TITLE = "Tuesday, March 04, 2025"
+
+
+@pytest.fixture
+def projects(nb_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Use the filesystem backend, so that loading projects doesn't need nb either."""
+    monkeypatch.setenv("MOLE_PROJECT_BACKEND", "fs")
+    return nb_dir
+
+
+def make_notebook(path: Path) -> Path:
+    path.mkdir()
+    (path / ".index").touch()
+    return path
+
+
+def test_append_creates_titled_log(projects: Path, fake_nb: FakeNb):
+    Logbook(project=None).append_log("Hello", when=WHEN)
+    Logbook(project=None).append_log("Again", when=WHEN, preamble="second")
+
+    log = projects / "home" / f"{TITLE}.log.md"
+    assert log.read_text() == (
+        f"# {TITLE}\n"
+        "\n## Tuesday, March 4th, 2025 09:30\n\nHello\n"
+        "\n## Tuesday, March 4th, 2025 09:30: second\n\nAgain\n"
+    )
+    assert (projects / "home" / ".index").read_text().splitlines()[-1] == log.name
+    assert sync.pending() == {"*"}
+    assert fake_nb.calls == []
+
+
+def test_append_to_project_log_dir(projects: Path, fake_nb: FakeNb):
+    notebook = make_notebook(projects / "beta-project")
+    logbook = Logbook(project=Project.load("Beta Project"))
+    logbook.append_log_header(when=WHEN, preamble="🐭 zonein")
+    logbook.append_log_footer(when=WHEN)
+
+    log = notebook / "logs" / f"{TITLE}.log.md"
+    assert log.read_text() == (
+        f"# {TITLE}\n\n## 09:30: 🐭 zonein\n\n### 09:30 Session closed\n"
+    )
+    # The new folder is an nb folder in its own right
+    assert (notebook / ".index").read_text() == "logs\n"
+    assert (notebook / "logs" / ".index").read_text() == f"{log.name}\n"
+    assert fake_nb.calls == []
+
+
+def test_append_to_todo(projects: Path):
+    notebook = make_notebook(projects / "beta-project")
+    todo = notebook / "1.todo.md"
+    todo.write_text("# [ ] Write the docs")  # no trailing newline
+    (notebook / ".index").write_text("1.todo.md\n")
+
+    project = Project.load("Beta Project")
+    Logbook(project=project, todo=ToDo(project, 1)).append(WHEN, "## 09:30")
+    assert todo.read_text() == "# [ ] Write the docs\n\n## 09:30\n"
+
+
+def test_falls_back_to_nb_without_notebook(projects: Path, fake_nb: FakeNb):
+    fake_nb.handlers["notebooks add"] = lambda args: (0, "")
+    fake_nb.handlers["list"] = lambda args: (1, "")
+    fake_nb.handlers["add"] = lambda args: (0, "")
+    fake_nb.handlers["edit"] = lambda args: (0, "")
+
+    Logbook(project=Project.load("Alpha")).append_log("Hello", when=WHEN)
+    assert [nb.subcommand(args) for args in fake_nb.calls] == [
+        "notebooks add",
+        "list",
+        "add",
+        "edit",
+    ]
+    assert fake_nb.calls[-1][1] == f"alpha:{TITLE}.log.md"
+
+
+def test_falls_back_to_nb_from_asyncio(projects: Path, fake_nb: FakeNb):
+    fake_nb.handlers["notebooks add"] = lambda args: (0, "")
+    fake_nb.handlers["list"] = lambda args: (1, "")
+    fake_nb.handlers["add"] = lambda args: (0, "")
+    logbook = Logbook(project=Project.load("Alpha"))
+
+    async def destinations():
+        # The sync version too, as from a callback while the loop is running
+        return logbook.destination(WHEN), await logbook.destination_async(WHEN)
+
+    assert asyncio.run(destinations()) == ({"selector": f"alpha:{TITLE}.log.md"},) * 2
+    assert [nb.subcommand(args) for args in fake_nb.calls] == [
+        "notebooks add",
+        "list",
+        "add",
+        "list",
+        "add",
+    ]
+
+
+def test_append_to_log_is_newline_safe(tmp_path: Path):
+    notebook = make_notebook(tmp_path / "notebook")
+    (notebook / ".index").write_text("other.md")  # no trailing newline
+    log = notebook / "day.log.md"
+    append_to_log(log, "Day", "one")
+    append_to_log(log, "Day", "two")
+    assert log.read_text() == "# Day\n\none\n\ntwo\n"
+    assert (notebook / ".index").read_text() == "other.md\nday.log.md\n"
+
+
+def test_append_batch_groups_and_orders(projects: Path, fake_nb: FakeNb):
+    make_notebook(projects / "beta-project")
+    lines = [
+        '{"text": "later", "timestamp": "2025-03-04T11:00:00"}',
+        "",
+        '{"text": "earlier", "subtitle": "cron", "timestamp": "2025-03-04T10:00:00"}',
+        '{"text": "next day", "timestamp": "2025-03-05T08:00:00"}',
+        '{"text": "project", "project": "Beta Project", "timestamp": "2025-03-04T09:00:00"}',
+    ]
+    assert append_batch(lines) == (4, 3)
+    log = projects / "home" / f"{TITLE}.log.md"
+    assert log.read_text() == (
+        f"# {TITLE}\n"
+        "\n## Tuesday, March 4th, 2025 10:00: cron\n\nearlier\n"
+        "\n## Tuesday, March 4th, 2025 11:00\n\nlater\n"
+    )
+    assert (projects / "home" / "Wednesday, March 05, 2025.log.md").exists()
+    assert (projects / "beta-project" / "logs" / f"{TITLE}.log.md").exists()
+    assert sync.pending() == {"*"}
+    assert fake_nb.calls == []
+
+
+def test_append_batch_default_todo_is_the_default_projects(projects: Path):
+    notebook = make_notebook(projects / "beta-project")
+    todo = notebook / "1.todo.md"
+    todo.write_text("# [ ] Write the docs\n")
+    (notebook / ".index").write_text("1.todo.md\n")
+    make_notebook(projects / "alpha")
+    lines = [
+        '{"text": "for the todo", "timestamp": "2025-03-04T09:00:00"}',
+        '{"text": "for alpha", "project": "Alpha", "timestamp": "2025-03-04T10:00:00"}',
+        '{"text": "also the todo", "project": "Beta Project", "timestamp": "2025-03-04T11:00:00"}',
+    ]
+    assert append_batch(lines, project="Beta Project", todo="beta-project:1") == (3, 2)
+    assert "for alpha" not in todo.read_text()
+    assert "for the todo" in todo.read_text() and "also the todo" in todo.read_text()
+    assert "for alpha" in (projects / "alpha" / f"{TITLE}.log.md").read_text()
+
+
+def test_append_batch_validates_first(projects: Path):
+    with pytest.raises(ValueError, match="line 2"):
+        append_batch(['{"text": "fine"}', '{"subtitle": "no text"}'])
+    assert not list((projects / "home").glob("*.log.md"))
+
+
+def test_log_batch_command(projects: Path):
+    stdin = "".join(
+        f'{{"text": "event {i}", "timestamp": "2025-03-04T09:{i % 60:02d}:00"}}\n'
+        for i in range(20_000)
+    )
+    result = CliRunner().invoke(app, ["log", "--batch"], input=stdin)
+    assert result.exit_code == 0, result.output
+    assert "Logged 20000 entries to 1 logs" in result.output
+    text = (projects / "home" / f"{TITLE}.log.md").read_text()
+    assert text.count("\n## ") == 20_000
+    assert text.index("event 0\n") < text.index("event 60\n") < text.index("event 1\n")
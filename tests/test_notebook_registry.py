@@ -0,0 +1,53 @@
+"""Tests for the on-disk registry of nb notebooks."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from mole.notebook_registry import NotebookRegistry
+from tests.conftest import FakeNb
+
+
+def make_notebook(path: Path) -> Path:
+    (path / ".git").mkdir(parents=True)
+    (path / ".index").touch()
+    return path
+
+
+def test_lists_git_repositories(nb_dir: Path, fake_nb: FakeNb):
+    make_notebook(nb_dir / "work")
+    (nb_dir / "not-a-notebook").mkdir()
+    make_notebook(nb_dir / ".plugins")
+    assert NotebookRegistry.load().notebooks == ["home", "work"]
+    assert fake_nb.calls == []
+
+
+def test_rescans_when_nb_dir_changes(nb_dir: Path):
+    assert not NotebookRegistry.load().has("beta-project")
+    make_notebook(nb_dir / "beta-project")
+    assert NotebookRegistry.load().has("beta-project")
+
+
+def test_added_notebook_needs_no_rescan(nb_dir: Path, monkeypatch: pytest.MonkeyPatch):
+    registry = NotebookRegistry.load()
+    make_notebook(nb_dir / "beta-project")  # As `nb notebooks add` would
+    registry.added("beta-project")
+    monkeypatch.setattr("mole.notebook_registry.scan", lambda root: [])
+    assert NotebookRegistry.load().notebooks == ["beta-project", "home"]
+
+
+def test_local_notebooks_by_cwd(nb_dir: Path, tmp_path: Path):
+    project = tmp_path / "code" / "alpha"
+    (project / "src").mkdir(parents=True)
+    before = project.stat().st_mtime_ns
+    assert NotebookRegistry.load().local(project) is None
+
+    make_notebook(project)
+    os.utime(project, ns=(before, before))
+    # Remembered, for as long as the mtime stands
+    assert NotebookRegistry.load().local(project) is None
+
+    os.utime(project)
+    assert NotebookRegistry.load().local(project) == project
+    assert NotebookRegistry.load().local(project / "src") == project
@@ -0,0 +1,67 @@
+"""Tests for the project backends."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from mole import project_index
+from mole.project_backends import (
+    FilesystemBackend,
+    NbCliBackend,
+    get_backend,
+    read_nb_index,
+)
+from mole.projects import Project
+from tests.conftest import FakeNb
+
+
+def test_read_nb_index_skips_deleted_items(nb_dir: Path):
+    index = read_nb_index(nb_dir / "home")
+    assert sorted(index) == [1, 3]
+
+
+def test_scan_matches_nb_numbering(nb_dir: Path):
+    records = FilesystemBackend().scan()
+    assert [(r.nb_id, r.name) for r in records] == [(1, "Alpha"), (3, "Beta Project")]
+
+
+def test_resolve(nb_dir: Path):
+    backend = FilesystemBackend()
+    assert backend.resolve("Beta Project") == 3
+    assert backend.resolve(Path("alpha.project.yaml")) == 1
+    with pytest.raises(ValueError):
+        backend.resolve("Alpha Beta")
+
+
+def test_project_load_with_fs_backend(nb_dir: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("MOLE_PROJECT_BACKEND", "fs")
+    assert isinstance(get_backend(), FilesystemBackend)
+    project = Project.load("Beta Project")
+    assert project.nb_id == 3
+    assert project.data.log_dir == "logs"
+    assert project.data.poetry is True
+
+
+def test_nb_backend_from_asyncio(
+    tmp_path: Path, fake_nb: FakeNb, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.delenv("MOLE_PROJECT_BACKEND", raising=False)
+    monkeypatch.delenv("MOLE_PROJECT_SNAPSHOT", raising=False)
+    monkeypatch.setattr(project_index, "lookup", lambda ref: None)
+    path = tmp_path / "gamma.project.yaml"
+    path.write_text("# Gamma\n---\npoetry: true\n...\n")
+    fake_nb.handlers["search"] = lambda args: (0, "[5] gamma.project.yaml\n")
+    fake_nb.handlers["show"] = lambda args: (0, path.read_text())
+    fake_nb.handlers["ls"] = lambda args: (0, f"{path}\n")
+
+    async def load():
+        # The blocking API, as from a callback while the loop is running
+        project = Project.load("Gamma")
+        return project, project.file, await Project.load_async("Gamma")
+
+    project, file, loaded = asyncio.run(load())
+    assert (project.nb_id, project.name, project.data.poetry) == (5, "Gamma", True)
+    assert file == path
+    assert loaded.nb_id == 5
+    assert NbCliBackend().read(5).path == str(path)
@@ -0,0 +1,166 @@
+"""Tests for the on-disk project index."""
+
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from mole import nb
+from mole.project_index import ProjectIndex, git_head
+from mole.projects import (
+    Project,
+    preview_dir,
+    project_ids,
+    project_names,
+    render_previews,
+)
+from tests.conftest import FakeNb, project_paths
+
+
+@pytest.fixture
+def nb_ls(nb_dir: Path, fake_nb: FakeNb) -> list[list[str]]:
+    """Answer `nb ls --paths` from the fake notebook, returning the list of calls made."""
+
+    def ls(args: list[str]) -> tuple[int, str]:
+        lines = [f"[{i}] {path}" for i, path in project_paths(nb_dir).items()]
+        return 0, "\n".join(lines) + "\n"
+
+    fake_nb.handlers["ls"] = ls
+    return fake_nb.calls
+
+
+def test_git_head_follows_ref(nb_dir: Path):
+    assert git_head(nb_dir / "home") == "a" * 40
+
+
+def test_git_head_without_repo(tmp_path: Path):
+    assert git_head(tmp_path) is None
+
+
+def test_build_reads_projects(nb_ls):
+    index = ProjectIndex.build()
+    assert {e.name: e.nb_id for e in index.entries} == {"Alpha": 1, "Beta Project": 3}
+    beta = index.find("Beta Project")
+    assert beta is not None
+    assert beta.data == {"log_dir": "logs", "poetry": True}
+
+
+def test_index_is_reused_until_stale(nb_dir: Path, nb_ls):
+    ProjectIndex.load()
+    nb.client.clear()  # Only the on-disk index should be saving us from nb here
+    ProjectIndex.load()
+    assert len(nb_ls) == 1
+
+    # Touching a project file invalidates the index
+    alpha = nb_dir / "home" / "alpha.project.yaml"
+    stat = alpha.stat()
+    os.utime(alpha, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    nb.client.clear()
+    ProjectIndex.load()
+    assert len(nb_ls) == 2
+
+    # ... and so does a new commit
+    (nb_dir / "home" / ".git" / "refs" / "heads" / "main").write_text("b" * 40)
+    nb.client.clear()
+    ProjectIndex.load()
+    assert len(nb_ls) == 3
+
+
+def test_find_by_ref(nb_dir: Path, nb_ls):
+    index = ProjectIndex.load()
+    by_id = index.find(1)
+    by_filename = index.find(Path("alpha.project.yaml"))
+    by_path = index.find(nb_dir / "home" / "beta_project.project.yaml")
+    assert by_id is not None and by_id.name == "Alpha"
+    assert by_filename is not None and by_filename.nb_id == 1
+    assert by_path is not None and by_path.nb_id == 3
+    assert index.find("Gamma") is None
+    assert index.find(2) is None
+
+
+def test_project_load_uses_index(nb_ls, fake_nb: FakeNb):
+    ProjectIndex.load()
+    fake_nb.handlers.clear()
+    project = Project.load("Alpha")
+    assert project.nb_id == 1
+    assert project.data.cwd == "~/code/alpha"
+    assert project.file.name == "alpha.project.yaml"
+    assert project_names() == {"Alpha", "Beta Project"}
+    assert project_ids() == {1, 3}
+
+
+def test_load_many_and_all(nb_ls):
+    projects = Project.load_many(["Beta Project", 1, Path("alpha.project.yaml")])
+    assert [p.nb_id for p in projects] == [3, 1, 1]
+    assert [p.name for p in Project.all()] == ["Alpha", "Beta Project"]
+    assert len(nb_ls) == 1
+
+
+def test_render_previews(nb_dir: Path, nb_ls):
+    records = ProjectIndex.load().entries
+    render_previews(records)
+    preview = preview_dir() / "Beta Project.project.yaml"
+    assert (
+        preview.read_text()
+        == (nb_dir / "home" / "beta_project.project.yaml").read_text()
+    )
+
+    # Only stale previews are rewritten
+    preview.write_text("stale but newer")
+    render_previews(records)
+    assert preview.read_text() == "stale but newer"
+
+
+def test_fzf_gets_names_before_previews(
+    nb_dir: Path, nb_ls, monkeypatch: pytest.MonkeyPatch
+):
+    events = []
+
+    class Stdin(io.BytesIO):
+        def write(self, data) -> int:
+            events.append(("names", bytes(data).decode().splitlines()))
+            return len(data)
+
+    class Fzf:
+        returncode = 0
+
+        def __init__(self, command, stdin, stdout):
+            self.stdin, self.stdout = Stdin(), io.BytesIO(b"Alpha\n")
+
+        def wait(self) -> int:
+            return 0
+
+    monkeypatch.setattr("mole.projects.subprocess.Popen", Fzf)
+    monkeypatch.setattr(
+        "mole.projects.render_previews",
+        lambda entries: events.append(("previews", [e.name for e in entries])),
+    )
+    assert Project.from_fzf().name == "Alpha"
+    assert events == [
+        ("names", ["Beta Project", "Alpha"]),
+        ("previews", ["Beta Project", "Alpha"]),
+    ]
+
+
+def test_snapshot_skips_loading(nb_dir: Path, nb_ls, monkeypatch: pytest.MonkeyPatch):
+    snapshot = Project.load("Beta Project").snapshot()
+    monkeypatch.setenv("MOLE_PROJECT_SNAPSHOT", snapshot)
+    monkeypatch.setattr("mole.project_index.lookup", lambda ref: pytest.fail())
+    assert Project.load("Beta Project") == Project.load(3)
+    assert Project.load(3).data.log_dir == "logs"
+
+
+def test_stale_snapshot_is_ignored(
+    nb_dir: Path, nb_ls, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("MOLE_PROJECT_SNAPSHOT", Project.load(3).snapshot())
+    beta = nb_dir / "home" / "beta_project.project.yaml"
+    beta.write_text(beta.read_text().replace("logs", "journal"))
+    stat = beta.stat()
+    os.utime(beta, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert Project.load(3).data.log_dir == "journal"
+    # ... as is one for a different project, or a garbled one
+    assert Project.load("Alpha").nb_id == 1
+    monkeypatch.setenv("MOLE_PROJECT_SNAPSHOT", "{")
+    assert Project.load(3).data.log_dir == "journal"
@@ -0,0 +1,61 @@
+"""Tests for write-behind nb syncing."""
+
+import pytest
+
+from mole import sync
+from tests.conftest import FakeNb
+
+
+@pytest.fixture
+def nb_sync(fake_nb: FakeNb) -> FakeNb:
+    fake_nb.handlers["sync"] = lambda args: (0, "")
+    return fake_nb
+
+
+def test_marks_coalesce_into_one_sync(nb_sync: FakeNb):
+    sync.mark_dirty("home")
+    sync.mark_dirty()
+    sync.mark_dirty("home")
+    assert sync.pending() == {"home", sync.ALL}
+    assert sync.flush()
+    assert nb_sync.calls == [["sync", "--all"]]
+    assert sync.pending() == set()
+
+
+def test_home_only_syncs_current_notebook(nb_sync: FakeNb):
+    sync.mark_dirty("home")
+    sync.flush()
+    assert nb_sync.calls == [["sync"]]
+
+
+def test_nothing_pending_means_no_sync(nb_sync: FakeNb):
+    assert sync.flush()
+    sync.schedule_flush()
+    assert nb_sync.calls == []
+
+
+def test_failed_sync_stays_pending(fake_nb: FakeNb):
+    fake_nb.handlers["sync"] = lambda args: (1, "")
+    sync.mark_dirty("home")
+    with pytest.raises(RuntimeError):
+        sync.flush()
+    assert sync.pending() == {"home"}
+
+
+def test_flush_is_exclusive(nb_sync: FakeNb):
+    sync.mark_dirty()
+    with sync.file_lock(sync.sync_dir() / "flusher.lock"):
+        assert sync.flusher_running()
+        assert not sync.flush()
+    assert not sync.flusher_running()
+    assert sync.flush()
+    assert nb_sync.calls == [["sync", "--all"]]
+
+
+def test_foreground_mode_flushes_at_exit(
+    nb_sync: FakeNb, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("MOLE_SYNC", "foreground")
+    sync.mark_dirty()
+    sync.schedule_flush()
+    assert nb_sync.calls == [["sync", "--all"]]
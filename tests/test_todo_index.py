@@ -0,0 +1,108 @@
+"""Tests for the on-disk todo index."""
+
+import os
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from mole.cli import app
+from mole.projects import Project, ToDo
+from mole import todo_index
+from mole.todo_index import TodoIndex
+from tests.conftest import FakeNb
+
+
+@pytest.fixture
+def todos(nb_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Give Beta Project a notebook with a couple of todos (and a note) in it, returning the notebook."""
+    monkeypatch.setenv("MOLE_PROJECT_BACKEND", "fs")
+    notebook = nb_dir / "beta-project"
+    notebook.mkdir()
+    (notebook / "1.todo.md").write_text("# [ ] Write the docs\n\nSome details\n")
+    (notebook / "notes.md").write_text("# Not a todo\n")
+    (notebook / "3.todo.md").write_text("# [x] Ship it\n")
+    (notebook / ".index").write_text("1.todo.md\nnotes.md\n3.todo.md\n")
+    return notebook
+
+
+def touch(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_index_finds_todos(todos: Path, fake_nb: FakeNb):
+    index = TodoIndex.load()
+    assert [(e.label, e.title, e.done) for e in index.entries()] == [
+        ("beta-project:1", "Write the docs", False),
+        ("beta-project:3", "Ship it", True),
+    ]
+    entry = index.find("beta-project:1")
+    assert entry is not None and entry.project == "Beta Project"
+    assert index.find("beta-project:2") is None
+    assert fake_nb.calls == []
+
+
+def test_index_follows_edits(todos: Path):
+    TodoIndex.load()
+
+    todo = todos / "1.todo.md"
+    todo.write_text("# [x] Write the docs\n")
+    touch(todo)
+    entry = TodoIndex.load().find("beta-project:1")
+    assert entry is not None and entry.done
+
+    (todos / "4.todo.md").write_text("# [ ] One more thing\n")
+    with open(todos / ".index", "a") as f:
+        f.write("4.todo.md\n")
+    touch(todos / ".index")
+    entry = TodoIndex.load().find("beta-project:4")
+    assert entry is not None and entry.title == "One more thing"
+
+
+def test_index_rechecks_files_that_were_not_todos(todos: Path):
+    draft = todos / "4.todo.md"
+    draft.write_text("Not quite a todo yet\n")
+    with open(todos / ".index", "a") as f:
+        f.write("4.todo.md\n")
+    assert TodoIndex.load().find("beta-project:4") is None
+
+    # Editing a file in place doesn't touch its notebook's directory or .index
+    stat = (todos / ".index").stat()
+    draft.write_text("# [ ] Finish the draft\n")
+    touch(draft)
+    os.utime(todos, ns=(stat.st_atime_ns, todos.stat().st_mtime_ns))
+    entry = TodoIndex.load().find("beta-project:4")
+    assert entry is not None and entry.title == "Finish the draft"
+
+
+def test_index_drops_todos_deleted_while_scanning(
+    todos: Path, monkeypatch: pytest.MonkeyPatch
+):
+    read_todo = todo_index.read_todo
+
+    def deleted_first(notebook: str, nb_id: int, path: Path, mtime_ns: int):
+        if nb_id == 1:
+            path.unlink()
+        return read_todo(notebook, nb_id, path, mtime_ns)
+
+    monkeypatch.setattr(todo_index, "read_todo", deleted_first)
+    assert [e.label for e in TodoIndex.load().entries()] == ["beta-project:3"]
+
+
+def test_list_todos_and_from_label(todos: Path):
+    project = Project.load("Beta Project")
+    assert project.list_todos() == ["[beta-project:1] [ ] Write the docs"]
+
+    todo = ToDo.from_label("beta-project:3")
+    assert todo.project == project
+    assert todo.label == "beta-project:3"
+
+
+def test_todos_command(todos: Path):
+    result = CliRunner().invoke(app, ["todos"])
+    assert result.exit_code == 0
+    assert result.output == "[beta-project:1] [ ] Write the docs  (Beta Project)\n"
+
+    result = CliRunner().invoke(app, ["todos", "--all", "--project", "Beta Project"])
+    assert "[beta-project:3] [x] Ship it" in result.output
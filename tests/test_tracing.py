@@ -0,0 +1,67 @@
+"""Tests for MOLE_TRACE spans and their summary."""
+
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from mole import nb, tracing
+from mole.cli import app
+from tests.conftest import FakeNb
+
+
+@pytest.fixture
+def trace(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "trace.json"
+    monkeypatch.setenv("MOLE_TRACE", str(path))
+    monkeypatch.setattr(tracing, "_named_process", None)
+    return path
+
+
+def test_no_trace_without_variable(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("MOLE_TRACE", raising=False)
+    monkeypatch.setattr(tracing, "record", lambda path, event: pytest.fail())
+    with tracing.span("quiet") as args:
+        args["ignored"] = True
+
+
+def test_spans_are_chrome_trace_events(trace: Path, fake_nb: FakeNb):
+    fake_nb.handlers["list"] = lambda args: (1, "")
+    with tracing.span("outer", project="Alpha"):
+        nb.returncode("list", "home:1")
+
+    # The array is left open for more events, which Chrome tolerates
+    events = json.loads(trace.read_text().rstrip().rstrip(",") + "]")
+    assert [event["ph"] for event in events] == ["M", "X", "X"]
+    inner, outer = events[1:]
+    assert (inner["name"], inner["cat"]) == ("nb list", "subprocess")
+    assert inner["args"] == {"argv": ["nb", "list", "home:1"], "returncode": 1}
+    assert (outer["name"], outer["cat"], outer["args"]) == (
+        "outer",
+        "phase",
+        {"project": "Alpha"},
+    )
+    assert outer["ts"] <= inner["ts"] and inner["dur"] <= outer["dur"]
+
+
+def test_summary_across_runs(trace: Path):
+    for pid, durations in [(1, [3.0, 1.0]), (2, [2.0])]:
+        with open(trace, "a") as f:
+            for dur in durations:
+                event = {"name": "append", "cat": "phase", "ph": "X", "pid": pid}
+                f.write(json.dumps({**event, "ts": 0, "dur": int(dur * 1e6)}) + ",\n")
+    with open(trace, "a") as f:
+        event = {"name": "nb list", "cat": "subprocess", "ph": "X", "pid": 2}
+        f.write(json.dumps({**event, "ts": 0, "dur": 500_000}) + ",\n")
+        f.write('{"name": "torn wri')
+
+    result = CliRunner().invoke(app, ["trace", "summary"])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[0] == "2 processes traced"
+    assert lines[2].split() == ["6.000s", "3", "2.000s", "3.000s", "phase", "append"]
+    assert lines[3].split()[-2:] == ["nb", "list"]
+
+    result = CliRunner().invoke(app, ["trace", "summary", "-c", "subprocess"])
+    assert len(result.output.splitlines()) == 3
@@ -0,0 +1,73 @@
+"""Tests for the queue voice memos wait in to be transcribed."""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from watchdog.events import FileCreatedEvent
+
+from mole import voicememo
+from mole.voicememo import MemoQueue, VoiceMemoHandler
+
+
+@pytest.fixture
+def memos(tmp_path: Path) -> list[Path]:
+    """Four memos, recorded in the reverse of the order their names sort in."""
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"memo-{i}.m4a"
+        path.write_bytes(b"\0")
+        os.utime(path, (1_000_000 - i, 1_000_000 - i))
+        paths.append(path)
+    return paths
+
+
+def test_oldest_memos_first(memos: list[Path], monkeypatch: pytest.MonkeyPatch):
+    handled = []
+    started, release = threading.Event(), threading.Event()
+
+    def handle_vm(path: Path, server=None):
+        started.set()
+        release.wait()
+        handled.append(path)
+        if path == memos[2]:
+            raise RuntimeError("whisper fell over")
+
+    monkeypatch.setattr(voicememo, "handle_vm", handle_vm)
+    queue = MemoQueue(workers=1)
+    handler = VoiceMemoHandler(memos=queue)
+    for path in memos:
+        handler.on_created(FileCreatedEvent(str(path)))
+        handler.on_created(FileCreatedEvent(str(path)))  # Duplicates are ignored
+        started.wait()
+    release.set()
+    queue.join()
+    queue.close()
+    # The first memo was being handled before the rest arrived, and a failure doesn't stop the worker
+    assert handled == [memos[0], memos[3], memos[2], memos[1]]
+
+
+def test_memos_are_handled_in_parallel(
+    memos: list[Path], monkeypatch: pytest.MonkeyPatch
+):
+    running, most = 0, 0
+    lock = threading.Lock()
+
+    def handle_vm(path: Path, server=None):
+        nonlocal running, most
+        with lock:
+            running += 1
+            most = max(most, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    monkeypatch.setattr(voicememo, "handle_vm", handle_vm)
+    queue = MemoQueue(workers=3)
+    for path in memos:
+        queue.put(path)
+    queue.join()
+    queue.close()
+    assert most == 3
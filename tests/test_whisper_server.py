@@ -0,0 +1,180 @@
+"""Tests for supervising the resident whisper server, with a fake whisper-server standing in for whisper.cpp's."""
+
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from mole import voicememo, whisper_server
+from mole.whisper_server import WhisperServer, WhisperServerBusy, WhisperServerError
+
+FAKE_SERVER = """\
+import sys, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+if "--fail" in open(sys.argv[0] + ".mode").read():
+    sys.exit(1)
+port = int(sys.argv[sys.argv.index("--port") + 1])
+time.sleep(0.3)  # Loading the model
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.path == "/health" else 404)
+        self.end_headers()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"Buy more coffee filters.\\n")
+
+    def log_message(self, *args):
+        pass
+
+
+ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+"""
+
+
+@pytest.fixture
+def whisper_cpp(tmp_path: Path) -> Path:
+    root = tmp_path / "whisper.cpp"
+    binary = root / "build" / "bin" / "whisper-server"
+    binary.parent.mkdir(parents=True)
+    binary.write_text(f"#!{sys.executable}\n{FAKE_SERVER}")
+    binary.chmod(0o755)
+    Path(f"{binary}.mode").write_text("")
+    return root
+
+
+@pytest.fixture
+def server(whisper_cpp: Path):
+    server = WhisperServer(whisper_cpp)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def wav(tmp_path: Path) -> Path:
+    path = tmp_path / "memo.wav"
+    path.write_bytes(b"\0" * 64)
+    return path
+
+
+def test_start_waits_for_health(server: WhisperServer, wav: Path):
+    server.start()
+    assert server.healthy()
+    assert server.transcribe(wav) == "Buy more coffee filters.\n"
+
+
+def test_transcribe_restarts_dead_server(server: WhisperServer, wav: Path):
+    server.start()
+    process = server._process
+    assert process is not None
+    process.kill()
+    process.wait()
+
+    assert server.transcribe(wav) == "Buy more coffee filters.\n"
+    assert server._process is not None and server._process.pid != process.pid
+
+
+def test_check_leaves_busy_server_alone(
+    server: WhisperServer, monkeypatch: pytest.MonkeyPatch
+):
+    server.start()
+    process = server._process
+    monkeypatch.setattr(server, "healthy", lambda: False)
+
+    server._in_flight = 1  # Not answering /health mid-transcription is fine
+    server.check()
+    assert server._process is process
+
+    server._in_flight = 0
+    server.check()
+    assert server._process is not process
+
+
+def test_others_fall_back_while_starting(
+    server: WhisperServer, monkeypatch: pytest.MonkeyPatch
+):
+    launching, release = threading.Event(), threading.Event()
+    launch = server._launch
+
+    def slow_launch():
+        launching.set()
+        release.wait()
+        return launch()
+
+    monkeypatch.setattr(server, "_launch", slow_launch)
+    starter = threading.Thread(target=server.start)
+    starter.start()
+    launching.wait()
+    with pytest.raises(WhisperServerError, match="starting"):
+        server.start()
+    release.set()
+    starter.join()
+    assert server.running()
+
+
+def test_gives_up_after_failed_starts(server: WhisperServer):
+    Path(f"{server.binary}.mode").write_text("--fail")
+    for _ in range(whisper_server.MAX_RESTARTS):
+        assert server.available
+        with pytest.raises(WhisperServerError, match="exited with 1"):
+            server.start()
+    assert not server.available
+    with pytest.raises(WhisperServerError, match="unavailable"):
+        server.start()
+
+
+@pytest.fixture
+def whisper_cli(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Answer voicememo's whisper-cli runs, returning the commands run."""
+    commands = []
+
+    def check_output(command: str, shell: bool) -> bytes:
+        commands.append(command)
+        return b"From whisper-cli\n"
+
+    monkeypatch.setattr(subprocess, "check_output", check_output)
+    return commands
+
+
+def test_transcribe_falls_back_to_whisper_cli(
+    tmp_path: Path,
+    server: WhisperServer,
+    wav: Path,
+    whisper_cli: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    def fail(wav: Path) -> str:
+        raise WhisperServerError("transcription failed")
+
+    monkeypatch.setattr(server, "transcribe", fail)
+    assert voicememo.transcribe(wav, server) == "From whisper-cli\n"
+
+    unbuilt = WhisperServer(tmp_path / "elsewhere")
+    assert voicememo.transcribe(wav, unbuilt) == "From whisper-cli\n"
+    assert voicememo.transcribe(wav) == "From whisper-cli\n"
+    assert len(whisper_cli) == 3 and "whisper-cli" in whisper_cli[0]
+
+
+def test_busy_server_sends_memos_to_whisper_cli(
+    server: WhisperServer,
+    wav: Path,
+    whisper_cli: list[str],
+    capsys: pytest.CaptureFixture,
+):
+    server.start()
+    server._in_flight = whisper_server.CONCURRENCY  # Another worker's memo
+    with pytest.raises(WhisperServerBusy):
+        server.transcribe(wav)
+    assert voicememo.transcribe(wav, server) == "From whisper-cli\n"
+    assert capsys.readouterr().out == ""  # Not worth a warning, it's expected
+
+    server._in_flight = 0
+    assert voicememo.transcribe(wav, server) == "Buy more coffee filters.\n"
+    assert len(whisper_cli) == 1
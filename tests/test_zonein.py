@@ -0,0 +1,62 @@
+"""Tests for zoning in to a project, with zellij faked out."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from mole.projects import ProjectSnapshot
+from mole.zonein import zonein
+from tests.conftest import FakeNb
+
+
+@pytest.fixture
+def zellij(nb_dir: Path, monkeypatch: pytest.MonkeyPatch) -> list[dict]:
+    """Record the zellij commands zonein hands off to, along with the environment they were given."""
+    monkeypatch.setenv("MOLE_PROJECT_BACKEND", "fs")
+    for variable in [
+        "ZELLIJ_SESSION_NAME",
+        "MOLE_PROJECT",
+        "MOLE_PROJECT_SNAPSHOT",
+        "MOLE_TODO",
+    ]:
+        monkeypatch.delenv(variable, raising=False)
+    (nb_dir / "beta-project").mkdir()
+    (nb_dir / "beta-project" / ".index").touch()
+
+    calls = []
+
+    def call(args: list[str]) -> int:
+        calls.append({"args": args, "env": dict(os.environ)})
+        return 0
+
+    monkeypatch.setattr("mole.zonein.subprocess.call", call)
+    monkeypatch.setattr("mole.zonein.zellij_sessions", lambda: ["alpha"])
+    return calls
+
+
+def test_zonein_starts_session(nb_dir: Path, zellij: list[dict], fake_nb: FakeNb):
+    zonein("Beta Project", skip_todo=True)
+
+    [handoff] = zellij
+    assert handoff["args"][:3] == ["zellij", "--session", "beta-project"]
+    assert handoff["env"]["MOLE_PROJECT"] == "Beta Project"
+    snapshot = ProjectSnapshot.model_validate_json(
+        handoff["env"]["MOLE_PROJECT_SNAPSHOT"]
+    )
+    assert snapshot.record.nb_id == 3
+
+    [log] = (nb_dir / "beta-project" / "logs").glob("*.log.md")
+    assert ": 🐭 zonein\n" in log.read_text()
+    assert log.read_text().endswith(" Session closed\n")
+    assert fake_nb.calls == []
+
+
+def test_zonein_attaches_to_running_session(
+    zellij: list[dict], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr("mole.zonein.zellij_sessions", lambda: ["beta-project"])
+    zonein("Beta Project", "beta-project:2")
+
+    assert [call["args"] for call in zellij] == [["zellij", "attach", "beta-project"]]
+    assert "MOLE_TODO" not in zellij[0]["env"]